@@ -0,0 +1,204 @@
+"""Streaming evaluation of alert rules against new price observations"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from sample_data import OWN_SOURCE
+
+TRIGGER_TYPES = ["Price Change", "MAP Violation", "Stock Status", "Competitor Price",
+                 "Margin Threshold", "Market Position", "Custom Condition"]
+
+# Trigger types that can be decided from one observation plus the evaluator's state
+STREAMING_TRIGGERS = ("Price Change", "MAP Violation", "Stock Status", "Margin Threshold", "Market Position")
+
+# Form severity -> alert "type" used by the alert feed styles
+SEVERITIES = {"Info": "info", "Warning": "warning", "Critical": "critical"}
+
+DEFAULT_COOLDOWN_MINUTES = 60
+
+_NO_RULES = {}
+
+
+class AlertEvaluator:
+    """Checks each new observation once against the compiled alert rules.
+
+    Rules are indexed by SKU and trigger type (rules without products apply to
+    every SKU), so an observation only touches the rules that can fire for it.
+    The evaluator keeps the last price/availability per (SKU, source) and the
+    in-stock competitor prices of SKUs watched for market position; cells it
+    has not seen yet are seeded from the price history. A rule fires at most
+    once per (SKU, source) within its cooldown window; repeats are counted in
+    ``suppressed``.
+    """
+
+    def __init__(self, rules=()):
+        self._last = {}               # (sku, source) -> (price, availability)
+        self._competitor_prices = {}  # sku -> {source: price}, in-stock only
+        self._lowest = {}             # sku -> whether our price was the lowest
+        self._fired = {}              # (rule id, sku, source) -> time of last alert
+        self.processed = 0
+        self.suppressed = 0
+        self.compile(rules)
+
+    def compile(self, rules):
+        """Re-index every rule, e.g. after loading saved rules"""
+        self._rules = {}
+        self._by_sku = {}   # sku -> trigger type -> [rules]
+        self._any = {}      # trigger type -> [rules]
+        for rule in rules:
+            self.add_rule(rule)
+
+    def add_rule(self, rule):
+        self.remove_rule(rule["id"])
+        if not rule.get("active") or rule["trigger_type"] not in STREAMING_TRIGGERS:
+            return
+        self._rules[rule["id"]] = rule
+        for sku in rule.get("products") or [None]:
+            index = self._any if sku is None else self._by_sku.setdefault(sku, {})
+            index.setdefault(rule["trigger_type"], []).append(rule)
+            if rule["trigger_type"] == "Market Position":
+                # Competitor prices were not tracked while nothing watched this SKU
+                if sku is None:
+                    self._competitor_prices.clear()
+                else:
+                    self._competitor_prices.pop(sku, None)
+
+    def remove_rule(self, rule_id):
+        rule = self._rules.pop(rule_id, None)
+        if rule is None:
+            return
+        for sku in rule.get("products") or [None]:
+            index = self._any if sku is None else self._by_sku.get(sku, {})
+            matching = index.get(rule["trigger_type"], [])
+            if rule in matching:
+                matching.remove(rule)
+
+    def _matching(self, specific, trigger):
+        found = specific.get(trigger)
+        anywhere = self._any.get(trigger)
+        if found and anywhere:
+            return found + anywhere
+        return found or anywhere or ()
+
+    def _emit(self, alerts, rule, sku, source, when, message):
+        key = (rule["id"], sku, source)
+        last = self._fired.get(key)
+        if last is not None and when - last < timedelta(minutes=rule.get("cooldown_minutes", DEFAULT_COOLDOWN_MINUTES)):
+            self.suppressed += 1
+            return
+        self._fired[key] = when
+        rule["triggers"] = rule.get("triggers", 0) + 1
+        alerts.append({
+            "time": when,
+            "type": SEVERITIES[rule["severity"]],
+            "message": message,
+            "product": sku,
+            "source": source,
+            "rule_id": rule["id"],
+            "trigger": rule["trigger_type"],
+            "channels": rule.get("channels"),
+        })
+
+    def _competitors(self, sku, product_id, history):
+        prices = self._competitor_prices.get(sku)
+        if prices is None:
+            prices = {}
+            if history is not None:
+                latest = history.latest_prices([product_id])
+                available = history.latest_availability([product_id])
+                for source in latest.columns:
+                    if source != OWN_SOURCE and available[source].iloc[0] and pd.notna(latest[source].iloc[0]):
+                        prices[source] = float(latest[source].iloc[0])
+            self._competitor_prices[sku] = prices
+        return prices
+
+    def _check_position(self, alerts, rules, sku, own_price, prices, source, when, name):
+        lowest_source = min(prices, key=prices.get) if prices else None
+        is_lowest = lowest_source is None or own_price <= prices[lowest_source]
+        was_lowest = self._lowest.get(sku)
+        self._lowest[sku] = is_lowest
+        if was_lowest and not is_lowest:
+            for rule in rules:
+                self._emit(alerts, rule, sku, source, when,
+                           f"Lost lowest-price position on {name}: {lowest_source} at ${prices[lowest_source]:.2f}")
+
+    def process(self, columns, products_by_sku, history=None):
+        """Evaluate a batch of observations (columns as for ``PriceHistoryStore.extend``).
+
+        Call before the batch is added to ``history`` so first-seen cells are
+        compared with the previous observation. Returns the new alerts in
+        observation order.
+        """
+        skus = np.asarray(columns["sku"], dtype=object)
+        n = len(skus)
+
+        def _broadcast(key, default, dtype=object):
+            return np.broadcast_to(np.asarray(columns[key] if key in columns else default, dtype=dtype), (n,))
+
+        sources = _broadcast("source", OWN_SOURCE)
+        prices = _broadcast("price", np.nan, np.float64)
+        availability = _broadcast("availability", True, np.bool_)
+        product_ids = _broadcast("product_id", 0)
+        dates = pd.DatetimeIndex(_broadcast("date", None, "datetime64[ns]")).to_pydatetime()
+
+        alerts = []
+        for sku, source, price, available, product_id, when in zip(skus, sources, prices, availability, product_ids, dates):
+            key = (sku, source)
+            previous = self._last.get(key)
+            if previous is None and history is not None:
+                seen = history.latest_observation(product_id, source)
+                previous = (seen[0], seen[2]) if seen is not None else None
+            self._last[key] = (price, available)
+
+            specific = self._by_sku.get(sku, _NO_RULES)
+            if not specific and not self._any:
+                continue
+            product = products_by_sku.get(sku)
+            name = product["name"] if product else sku
+
+            if source == OWN_SOURCE:
+                for rule in self._matching(specific, "Margin Threshold"):
+                    if product and price > 0:
+                        margin = (price - product["cost"]) / price * 100
+                        if margin < rule["margin_threshold"]:
+                            self._emit(alerts, rule, sku, source, when,
+                                       f"Margin on {name} fell to {margin:.1f}% (minimum {rule['margin_threshold']}%)")
+                rules = self._matching(specific, "Market Position")
+                if rules:
+                    competitors = self._competitors(sku, product_id, history)
+                    self._check_position(alerts, rules, sku, price, competitors, source, when, name)
+                continue
+
+            if previous is not None and previous[0] > 0:
+                change = (price - previous[0]) / previous[0] * 100
+                for rule in self._matching(specific, "Price Change"):
+                    direction = rule.get("direction", "Either")
+                    if (abs(change) >= rule["threshold"]
+                            and (direction == "Either" or (direction == "Decrease") == (change < 0))):
+                        self._emit(alerts, rule, sku, source, when,
+                                   f"{source} {'dropped' if change < 0 else 'raised'} price by {abs(change):.1f}% on {name}")
+
+            for rule in self._matching(specific, "MAP Violation"):
+                if price < rule["map_price"]:
+                    self._emit(alerts, rule, sku, source, when,
+                               f"MAP violation: {source} sells {name} at ${price:.2f} (MAP ${rule['map_price']:.2f})")
+
+            if previous is not None and previous[1] != available:
+                for rule in self._matching(specific, "Stock Status"):
+                    self._emit(alerts, rule, sku, source, when,
+                               f"Stock-out detected at {source} for {name}" if not available
+                               else f"{name} back in stock at {source}")
+
+            rules = self._matching(specific, "Market Position")
+            if rules:
+                competitors = self._competitors(sku, product_id, history)
+                if available:
+                    competitors[source] = float(price)
+                else:
+                    competitors.pop(source, None)
+                if product:
+                    self._check_position(alerts, rules, sku, product["current_price"], competitors, source, when, name)
+
+        self.processed += n
+        return alerts
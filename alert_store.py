@@ -0,0 +1,252 @@
+"""Time-ordered alert storage with type and product indexes"""
+import itertools
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+
+_AFTER_ANY_ID = float("inf")
+
+SEVERITY_TYPES = ["critical", "warning", "info"]
+
+# Upper bounds (minutes) of the time-to-acknowledge histogram buckets
+ACK_BUCKETS = [(5, "<5 min"), (15, "5-15 min"), (30, "15-30 min"), (60, "30-60 min"), (None, ">1 hour")]
+
+
+def _insert(index, key):
+    # Alerts arrive almost in time order, so this is nearly always an append
+    if not index or key >= index[-1]:
+        index.append(key)
+    else:
+        insort(index, key)
+
+
+def _remove(index, key):
+    position = bisect_left(index, key)
+    if position < len(index) and index[position] == key:
+        del index[position]
+
+
+def _ack_bucket(waited):
+    minutes = waited.total_seconds() / 60
+    for limit, label in ACK_BUCKETS:
+        if limit is None or minutes < limit:
+            return label
+
+
+class AlertRollups:
+    """Alert counts pre-aggregated per hour and per day as alerts fire and are acknowledged.
+
+    Hourly buckets count alerts by severity; daily buckets also count them by
+    trigger and hold the time-to-acknowledge histogram of alerts dismissed
+    that day. Queries read one bucket per period, independent of how many raw
+    alerts exist, and rollups outlive pruning of the raw alerts.
+    """
+
+    def __init__(self):
+        self.hourly = {}   # hour -> Counter(severity)
+        self.daily = {}    # day -> {"severity": Counter, "trigger": Counter, "ack": Counter}
+
+    def _day(self, when):
+        day = pd.Timestamp(when).floor("D")
+        bucket = self.daily.get(day)
+        if bucket is None:
+            bucket = self.daily[day] = {"severity": Counter(), "trigger": Counter(), "ack": Counter()}
+        return bucket
+
+    def record_alert(self, alert):
+        hour = pd.Timestamp(alert["time"]).floor("h")
+        self.hourly.setdefault(hour, Counter())[alert["type"]] += 1
+        day = self._day(alert["time"])
+        day["severity"][alert["type"]] += 1
+        day["trigger"][alert.get("trigger", "Other")] += 1
+
+    def record_ack(self, alert):
+        self._day(alert["dismissed_at"])["ack"][_ack_bucket(alert["dismissed_at"] - alert["time"])] += 1
+
+    def volume(self, start, end=None, freq="D"):
+        """Alerts per period and severity as a DataFrame indexed by period start"""
+        periods = pd.date_range(pd.Timestamp(start).floor(freq), pd.Timestamp(end or datetime.now()).floor(freq), freq=freq)
+        if freq == "D":
+            rows = [self.daily[day]["severity"] if day in self.daily else {} for day in periods]
+        else:
+            rows = [self.hourly.get(hour, {}) for hour in periods]
+        return pd.DataFrame({severity: [row.get(severity, 0) for row in rows] for severity in SEVERITY_TYPES}, index=periods)
+
+    def _sum_days(self, key, start, end=None):
+        total = Counter()
+        for day in pd.date_range(pd.Timestamp(start).floor("D"), pd.Timestamp(end or datetime.now()).floor("D"), freq="D"):
+            bucket = self.daily.get(day)
+            if bucket is not None:
+                total.update(bucket[key])
+        return total
+
+    def by_trigger(self, start, end=None):
+        """Alert counts per trigger type over the days in [start, end]"""
+        return pd.Series(self._sum_days("trigger", start, end), dtype="int64").sort_values(ascending=False)
+
+    def ack_histogram(self, start, end=None):
+        """Alerts acknowledged in [start, end] per time-to-acknowledge bucket"""
+        total = self._sum_days("ack", start, end)
+        return pd.Series([total.get(label, 0) for _, label in ACK_BUCKETS], index=[label for _, label in ACK_BUCKETS])
+
+
+class AlertStore:
+    """Active alerts kept sorted by time, with per-type and per-product indexes.
+
+    Each index is a sorted list of (time, id) keys, so a time range under a
+    type or product filter costs two bisections plus the alerts returned, and
+    per-type counters are kept up to date on insert and dismiss. Alerts get a
+    stable integer ``id``; dismissed alerts leave the indexes but stay
+    retrievable by id until pruned. ``version`` changes on every write and
+    ``rollups`` holds the pre-aggregated counts used by alert analytics.
+    """
+
+    def __init__(self, alerts=()):
+        self._ids = itertools.count(1)
+        self._alerts = {}       # id -> alert, active and dismissed
+        self._by_time = []      # (time, id) of active alerts
+        self._by_type = {}      # type -> [(time, id)]
+        self._by_product = {}   # product -> [(time, id)]
+        self._dismissed = []    # (dismissed_at, id)
+        self.counts = Counter()  # active alerts per type
+        self.rollups = AlertRollups()
+        self.version = 0
+        self.extend(alerts)
+
+    def __len__(self):
+        return len(self._by_time)
+
+    def __iter__(self):
+        """Active alerts, newest first"""
+        return (self._alerts[i] for _, i in reversed(self._by_time))
+
+    def get(self, alert_id):
+        return self._alerts.get(alert_id)
+
+    def add(self, alert):
+        """Store ``alert`` (a dict with time, type, message and product); returns its id"""
+        alert_id = next(self._ids)
+        alert["id"] = alert_id
+        alert.setdefault("dismissed_at", None)
+        self._alerts[alert_id] = alert
+        key = (alert["time"], alert_id)
+        _insert(self._by_time, key)
+        _insert(self._by_type.setdefault(alert["type"], []), key)
+        _insert(self._by_product.setdefault(alert["product"], []), key)
+        self.counts[alert["type"]] += 1
+        self.rollups.record_alert(alert)
+        self.version += 1
+        return alert_id
+
+    def extend(self, alerts):
+        for alert in alerts:
+            self.add(alert)
+
+    def dismiss(self, alert_id, at=None):
+        """Take an alert out of the active indexes; returns False if it was not active"""
+        return self.dismiss_many([alert_id], at) == 1
+
+    def dismiss_many(self, alert_ids, at=None):
+        """Dismiss a batch of alerts, rewriting each affected index once; returns the number dismissed"""
+        at = at or datetime.now()
+        gone = set()
+        types, products = set(), set()
+        for alert_id in alert_ids:
+            alert = self._alerts.get(alert_id)
+            if alert is None or alert["dismissed_at"] is not None:
+                continue
+            alert["dismissed_at"] = at
+            gone.add(alert_id)
+            types.add(alert["type"])
+            products.add(alert["product"])
+            self.counts[alert["type"]] -= 1
+            self.rollups.record_ack(alert)
+            _insert(self._dismissed, (at, alert_id))
+        if len(gone) == 1:
+            alert = self._alerts[next(iter(gone))]
+            key = (alert["time"], alert["id"])
+            for index in (self._by_time, self._by_type[alert["type"]], self._by_product[alert["product"]]):
+                _remove(index, key)
+        elif gone:
+            for index in itertools.chain([self._by_time], (self._by_type[t] for t in types),
+                                         (self._by_product[p] for p in products)):
+                index[:] = [key for key in index if key[1] not in gone]
+        if gone:
+            self.version += 1
+        return len(gone)
+
+    def dismissed_since(self, since):
+        """Number of alerts dismissed at or after ``since``"""
+        return len(self._dismissed) - bisect_left(self._dismissed, (since, 0))
+
+    def _index(self, alert_type=None, product=None):
+        """The smallest index covering the filters, plus a predicate for the filter it does not cover"""
+        if product is not None:
+            index = self._by_product.get(product, [])
+            if alert_type is not None:
+                return index, lambda alert: alert["type"] == alert_type
+            return index, None
+        if alert_type is not None:
+            return self._by_type.get(alert_type, []), None
+        return self._by_time, None
+
+    @staticmethod
+    def _bounds(index, start, end):
+        lo = 0 if start is None else bisect_left(index, (start, 0))
+        hi = len(index) if end is None else bisect_right(index, (end, _AFTER_ANY_ID))
+        return lo, hi
+
+    def count(self, start=None, end=None, alert_type=None, product=None):
+        """Active alerts in [start, end] matching the filters"""
+        index, predicate = self._index(alert_type, product)
+        lo, hi = self._bounds(index, start, end)
+        if predicate is None:
+            return hi - lo
+        return sum(1 for _, i in index[lo:hi] if predicate(self._alerts[i]))
+
+    def page(self, cursor=None, limit=25, start=None, end=None, alert_type=None, product=None):
+        """Up to ``limit`` matching alerts older than ``cursor``, newest first.
+
+        Returns ``(alerts, next_cursor)``; pass ``next_cursor`` back to get the
+        following page, it is None once the range is exhausted. Cursors are
+        (time, id) keys, so pages stay stable while alerts arrive or are
+        dismissed.
+        """
+        index, predicate = self._index(alert_type, product)
+        lo, hi = self._bounds(index, start, end)
+        if cursor is not None:
+            hi = min(hi, bisect_left(index, cursor))
+        found = []
+        position = hi - 1
+        while position >= lo and (limit is None or len(found) < limit):
+            alert = self._alerts[index[position][1]]
+            if predicate is None or predicate(alert):
+                found.append(alert)
+            position -= 1
+        next_cursor = (found[-1]["time"], found[-1]["id"]) if found and position >= lo else None
+        return found, next_cursor
+
+    def query(self, start=None, end=None, alert_type=None, product=None, limit=None):
+        """Active alerts in [start, end] matching the filters, newest first"""
+        return self.page(None, limit, start, end, alert_type, product)[0]
+
+    def prune(self, before):
+        """Forget alerts raised before ``before``; returns the number removed"""
+        cut = bisect_left(self._by_time, (before, 0))
+        stale = [i for _, i in self._by_time[:cut]]
+        del self._by_time[:cut]
+        for index in itertools.chain(self._by_type.values(), self._by_product.values()):
+            del index[:bisect_left(index, (before, 0))]
+        for alert_id in stale:
+            self.counts[self._alerts.pop(alert_id)["type"]] -= 1
+        # Dismissed alerts are pruned by when they were raised, like active ones
+        gone = [i for i, alert in self._alerts.items() if alert["dismissed_at"] is not None and alert["time"] < before]
+        for alert_id in gone:
+            del self._alerts[alert_id]
+        if gone:
+            self._dismissed = [key for key in self._dismissed if key[1] in self._alerts]
+        if stale or gone:
+            self.version += 1
+        return len(stale) + len(gone)
@@ -0,0 +1,171 @@
+"""Priority scheduling of tracked URLs by next-due time"""
+import heapq
+import itertools
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+FREQUENCIES = {
+    "Every 15 minutes": 15 * 60,
+    "Every Hour": 60 * 60,
+    "Every 6 Hours": 6 * 60 * 60,
+    "Daily": 24 * 60 * 60,
+    "Weekly": 7 * 24 * 60 * 60,
+}
+
+PEAK_HOURS = range(9, 17)
+
+
+class CrawlScheduler:
+    """Orders tracked URLs by when they are next due, per competitor domain.
+
+    Each domain keeps a heap of (due, seq, url); a second heap orders domains
+    by the time their head URL may run, i.e. max(head due, domain's next
+    rate-limit slot). Picking a URL pops both heaps and pushes them back, so
+    it costs O(log n) no matter how many URLs are tracked or backlogged.
+    Superseded heap entries are dropped lazily when they reach the top.
+
+    Volatile SKUs (see ``update_volatility``) and peak hours shorten the
+    interval before a URL is due again, down to ``min_interval`` seconds.
+    """
+
+    def __init__(self, requests_per_minute=10, peak_hours=False, peak_factor=0.5,
+                 volatility_weight=10.0, min_interval=300, clock=time.time):
+        self.requests_per_minute = requests_per_minute
+        self.peak_hours = peak_hours
+        self.peak_factor = peak_factor
+        self.volatility_weight = volatility_weight
+        self.min_interval = min_interval
+        self.clock = clock
+        self._seq = itertools.count()
+        self._entries = {}       # url -> entry dict
+        self._by_sku = {}        # sku -> set of urls
+        self._volatility = {}    # sku -> coefficient of variation
+        self._domains = {}       # domain -> {"heap", "next_allowed", "version", "key"}
+        self._ready = []         # (key, version, domain)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return url in self._entries
+
+    def configure(self, requests_per_minute=None, peak_hours=None):
+        """Apply changed crawl settings to future picks"""
+        if requests_per_minute is not None:
+            self.requests_per_minute = requests_per_minute
+        if peak_hours is not None:
+            self.peak_hours = peak_hours
+
+    def interval_for(self, entry, at):
+        """Seconds until ``entry`` is due again when rescheduled at time ``at``"""
+        interval = entry["interval"] / (1 + self.volatility_weight * self._volatility.get(entry["target"].get("sku"), 0.0))
+        if self.peak_hours and datetime.fromtimestamp(at).hour in PEAK_HOURS:
+            interval *= self.peak_factor
+        return max(interval, min(self.min_interval, entry["interval"]))
+
+    def _push(self, entry, due):
+        entry["due"] = due
+        entry["seq"] = next(self._seq)
+        domain = self._domains[entry["domain"]]
+        heapq.heappush(domain["heap"], (due, entry["seq"], entry["target"]["url"]))
+        self._refresh_domain(entry["domain"])
+
+    def _head(self, domain):
+        heap = domain["heap"]
+        while heap:
+            due, seq, url = heap[0]
+            entry = self._entries.get(url)
+            if entry is not None and entry["seq"] == seq:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _refresh_domain(self, name):
+        domain = self._domains[name]
+        head = self._head(domain)
+        key = None if head is None else max(head[0], domain["next_allowed"])
+        if key == domain["key"]:
+            return  # the queued entry for this domain is still accurate
+        domain["version"] += 1
+        domain["key"] = key
+        if key is not None:
+            heapq.heappush(self._ready, (key, domain["version"], name))
+
+    def add(self, target, frequency="Every Hour", due=None):
+        """Track ``target`` (a dict with at least ``url``), first due at ``due`` (default: now)"""
+        url = target["url"]
+        self.remove(url)
+        name = urlsplit(url).hostname or ""
+        self._domains.setdefault(name, {"heap": [], "next_allowed": 0.0, "version": 0, "key": None})
+        interval = FREQUENCIES[frequency] if isinstance(frequency, str) else float(frequency)
+        entry = {"target": target, "domain": name, "interval": interval, "due": None, "seq": None}
+        self._entries[url] = entry
+        if target.get("sku") is not None:
+            self._by_sku.setdefault(target["sku"], set()).add(url)
+        self._push(entry, self.clock() if due is None else due)
+
+    def remove(self, url):
+        """Stop tracking ``url``; its heap entries are discarded lazily"""
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return False
+        urls = self._by_sku.get(entry["target"].get("sku"))
+        if urls is not None:
+            urls.discard(url)
+        return True
+
+    def update_volatility(self, volatility):
+        """Record per-SKU volatility (mapping sku -> coefficient of variation).
+
+        URLs whose shortened interval makes them due sooner than currently
+        scheduled are moved forward right away.
+        """
+        now = self.clock()
+        for sku, value in volatility.items():
+            self._volatility[sku] = float(value)
+            for url in self._by_sku.get(sku, ()):
+                entry = self._entries[url]
+                due = now + self.interval_for(entry, now)
+                if due < entry["due"]:
+                    self._push(entry, due)
+
+    def next_due(self):
+        """Earliest time any URL may be picked, or None when nothing is tracked"""
+        while self._ready:
+            key, version, name = self._ready[0]
+            if self._domains[name]["version"] == version:
+                return key
+            heapq.heappop(self._ready)
+        return None
+
+    def pop_due(self, now=None, limit=None):
+        """Targets that are due by ``now`` and allowed by their domain's rate limit.
+
+        Each returned URL is rescheduled for its next run before returning.
+        """
+        now = self.clock() if now is None else now
+        spacing = 60.0 / self.requests_per_minute
+        picked = []
+        while self._ready and (limit is None or len(picked) < limit):
+            key, version, name = self._ready[0]
+            domain = self._domains[name]
+            if domain["version"] != version:
+                heapq.heappop(self._ready)
+                continue
+            if key > now:
+                break
+            heapq.heappop(self._ready)
+            domain["key"] = None
+            head = self._head(domain)
+            if head is None:
+                continue
+            if max(head[0], domain["next_allowed"]) > now:
+                self._refresh_domain(name)  # the queued head was removed; requeue the real one
+                continue
+            heapq.heappop(domain["heap"])
+            entry = self._entries[head[2]]
+            picked.append(entry["target"])
+            domain["next_allowed"] = max(now, domain["next_allowed"]) + spacing
+            self._push(entry, now + self.interval_for(entry, now))
+        return picked
@@ -0,0 +1,232 @@
+"""Asynchronous competitor price crawler"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+import numpy as np
+
+DEFAULT_SETTINGS = {
+    "concurrency": 100,
+    "requests_per_minute": 10,
+    "burst": 1,
+    "proxies": [],
+    "timeout": 20,
+    "max_retries": 3,
+    "backoff_base": 0.5,
+    "backoff_max": 30.0,
+    "user_agent": "PriceIQ-Crawler/1.0",
+    "extract_shipping": True,
+    "extract_availability": True,
+}
+
+# Statuses worth another attempt; everything else 4xx is final
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+_META_PRICE = re.compile(r'itemprop=["\']price["\'][^>]*content=["\']([\d.,]+)["\']', re.I)
+_JSONLD_PRICE = re.compile(r'"price"\s*:\s*"?([\d.,]+)"?', re.I)
+_SHIPPING = re.compile(r'"shipping(?:_cost|Cost)?"\s*:\s*"?([\d.,]+)"?', re.I)
+_OUT_OF_STOCK = re.compile(r'OutOfStock|SoldOut|out of stock', re.I)
+
+
+class CrawlError(Exception):
+    """A URL could not be fetched or parsed after all retries"""
+
+
+class RetryableStatus(CrawlError):
+    """Transient HTTP status (throttling or server error) worth another attempt"""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate_per_minute``; ``acquire`` waits for a token.
+
+    Buckets outlive a single crawl and may be shared by crawls running in
+    other threads' event loops, so the token count is guarded by a thread
+    lock that is never held across an ``await``.
+    """
+
+    def __init__(self, rate_per_minute, capacity=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(float(capacity), 1.0)
+        self.tokens = self.capacity
+        self.updated = None
+        self._lock = threading.Lock()
+
+    def configure(self, rate_per_minute, capacity=1):
+        """Change the rate and capacity, keeping the tokens already spent"""
+        with self._lock:
+            self.rate = rate_per_minute / 60.0
+            self.capacity = max(float(capacity), 1.0)
+            self.tokens = min(self.tokens, self.capacity)
+
+    async def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.updated is not None:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+def _number(text):
+    return float(text.replace(",", ""))
+
+
+def parse_price_page(body, content_type=""):
+    """Extract price, availability and shipping from a JSON or HTML product page.
+
+    Raises ``CrawlError`` when the page has no usable price.
+    """
+    try:
+        return _parse_price_page(body, content_type)
+    except (ValueError, TypeError) as exc:
+        raise CrawlError(f"unreadable price: {exc}") from exc
+
+
+def _parse_price_page(body, content_type):
+    if "json" in content_type or body.lstrip().startswith("{"):
+        try:
+            doc = json.loads(body)
+        except ValueError:
+            doc = None
+        if isinstance(doc, dict) and "price" in doc:
+            return {
+                "price": float(doc["price"]),
+                "availability": bool(doc.get("availability", True)),
+                "shipping_cost": float(doc.get("shipping_cost", 0) or 0),
+            }
+    match = _META_PRICE.search(body) or _JSONLD_PRICE.search(body)
+    if not match:
+        raise CrawlError("no price found in page")
+    shipping = _SHIPPING.search(body)
+    return {
+        "price": _number(match.group(1)),
+        "availability": not _OUT_OF_STOCK.search(body),
+        "shipping_cost": _number(shipping.group(1)) if shipping else 0.0,
+    }
+
+
+class CrawlEngine:
+    """Fetches tracked URLs concurrently while respecting per-domain rate limits.
+
+    Targets are dicts with ``url``, ``product_id``, ``product_name``, ``sku``
+    and ``source``. One pooled ``aiohttp`` session serves a whole crawl, a
+    semaphore caps requests in flight, each domain gets its own token bucket
+    and failed requests are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, settings=None, **overrides):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {}), **overrides}
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._proxies = itertools.cycle(self.settings["proxies"]) if self.settings["proxies"] else None
+
+    def configure(self, settings=None, **overrides):
+        """Apply changed settings; domain buckets keep their spent tokens across crawls"""
+        previous = self.settings
+        self.settings = {**previous, **(settings or {}), **overrides}
+        if self.settings["proxies"] != previous["proxies"]:
+            self._proxies = itertools.cycle(self.settings["proxies"]) if self.settings["proxies"] else None
+        if (self.settings["requests_per_minute"], self.settings["burst"]) != (previous["requests_per_minute"],
+                                                                               previous["burst"]):
+            with self._buckets_lock:
+                for bucket in self._buckets.values():
+                    bucket.configure(self.settings["requests_per_minute"], self.settings["burst"])
+
+    def _bucket(self, url):
+        domain = urlsplit(url).hostname or ""
+        with self._buckets_lock:
+            bucket = self._buckets.get(domain)
+            if bucket is None:
+                bucket = TokenBucket(self.settings["requests_per_minute"], self.settings["burst"])
+                self._buckets[domain] = bucket
+        return bucket
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.settings["backoff_max"])
+        delay = self.settings["backoff_base"] * 2 ** attempt
+        return min(delay, self.settings["backoff_max"]) * random.uniform(0.5, 1.0)
+
+    async def _fetch(self, session, semaphore, target):
+        url = target["url"]
+        last_error = None
+        for attempt in range(self.settings["max_retries"] + 1):
+            await self._bucket(url).acquire()
+            try:
+                async with semaphore:
+                    proxy = next(self._proxies) if self._proxies else None
+                    async with session.get(url, proxy=proxy) as response:
+                        if response.status in RETRY_STATUSES:
+                            header = response.headers.get("Retry-After", "")
+                            raise RetryableStatus(response.status, float(header) if header.isdigit() else None)
+                        if response.status >= 400:
+                            raise CrawlError(f"HTTP {response.status}")
+                        try:
+                            body = await response.text()
+                        except (UnicodeDecodeError, LookupError) as exc:
+                            raise CrawlError(f"undecodable page: {exc}") from exc
+                        parsed = parse_price_page(body, response.headers.get("Content-Type", ""))
+                        return {**target, **parsed, "ok": True, "fetched_at": datetime.now(), "attempts": attempt + 1}
+            except (aiohttp.ClientError, asyncio.TimeoutError, RetryableStatus) as exc:
+                last_error = exc
+                if attempt < self.settings["max_retries"]:
+                    await asyncio.sleep(self._backoff(attempt, getattr(exc, "retry_after", None)))
+            except CrawlError as exc:
+                # Client errors and pages without a price will not change on retry
+                last_error = exc
+                break
+        return {**target, "ok": False, "error": str(last_error) or type(last_error).__name__,
+                "attempts": attempt + 1}
+
+    async def crawl(self, targets):
+        """Fetch every target; returns one result dict per target, in input order"""
+        connector = aiohttp.TCPConnector(limit=self.settings["concurrency"], ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.settings["timeout"])
+        headers = {"User-Agent": self.settings["user_agent"]}
+        semaphore = asyncio.Semaphore(self.settings["concurrency"])
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            results = await asyncio.gather(*(self._fetch(session, semaphore, t) for t in targets),
+                                           return_exceptions=True)
+        # An unexpected failure costs its own URL, never the rest of the crawl
+        return [
+            {**target, "ok": False, "error": str(result) or type(result).__name__, "attempts": 1}
+            if isinstance(result, BaseException) else result
+            for target, result in zip(targets, results)
+        ]
+
+    def run(self, targets):
+        """Synchronous entry point for callers outside an event loop (e.g. Streamlit)"""
+        return asyncio.run(self.crawl(targets))
+
+
+def results_to_columns(results, extract_shipping=True, extract_availability=True):
+    """Successful crawl results as a column batch for ``PriceHistoryStore.extend``"""
+    ok = [r for r in results if r.get("ok")]
+    if not ok:
+        return None
+    return {
+        "date": np.array([r["fetched_at"] for r in ok], dtype="datetime64[ns]"),
+        "product_id": np.array([r["product_id"] for r in ok], dtype=np.int32),
+        "product_name": [r["product_name"] for r in ok],
+        "sku": [r["sku"] for r in ok],
+        "source": [r["source"] for r in ok],
+        "price": np.array([r["price"] for r in ok], dtype=np.float32),
+        "availability": np.array([r["availability"] if extract_availability else True for r in ok], dtype=np.bool_),
+        "shipping_cost": np.array([r["shipping_cost"] if extract_shipping else 0.0 for r in ok], dtype=np.float32),
+    }
@@ -0,0 +1,68 @@
+"""Downsampling of long price time series before plotting"""
+import numpy as np
+
+# Points kept per trace, about the pixel width of a dashboard chart
+DEFAULT_POINTS = 800
+
+# Min/max bucketing keeps every bucket's extreme prices exactly; LTTB keeps the visual shape
+DEFAULT_METHOD = "minmax"
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Means of each bucket's successor, computed for all buckets at once
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])[1:]
+    mean_y = np.append(sums_y / counts, y[-1])[1:]
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        area = np.abs((x[previous] - mean_x[bucket]) * (y[lo:hi] - y[previous])
+                      - (x[previous] - x[lo:hi]) * (mean_y[bucket] - y[previous]))
+        previous = lo + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax_indices(y, n_out):
+    """Indices of the minimum and maximum of ``n_out // 2`` equal-count buckets, in order"""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    buckets = np.repeat(np.arange(n_out // 2), np.diff(np.linspace(0, n, n_out // 2 + 1).astype(np.int64)))
+    order = np.lexsort((y, buckets))
+    starts = np.searchsorted(buckets[order], np.arange(n_out // 2))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([order[starts], order[ends], [0, n - 1]]))
+
+
+def downsample(x, y, n_out=DEFAULT_POINTS, method=DEFAULT_METHOD):
+    """(x, y) reduced to about ``n_out`` points with LTTB or min/max bucketing"""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    keep = lttb_indices(x, y, n_out) if method == "lttb" else minmax_indices(y, n_out)
+    return x[keep], y[keep]
@@ -0,0 +1,49 @@
+"""LRU cache of built Plotly figures, scoped to a data version"""
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """Built figures keyed on (chart, params), valid for one data version.
+
+    ``get`` returns the cached figure when the chart was already built for the
+    same parameters and data version, and calls ``build`` otherwise. The first
+    lookup with a new version drops every figure built from older data, and
+    the least recently used figure is evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._figures)
+
+    def get(self, chart, params, version, build):
+        key = (chart, params)
+        with self._lock:
+            if version != self.version:
+                self._figures.clear()
+                self.version = version
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return figure
+        # Built outside the lock so slow charts do not block other sessions
+        figure = build(*params)
+        with self._lock:
+            self.misses += 1
+            if version == self.version:
+                self._figures[key] = figure
+                while len(self._figures) > self.max_entries:
+                    self._figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
@@ -0,0 +1,150 @@
+"""Persistent review queue of product matches in SQLite"""
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+STATUSES = ["pending", "approved", "rejected"]
+
+COLUMNS = ["id", "product_id", "source", "url", "title", "listing_sku", "price", "confidence", "method",
+           "status", "found", "reviewed"]
+
+# Ids bound per statement; SQLite limits host parameters per statement
+_IDS_PER_STATEMENT = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL,
+    source TEXT,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    listing_sku TEXT,
+    price REAL,
+    confidence REAL NOT NULL,
+    method TEXT,
+    status TEXT NOT NULL,
+    found TEXT NOT NULL,
+    reviewed TEXT,
+    run INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_by_confidence ON matches (status, confidence DESC, id);
+"""
+
+
+def _chunks(ids):
+    ids = [int(i) for i in ids]
+    for start in range(0, len(ids), _IDS_PER_STATEMENT):
+        yield ids[start:start + _IDS_PER_STATEMENT]
+
+
+class MatchReviewQueue:
+    """Matches of competitor listings to products, kept in ``path`` across restarts.
+
+    One row per listing URL. ``add`` stores a matching run in a single
+    transaction; a listing already approved or rejected keeps that decision
+    when a later run finds it again, while pending ones take the new product
+    and confidence. Pages are read best-confidence first through an index on
+    (status, confidence), and ``review`` approves or rejects a whole batch of
+    ids in one transaction.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def __len__(self):
+        return sum(self.counts().values())
+
+    def add(self, matches):
+        """Queue the routed matches of one run (``product_matching.MATCH_COLUMNS``).
+
+        Returns the rows this run stored as approved, so they can be tracked.
+        """
+        if not len(matches):
+            return pd.DataFrame(columns=COLUMNS)
+        now = datetime.now().isoformat(timespec="seconds")
+        frame = matches[["product_id", "source", "url", "title", "listing_sku", "price", "confidence", "method",
+                         "status"]].astype(object).where(matches.notna(), None)
+        rows = [row + (now,) for row in frame.itertuples(index=False, name=None)]
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                run = cursor.execute("SELECT COALESCE(MAX(run), 0) + 1 FROM matches").fetchone()[0]
+                cursor.executemany(
+                    """INSERT INTO matches (product_id, source, url, title, listing_sku, price, confidence, method,
+                                            status, found, run)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (url) DO UPDATE SET
+                           product_id = excluded.product_id, title = excluded.title,
+                           listing_sku = excluded.listing_sku, price = excluded.price,
+                           confidence = excluded.confidence, method = excluded.method,
+                           status = excluded.status, found = excluded.found, run = excluded.run
+                       WHERE matches.status = 'pending'""",
+                    [row + (run,) for row in rows],
+                )
+                approved = self._select(cursor, "WHERE status = 'approved' AND run = ?", (run,))
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        return approved
+
+    def _select(self, cursor, where, params):
+        cursor.execute(f"SELECT {', '.join(COLUMNS)} FROM matches {where}", params)
+        return pd.DataFrame(cursor.fetchall(), columns=COLUMNS)
+
+    def page(self, status="pending", offset=0, limit=50):
+        """One page of matches with ``status``, highest confidence first"""
+        with self._lock:
+            return self._select(self._connection.cursor(),
+                                "WHERE status = ? ORDER BY confidence DESC, id LIMIT ? OFFSET ?",
+                                (status, int(limit), int(offset)))
+
+    def counts(self):
+        """Number of matches per status"""
+        with self._lock:
+            found = dict(self._connection.execute("SELECT status, COUNT(*) FROM matches GROUP BY status"))
+        return {status: found.get(status, 0) for status in STATUSES}
+
+    def approved(self):
+        """Every approved match"""
+        with self._lock:
+            return self._select(self._connection.cursor(), "WHERE status = 'approved' ORDER BY id", ())
+
+    def review(self, ids, status):
+        """Approve or reject the pending matches in ``ids`` in one transaction; returns the rows changed"""
+        if status not in ("approved", "rejected"):
+            raise ValueError(f"Unknown review status: {status}")
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                changed = []
+                for chunk in _chunks(ids):
+                    marks = ", ".join("?" * len(chunk))
+                    changed.append(self._select(cursor, f"WHERE status = 'pending' AND id IN ({marks})", chunk))
+                    cursor.execute(f"UPDATE matches SET status = ?, reviewed = ? "
+                                   f"WHERE status = 'pending' AND id IN ({marks})", [status, now, *chunk])
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        changed = [frame for frame in changed if len(frame)]
+        if not changed:
+            return pd.DataFrame(columns=COLUMNS)
+        reviewed = pd.concat(changed, ignore_index=True)
+        reviewed["status"], reviewed["reviewed"] = status, now
+        return reviewed
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,320 @@
+"""Asynchronous delivery of alert notifications to email, Slack, SMS and webhooks"""
+import asyncio
+import logging
+import random
+import smtplib
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import aiohttp
+
+from crawler import RETRY_STATUSES
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("email", "slack", "sms", "webhook")
+
+# Channel names used by alert rules -> dispatcher channel ("Dashboard" needs no delivery)
+RULE_CHANNELS = {"Email": "email", "Slack": "slack", "SMS": "sms", "Webhook": "webhook"}
+
+DEFAULT_SETTINGS = {
+    "email_enabled": False,
+    "email_address": "",
+    "email_levels": ["critical", "warning"],
+    "digest_mode": False,
+    "digest_time": "08:00",
+    "smtp_host": "localhost",
+    "smtp_port": 25,
+    "smtp_sender": "priceiq@localhost",
+    "slack_enabled": False,
+    "slack_webhook": "",
+    "slack_channel": "#price-alerts",
+    "sms_enabled": False,
+    "phone_number": "",
+    "sms_gateway_url": "",
+    "webhook_enabled": False,
+    "webhook_url": "",
+    "queue_size": 10_000,
+    "workers": {"email": 2, "slack": 4, "sms": 2, "webhook": 4},
+    "batch_window": 2.0,
+    "max_batch": 500,
+    "max_retries": 3,
+    "backoff_base": 0.5,
+    "backoff_max": 60.0,
+    "timeout": 10,
+}
+
+# Alerts listed one by one in a coalesced message; the rest are counted
+SUMMARY_LINES = 20
+
+_SEVERITY_ORDER = ["critical", "warning", "info"]
+
+
+class DeliveryError(Exception):
+    """A notification could not be delivered and retrying will not help"""
+
+
+class RetryableDeliveryError(DeliveryError):
+    """Transient delivery failure (throttling or server error) worth another attempt"""
+
+
+def summarize(alerts, overflow=0, title=None):
+    """Subject and body for a batch of alerts; a burst collapses into one message"""
+    if len(alerts) == 1 and not overflow and title is None:
+        alert = alerts[0]
+        return (f"[PriceIQ {alert['type'].upper()}] {alert['message']}",
+                f"{alert['message']}\nProduct: {alert['product']}\nTime: {alert['time']:%Y-%m-%d %H:%M}")
+    total = len(alerts) + overflow
+    by_trigger = Counter(a.get("trigger", "Other") for a in alerts)
+    worst = min((a["type"] for a in alerts), key=_SEVERITY_ORDER.index, default="info")
+    subject = f"[PriceIQ {worst.upper()}] {title or f'{total} alerts'}: " + ", ".join(
+        f"{count} {trigger}" for trigger, count in by_trigger.most_common(3))
+    lines = [f"- {a['time']:%H:%M} {a['message']} ({a['product']})" for a in alerts[:SUMMARY_LINES]]
+    if len(alerts) > len(lines):
+        lines.append(f"... and {len(alerts) - len(lines)} more")
+    if overflow:
+        lines.append(f"{overflow} more alerts were not queued because the notification queue was full")
+    return subject, "\n".join(lines)
+
+
+class NotificationDispatcher:
+    """Sends alert notifications from a background event loop without blocking callers.
+
+    ``submit`` hands alerts to the loop thread, which routes each one to its
+    channels' bounded queues; when a queue is full the alert is only counted
+    and mentioned in the next message. Every channel has its own pool of
+    workers. Workers take turns collecting a batch: the collecting worker
+    waits ``batch_window`` seconds after the first alert, so a burst goes out
+    as one coalesced message while other workers are still sending. Failed
+    sends are retried with exponential backoff and jitter. In digest mode,
+    email alerts are held and sent together at ``digest_time`` each day.
+    """
+
+    def __init__(self, settings=None, **overrides):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {}), **overrides}
+        self.stats = {channel: Counter() for channel in CHANNELS}
+        self.last_error = {}
+        self._overflow = Counter()
+        self._digest = []
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._queues = {}
+        self._start_lock = threading.Lock()
+
+    def configure(self, settings):
+        """Apply changed settings; queue size and worker counts apply from the next start"""
+        self.settings.update(settings)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,), name="notification-dispatcher", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def _run(self, ready):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._queues = {channel: asyncio.Queue(self.settings["queue_size"]) for channel in CHANNELS}
+        self._collecting = {channel: asyncio.Lock() for channel in CHANNELS}
+        self._session = loop.run_until_complete(self._open_session())
+        for channel in CHANNELS:
+            for _ in range(self.settings["workers"][channel]):
+                loop.create_task(self._worker(channel))
+        loop.create_task(self._digest_loop())
+        ready.set()
+        loop.run_forever()
+        # Stopped by ``stop``: end the idle workers and the digest timer before closing the loop
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+    async def _open_session(self):
+        return aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.settings["timeout"]))
+
+    def stop(self, timeout=10):
+        """Deliver what is queued, then shut the loop thread down"""
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        self._thread.join(timeout)
+        self._thread = None
+
+    async def _shutdown(self):
+        await self.drain()
+        await self._session.close()
+        self._loop.call_soon(self._loop.stop)
+
+    async def drain(self):
+        """Wait until every queued notification was delivered or gave up"""
+        await asyncio.gather(*(queue.join() for queue in self._queues.values()))
+
+    def flush(self, timeout=60):
+        """Block until the queues are empty (for callers outside the loop)"""
+        if self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self.drain(), self._loop).result(timeout)
+
+    def routes(self, alert):
+        """Enabled channels an alert should go to, given its rule's channels and severity"""
+        s = self.settings
+        wanted = alert.get("channels")
+        channels = [RULE_CHANNELS[c] for c in wanted if c in RULE_CHANNELS] if wanted is not None else CHANNELS
+        routed = []
+        for channel in channels:
+            if not s[f"{channel}_enabled"]:
+                continue
+            if channel == "email" and alert["type"] not in s["email_levels"]:
+                continue
+            if channel == "sms" and alert["type"] != "critical":
+                continue
+            routed.append(channel)
+        return routed
+
+    def submit(self, alerts):
+        """Queue alerts for delivery; returns immediately"""
+        if not alerts:
+            return
+        self.start()
+        self._loop.call_soon_threadsafe(self._enqueue, [dict(alert) for alert in alerts])
+
+    def send_digest(self, timeout=60):
+        """Send the pending email digest now instead of at the digest time"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._send_digest(), self._loop).result(timeout)
+
+    def pending_digest(self):
+        return len(self._digest)
+
+    def _enqueue(self, alerts):
+        for alert in alerts:
+            for channel in self.routes(alert):
+                if channel == "email" and self.settings["digest_mode"]:
+                    self._digest.append(alert)
+                    continue
+                try:
+                    self._queues[channel].put_nowait(alert)
+                except asyncio.QueueFull:
+                    self._overflow[channel] += 1
+                    self.stats[channel]["overflow"] += 1
+
+    async def _worker(self, channel):
+        queue = self._queues[channel]
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._collecting[channel]:
+                batch = [await queue.get()]
+                deadline = loop.time() + self.settings["batch_window"]
+                while len(batch) < self.settings["max_batch"]:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            overflow, self._overflow[channel] = self._overflow[channel], 0
+            try:
+                await self._deliver(channel, batch, *summarize(batch, overflow))
+            except Exception as exc:
+                # A bug in one batch must not end the channel's worker
+                logger.exception("%s notification batch of %d alerts failed", channel, len(batch))
+                self.last_error[channel] = str(exc) or type(exc).__name__
+                self.stats[channel]["failed"] += 1
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _backoff(self, attempt):
+        delay = self.settings["backoff_base"] * 2 ** attempt
+        return min(delay, self.settings["backoff_max"]) * random.uniform(0.5, 1.0)
+
+    async def _deliver(self, channel, alerts, subject, text):
+        stats = self.stats[channel]
+        for attempt in range(self.settings["max_retries"] + 1):
+            try:
+                await self._send(channel, alerts, subject, text)
+            except (RetryableDeliveryError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as exc:
+                self.last_error[channel] = str(exc) or type(exc).__name__
+                if attempt < self.settings["max_retries"]:
+                    stats["retries"] += 1
+                    await asyncio.sleep(self._backoff(attempt))
+            except DeliveryError as exc:
+                self.last_error[channel] = str(exc)
+                break
+            else:
+                stats["messages"] += 1
+                stats["alerts"] += len(alerts)
+                return True
+        stats["failed"] += 1
+        return False
+
+    async def _send(self, channel, alerts, subject, text):
+        s = self.settings
+        if channel == "email":
+            await asyncio.get_running_loop().run_in_executor(None, self._send_email, subject, text)
+        elif channel == "slack":
+            await self._post(s["slack_webhook"], {"channel": s["slack_channel"], "text": f"*{subject}*\n{text}"})
+        elif channel == "sms":
+            await self._post(s["sms_gateway_url"], {"to": s["phone_number"], "message": subject})
+        else:
+            await self._post(s["webhook_url"], {
+                "subject": subject,
+                "alerts": [{**a, "time": a["time"].isoformat(),
+                            "dismissed_at": a["dismissed_at"].isoformat() if a.get("dismissed_at") else None}
+                           for a in alerts],
+            })
+
+    def _send_email(self, subject, text):
+        if not self.settings["email_address"]:
+            raise DeliveryError("no email address configured")
+        message = EmailMessage()
+        message["From"] = self.settings["smtp_sender"]
+        message["To"] = self.settings["email_address"]
+        message["Subject"] = subject
+        message.set_content(text)
+        with smtplib.SMTP(self.settings["smtp_host"], self.settings["smtp_port"], timeout=self.settings["timeout"]) as smtp:
+            smtp.send_message(message)
+
+    async def _post(self, url, payload):
+        if not url:
+            raise DeliveryError("no URL configured")
+        async with self._session.post(url, json=payload) as response:
+            if response.status in RETRY_STATUSES:
+                raise RetryableDeliveryError(f"HTTP {response.status}")
+            if response.status >= 400:
+                raise DeliveryError(f"HTTP {response.status}")
+
+    def next_digest(self, now=None):
+        """Next time the daily digest is due"""
+        now = now or datetime.now()
+        hour, minute = (int(part) for part in self.settings["digest_time"].split(":"))
+        due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return due if due > now else due + timedelta(days=1)
+
+    async def _send_digest(self):
+        alerts, self._digest = self._digest, []
+        if not alerts:
+            return False
+        subject, text = summarize(alerts, title=f"Daily digest, {len(alerts)} alerts")
+        return await self._deliver("email", alerts, subject, text)
+
+    async def _digest_loop(self):
+        due = self.next_digest()
+        while True:
+            # Wake at least every minute so a changed digest time is picked up
+            await asyncio.sleep(min(60.0, max((due - datetime.now()).total_seconds(), 0.0)))
+            if datetime.now() < due:
+                due = self.next_digest()
+                continue
+            try:
+                await self._send_digest()
+            except Exception:
+                logger.exception("email digest failed")
+            due = self.next_digest()
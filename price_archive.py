@@ -0,0 +1,120 @@
+"""Parquet persistence for price history, partitioned by day and category"""
+import shutil
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from price_history import COLUMNS, PriceHistoryStore
+
+PARTITIONING = ds.partitioning(pa.schema([("day", pa.date32()), ("category", pa.string())]), flavor="hive")
+
+DEFAULT_CATEGORY = "Uncategorized"
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+class ParquetPriceArchive:
+    """On-disk price history under ``root/day=YYYY-MM-DD/category=<name>/``.
+
+    Each ``append`` writes new files next to the existing ones, and reads build
+    a lazy dataset whose filters are pushed down: the day/category predicates
+    prune whole directories and sku/source/date predicates are evaluated
+    against Parquet row-group statistics before any rows are decoded.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _dataset(self):
+        if not self.root.exists() or not any(self.root.iterdir()):
+            return None
+        return ds.dataset(str(self.root), format="parquet", partitioning=PARTITIONING)
+
+    def append(self, frame, product_categories=None):
+        """Write a price-history frame; ``product_categories`` maps product_id -> category (dict or Series)"""
+        if len(frame) == 0:
+            return 0
+        table = pa.Table.from_pandas(frame[list(COLUMNS)], preserve_index=False)
+        day = pa.array(frame["date"].to_numpy().astype("datetime64[D]"), type=pa.date32())
+        if product_categories is not None and len(product_categories):
+            category = frame["product_id"].map(product_categories).fillna(DEFAULT_CATEGORY)
+        else:
+            category = pd.Series(DEFAULT_CATEGORY, index=frame.index)
+        table = table.append_column("day", day).append_column("category", pa.array(category.to_numpy(dtype=object)))
+        ds.write_dataset(
+            table,
+            str(self.root),
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        return len(frame)
+
+    def read(self, start=None, end=None, skus=None, sources=None, categories=None, columns=None):
+        """Observations in [start, end] for the given skus/sources/categories as a DataFrame"""
+        columns = list(columns or COLUMNS)
+        dataset = self._dataset()
+        if dataset is None:
+            return PriceHistoryStore(capacity=1).to_frame()[columns]
+
+        predicate = None
+
+        def _and(expr):
+            return expr if predicate is None else predicate & expr
+
+        if start is not None:
+            predicate = _and(ds.field("day") >= pa.scalar(_as_date(start), pa.date32()))
+            predicate = _and(ds.field("date") >= pa.scalar(pd.Timestamp(start), pa.timestamp("ns")))
+        if end is not None:
+            predicate = _and(ds.field("day") <= pa.scalar(_as_date(end), pa.date32()))
+            predicate = _and(ds.field("date") <= pa.scalar(pd.Timestamp(end), pa.timestamp("ns")))
+        if categories:
+            predicate = _and(ds.field("category").isin(list(categories)))
+        if skus:
+            predicate = _and(ds.field("sku").isin(list(skus)))
+        if sources:
+            predicate = _and(ds.field("source").isin(list(sources)))
+
+        table = dataset.to_table(columns=columns, filter=predicate)
+        if "date" in columns and table.num_rows:
+            table = table.take(pc.sort_indices(table, sort_keys=[("date", "ascending")]))
+        return table.to_pandas()
+
+    def days(self):
+        """Sorted list of days that have data on disk"""
+        if not self.root.exists():
+            return []
+        found = []
+        for path in self.root.glob("day=*"):
+            try:
+                found.append(date.fromisoformat(path.name.split("=", 1)[1]))
+            except ValueError:
+                continue
+        return sorted(found)
+
+    def prune(self, before):
+        """Delete every day partition older than ``before``; returns the number removed"""
+        cutoff = _as_date(before)
+        removed = 0
+        for day in self.days():
+            if day < cutoff:
+                shutil.rmtree(self.root / f"day={day.isoformat()}")
+                removed += 1
+        return removed
+
+    def __len__(self):
+        dataset = self._dataset()
+        return 0 if dataset is None else int(dataset.count_rows())
+
@@ -0,0 +1,308 @@
+"""Columnar storage for competitor price observations"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ("date", "product_id", "product_name", "sku", "source", "price", "availability", "shipping_cost")
+
+# Low-cardinality string columns are stored as int32 codes into a per-store dictionary
+CATEGORICAL_COLUMNS = ("product_name", "sku", "source")
+
+NUMERIC_DTYPES = {
+    "date": np.dtype("datetime64[ns]"),
+    "product_id": np.dtype(np.int32),
+    "price": np.dtype(np.float32),
+    "availability": np.dtype(np.bool_),
+    "shipping_cost": np.dtype(np.float32),
+}
+
+
+def _as_datetime64(values, n):
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return values.astype("datetime64[ns]", copy=False)
+    if np.ndim(values) == 0:
+        return np.full(n, np.datetime64(pd.Timestamp(values), "ns"))
+    return pd.to_datetime(values).to_numpy("datetime64[ns]")
+
+
+class LatestPriceMatrix:
+    """Dense product x source matrix of the most recent observation per cell.
+
+    Rows are allocated per product id on first sight and columns are the
+    store's source codes, so lookups never touch the full history.
+    """
+
+    def __init__(self):
+        self._row_of = np.full(16, -1, dtype=np.int64)
+        self.product_ids = []
+        self._n_sources = 0
+        self.price = np.full((0, 0), np.nan, dtype=np.float32)
+        self.date = np.full((0, 0), np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.availability = np.zeros((0, 0), dtype=np.bool_)
+
+    def _rows_for(self, product_ids):
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        top = int(product_ids.max()) + 1
+        if top > len(self._row_of):
+            grown = np.full(max(top, 2 * len(self._row_of)), -1, dtype=np.int64)
+            grown[:len(self._row_of)] = self._row_of
+            self._row_of = grown
+        rows = self._row_of[product_ids]
+        new = np.unique(product_ids[rows < 0])
+        if len(new):
+            self._row_of[new] = np.arange(len(self.product_ids), len(self.product_ids) + len(new))
+            self.product_ids.extend(int(i) for i in new)
+            rows = self._row_of[product_ids]
+        return rows
+
+    def _grow(self, n_rows, n_cols):
+        old_rows, old_cols = self.price.shape
+        if n_rows <= old_rows and n_cols <= old_cols:
+            return
+        shape = (max(n_rows, 2 * old_rows), max(n_cols, old_cols))
+        price = np.full(shape, np.nan, dtype=np.float32)
+        date = np.full(shape, np.datetime64("NaT"), dtype="datetime64[ns]")
+        availability = np.zeros(shape, dtype=np.bool_)
+        price[:old_rows, :old_cols] = self.price
+        date[:old_rows, :old_cols] = self.date
+        availability[:old_rows, :old_cols] = self.availability
+        self.price, self.date, self.availability = price, date, availability
+
+    def update(self, product_ids, source_codes, dates, prices, availability):
+        """Fold a batch of observations into the matrix, keeping the newest per cell"""
+        rows = self._rows_for(product_ids)
+        cols = np.asarray(source_codes, dtype=np.int64)
+        self._n_sources = max(self._n_sources, int(cols.max()) + 1)
+        self._grow(len(self.product_ids), self._n_sources)
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+
+        # Last observation per cell within the batch: sort by (cell, date), take group tails
+        keys = rows * self.price.shape[1] + cols
+        order = np.lexsort((dates.view(np.int64), keys))
+        sorted_keys = keys[order]
+        tails = order[np.append(sorted_keys[1:] != sorted_keys[:-1], True)]
+        r, c = rows[tails], cols[tails]
+        newer = dates[tails].view(np.int64) >= self.date[r, c].view(np.int64)  # NaT sorts first
+        r, c, tails = r[newer], c[newer], tails[newer]
+        self.date[r, c] = dates[tails]
+        self.price[r, c] = np.asarray(prices)[tails]
+        self.availability[r, c] = np.asarray(availability)[tails]
+
+    def rows(self, product_ids):
+        """Matrix row for each product id (-1 when never observed)"""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        rows = np.full(len(product_ids), -1, dtype=np.int64)
+        known = product_ids < len(self._row_of)
+        rows[known] = self._row_of[product_ids[known]]
+        return rows
+
+    def prices(self, product_ids):
+        """(products x sources) price matrix for the given ids, NaN where unseen"""
+        return self._take(self.price, product_ids, np.nan)
+
+    def availabilities(self, product_ids):
+        """(products x sources) availability matrix for the given ids, False where unseen"""
+        return self._take(self.availability, product_ids, False)
+
+    def _take(self, matrix, product_ids, fill):
+        rows = self.rows(product_ids)
+        out = np.full((len(rows), self._n_sources), fill, dtype=matrix.dtype)
+        seen = rows >= 0
+        out[seen] = matrix[rows[seen], :self._n_sources]
+        return out
+
+
+class PriceHistoryStore:
+    """Append-only price history backed by typed NumPy columns.
+
+    Rows are never materialised as dicts: ``append``/``extend`` write straight
+    into preallocated column buffers that grow geometrically, and ``to_frame``
+    returns a DataFrame view that is cached until the next write.
+    """
+
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._capacity = max(int(capacity), 1)
+        self._lock = threading.RLock()
+        self._columns = {name: np.empty(self._capacity, dtype) for name, dtype in NUMERIC_DTYPES.items()}
+        for name in CATEGORICAL_COLUMNS:
+            self._columns[name] = np.empty(self._capacity, np.int32)
+        self._categories = {name: [] for name in CATEGORICAL_COLUMNS}
+        self._lookup = {name: {} for name in CATEGORICAL_COLUMNS}
+        self._mapping_cache = {}
+        self.latest = LatestPriceMatrix()
+        self.version = 0
+        self._frame = None
+        self._frame_version = -1
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """Bytes used by the filled part of the column buffers"""
+        return sum(col[:self._size].nbytes for col in self._columns.values())
+
+    def categories(self, name):
+        """Distinct values seen so far for a categorical column"""
+        return list(self._categories[name])
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, col in self._columns.items():
+            grown = np.empty(capacity, col.dtype)
+            grown[:self._size] = col[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def _code_for(self, name, value):
+        lookup = self._lookup[name]
+        code = lookup.get(value)
+        if code is None:
+            code = len(self._categories[name])
+            lookup[value] = code
+            self._categories[name].append(value)
+        return code
+
+    def _encode(self, name, values, n):
+        """Translate a scalar, array of strings or Categorical into store codes"""
+        if isinstance(values, pd.Series):
+            values = values.array if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy()
+        if isinstance(values, pd.Categorical):
+            # Only the categories need a dictionary lookup; rows are a take().
+            # Batches from the same producer usually share one categories Index.
+            cached = self._mapping_cache.get(name)
+            if cached is not None and cached[0] is values.categories:
+                mapping = cached[1]
+            else:
+                mapping = np.array([self._code_for(name, c) for c in values.categories], dtype=np.int32)
+                self._mapping_cache[name] = (values.categories, mapping)
+            if (values.codes < 0).any():
+                raise ValueError(f"Column '{name}' contains missing values")
+            return mapping[values.codes]
+        if np.ndim(values) == 0:
+            return np.full(n, self._code_for(name, values), dtype=np.int32)
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        if (codes < 0).any():
+            raise ValueError(f"Column '{name}' contains missing values")
+        mapping = np.array([self._code_for(name, u) for u in uniques], dtype=np.int32)
+        return mapping[codes]
+
+    def append(self, date, product_id, product_name, sku, source, price, availability=True, shipping_cost=0.0):
+        """Append a single observation"""
+        with self._lock:
+            self._reserve(1)
+            i = self._size
+            cols = self._columns
+            cols["date"][i] = np.datetime64(pd.Timestamp(date), "ns")
+            cols["product_id"][i] = product_id
+            cols["product_name"][i] = self._code_for("product_name", product_name)
+            cols["sku"][i] = self._code_for("sku", sku)
+            cols["source"][i] = self._code_for("source", source)
+            cols["price"][i] = price
+            cols["availability"][i] = availability
+            cols["shipping_cost"][i] = shipping_cost
+            self.latest.update(cols["product_id"][i:i + 1], cols["source"][i:i + 1], cols["date"][i:i + 1],
+                               cols["price"][i:i + 1], cols["availability"][i:i + 1])
+            self._size += 1
+            self.version += 1
+
+    def extend(self, columns):
+        """Append a batch of observations given as a mapping (or DataFrame) of columns.
+
+        Scalars are broadcast; ``availability`` and ``shipping_cost`` are optional.
+        Returns the number of rows appended.
+        """
+        if isinstance(columns, pd.DataFrame):
+            columns = {name: columns[name] for name in columns.columns}
+        n = max((len(v) for v in columns.values() if np.ndim(v) > 0), default=0)
+        if n == 0:
+            return 0
+        missing = [name for name in COLUMNS if name not in columns and name not in ("availability", "shipping_cost")]
+        if missing:
+            raise KeyError(f"Missing columns: {', '.join(missing)}")
+        with self._lock:
+            encoded = {name: self._encode(name, columns[name], n) for name in CATEGORICAL_COLUMNS}
+            self._reserve(n)
+            start, stop = self._size, self._size + n
+            cols = self._columns
+            cols["date"][start:stop] = _as_datetime64(columns["date"], n)
+            cols["product_id"][start:stop] = np.broadcast_to(np.asarray(columns["product_id"]), n)
+            cols["price"][start:stop] = np.broadcast_to(np.asarray(columns["price"]), n)
+            cols["availability"][start:stop] = np.broadcast_to(np.asarray(columns.get("availability", True)), n)
+            cols["shipping_cost"][start:stop] = np.broadcast_to(np.asarray(columns.get("shipping_cost", 0.0)), n)
+            for name, codes in encoded.items():
+                cols[name][start:stop] = codes
+            self.latest.update(cols["product_id"][start:stop], cols["source"][start:stop], cols["date"][start:stop],
+                               cols["price"][start:stop], cols["availability"][start:stop])
+            self._size = stop
+            self.version += 1
+        return n
+
+    def to_frame(self):
+        """DataFrame view of the history, rebuilt only after the store changes"""
+        with self._lock:
+            if self._frame is not None and self._frame_version == self.version:
+                return self._frame
+            n = self._size
+            data = {}
+            for name in COLUMNS:
+                col = self._columns[name][:n]
+                if name in CATEGORICAL_COLUMNS:
+                    data[name] = pd.Categorical.from_codes(col, categories=pd.Index(self._categories[name]))
+                else:
+                    data[name] = col
+            self._frame = pd.DataFrame(data, copy=False)
+            self._frame_version = self.version
+            return self._frame
+
+    def rows_frame(self, start, stop=None):
+        """DataFrame of rows ``start:stop`` built from the column buffers, without the full frame.
+
+        String columns are categoricals of the values in those rows only, so
+        the cost follows the number of rows rather than the store's size.
+        """
+        with self._lock:
+            stop = self._size if stop is None else min(stop, self._size)
+            start = min(start, stop)
+            data = {}
+            for name in COLUMNS:
+                col = self._columns[name][start:stop]
+                if name in CATEGORICAL_COLUMNS:
+                    codes, inverse = np.unique(col, return_inverse=True)
+                    categories = self._categories[name]
+                    data[name] = pd.Categorical.from_codes(
+                        inverse.astype(np.int32), categories=pd.Index([categories[c] for c in codes], dtype=object))
+                else:
+                    data[name] = col.copy()
+        return pd.DataFrame(data)
+
+    def latest_observation(self, product_id, source):
+        """(price, date, availability) of the newest observation for a product/source, or None"""
+        with self._lock:
+            code = self._lookup["source"].get(source)
+            row = self.latest.rows([product_id])[0]
+            if code is None or row < 0 or np.isnat(self.latest.date[row, code]):
+                return None
+            return (float(self.latest.price[row, code]), pd.Timestamp(self.latest.date[row, code]),
+                    bool(self.latest.availability[row, code]))
+
+    def latest_prices(self, product_ids):
+        """Latest price per product (rows, in the given order) and source (columns)"""
+        with self._lock:
+            matrix = self.latest.prices(product_ids)
+            sources = self._categories["source"][:matrix.shape[1]]
+        return pd.DataFrame(matrix, index=pd.Index(product_ids, name="product_id"), columns=sources)
+
+    def latest_availability(self, product_ids):
+        """Availability of the latest observation, shaped like ``latest_prices``"""
+        with self._lock:
+            matrix = self.latest.availabilities(product_ids)
+            sources = self._categories["source"][:matrix.shape[1]]
+        return pd.DataFrame(matrix, index=pd.Index(product_ids, name="product_id"), columns=sources)
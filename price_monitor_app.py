@@ -5,7 +5,92 @@ import plotly.express as px
 from datetime import datetime, timedelta
 import numpy as np
 from plotly.subplots import make_subplots
+import os
 import random
+from pathlib import Path
+
+from alert_engine import DEFAULT_COOLDOWN_MINUTES, TRIGGER_TYPES
+from crawler import results_to_columns
+from downsample import downsample
+from notifications import CHANNELS as NOTIFICATION_CHANNELS
+from price_stats import dashboard_kpis, map_prices, map_rule_key, price_volatility, rollup_competitor_stats, rollup_own_prices
+from pricing_engine import STRATEGY_RULE_TYPES, evaluate_rules
+from product_catalog import STATUSES
+from product_import import import_products, read_preview
+from product_matching import AUTO_APPROVE_CONFIDENCE, METHOD_ATTRIBUTES
+from sample_data import OWN_SOURCE, fill_price_history, generate_listings, generate_products
+from shared_data import SharedData
+
+DATA_DIR = Path(os.environ.get("PRICEIQ_DATA_DIR", Path(__file__).parent / "data"))
+
+# Days of price history kept in memory; older windows are read from the Parquet archive
+HOT_HISTORY_DAYS = 30
+
+# Derived views (history windows, stats) shared across sessions are evicted by age and count
+SHARED_VIEW_TTL = timedelta(minutes=int(os.environ.get("PRICEIQ_SHARED_VIEW_TTL_MINUTES", 10)))
+SHARED_VIEW_MAX_ENTRIES = int(os.environ.get("PRICEIQ_SHARED_VIEW_MAX_ENTRIES", 64))
+
+TIME_RANGES = {
+    "Last 24 Hours": timedelta(hours=24),
+    "Last 7 Days": timedelta(days=7),
+    "Last 30 Days": timedelta(days=30),
+    "Last 90 Days": timedelta(days=90),
+}
+
+ALERT_TIME_RANGES = {
+    "Last Hour": timedelta(hours=1),
+    "Last 24 Hours": timedelta(hours=24),
+    "Last Week": timedelta(days=7),
+    "All Time": None,
+}
+
+ALERT_PAGE_SIZES = [25, 50, 100]
+
+# Alert analytics period -> (span, rollup granularity)
+ALERT_ANALYTICS_PERIODS = {
+    "Last 24 Hours": (timedelta(hours=24), "h"),
+    "Last 7 Days": (timedelta(days=7), "D"),
+    "Last 30 Days": (timedelta(days=30), "D"),
+    "Last 90 Days": (timedelta(days=90), "D"),
+}
+
+# Price bands of the dashboard's market share chart: (label, lower bound)
+PRICE_BANDS = [("$0-100", 0), ("$100-200", 100), ("$200-300", 200), ("$300-400", 300), ("$400+", 400)]
+
+ALERT_ICONS = {"critical": "🔴", "warning": "⚠️", "info": "ℹ️"}
+
+# Rows shown before a CSV product import
+IMPORT_PREVIEW_ROWS = 20
+
+# Rows per page of the All Products table
+PRODUCT_PAGE_SIZE = 50
+
+MATCHING_METHODS = {
+    "Hybrid: Identifiers + AI Similarity (Recommended)": "hybrid",
+    "AI Similarity Scoring": "similarity",
+    "SKU/UPC/GTIN Matching": "identifiers",
+}
+
+# Seconds between progress updates of a running matching job
+MATCHING_POLL_SECONDS = 1
+
+MATCH_PAGE_SIZES = [25, 50, 100, 250]
+
+# Dashboard auto-refresh interval setting -> fragment timer
+REFRESH_INTERVALS = {
+    "Off": None,
+    "30 seconds": timedelta(seconds=30),
+    "1 minute": timedelta(minutes=1),
+    "5 minutes": timedelta(minutes=5),
+}
+
+RETENTION_PERIODS = {
+    "7 days": timedelta(days=7),
+    "30 days": timedelta(days=30),
+    "90 days": timedelta(days=90),
+    "1 year": timedelta(days=365),
+    "Forever": None,
+}
 
 # Page configuration
 st.set_page_config(
@@ -80,19 +165,19 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def _init_sample_data():
+def _init_sample_data(data):
     """Initialize sample data for demonstration"""
     # Sample products
-    st.session_state.products = [
+    data.products.extend([
         {"id": 1, "name": "Wireless Headphones Pro", "sku": "WHP-001", "current_price": 299.99, "cost": 150.00, "category": "Electronics"},
         {"id": 2, "name": "Smart Watch X200", "sku": "SWX-200", "current_price": 499.99, "cost": 250.00, "category": "Electronics"},
         {"id": 3, "name": "Bluetooth Speaker Max", "sku": "BSM-300", "current_price": 149.99, "cost": 75.00, "category": "Audio"},
         {"id": 4, "name": "USB-C Hub Elite", "sku": "UCH-400", "current_price": 79.99, "cost": 40.00, "category": "Accessories"},
         {"id": 5, "name": "Laptop Stand Pro", "sku": "LSP-500", "current_price": 129.99, "cost": 65.00, "category": "Accessories"},
-    ]
+    ])
     
     # Sample competitors
-    st.session_state.competitors = [
+    data.competitors = [
         {"name": "Amazon", "url": "amazon.com", "status": "Active"},
         {"name": "Best Buy", "url": "bestbuy.com", "status": "Active"},
         {"name": "Walmart", "url": "walmart.com", "status": "Active"},
@@ -101,77 +186,329 @@ def _init_sample_data():
     ]
     
     # Generate sample price history
-    _generate_sample_price_history()
+    _generate_sample_price_history(data)
+    # Competitor listings the auto-matcher links to catalog products
+    data.competitor_listings = generate_listings(data.products, data.competitors, seed=7)
+    # Hourly/daily rollups serve dashboard windows; older windows are added from the archive on demand
+    data.price_rollups.extend_back(data.price_history.to_frame(), data.history_loaded_from)
     
     # Sample alerts
-    st.session_state.alerts = [
-        {"time": datetime.now() - timedelta(minutes=5), "type": "critical", "message": "Competitor dropped price by 15% on Wireless Headphones Pro", "product": "WHP-001"},
-        {"time": datetime.now() - timedelta(minutes=30), "type": "warning", "message": "MAP violation detected on Smart Watch X200", "product": "SWX-200"},
-        {"time": datetime.now() - timedelta(hours=1), "type": "info", "message": "New competitor detected for Bluetooth Speaker Max", "product": "BSM-300"},
-        {"time": datetime.now() - timedelta(hours=2), "type": "critical", "message": "Stock-out detected at Amazon for USB-C Hub Elite", "product": "UCH-400"},
-        {"time": datetime.now() - timedelta(hours=3), "type": "warning", "message": "Price volatility increased for Laptop Stand Pro", "product": "LSP-500"},
+    data.alerts.extend([
+        {"time": datetime.now() - timedelta(minutes=5), "type": "critical", "message": "Competitor dropped price by 15% on Wireless Headphones Pro", "product": "WHP-001", "trigger": "Price Change"},
+        {"time": datetime.now() - timedelta(minutes=30), "type": "warning", "message": "MAP violation detected on Smart Watch X200", "product": "SWX-200", "trigger": "MAP Violation"},
+        {"time": datetime.now() - timedelta(hours=1), "type": "info", "message": "New competitor detected for Bluetooth Speaker Max", "product": "BSM-300", "trigger": "Market Position"},
+        {"time": datetime.now() - timedelta(hours=2), "type": "critical", "message": "Stock-out detected at Amazon for USB-C Hub Elite", "product": "UCH-400", "trigger": "Stock Status"},
+        {"time": datetime.now() - timedelta(hours=3), "type": "warning", "message": "Price volatility increased for Laptop Stand Pro", "product": "LSP-500", "trigger": "Price Change"},
+    ])
+    
+    # Sample alert rules, compiled into the streaming evaluator
+    data.alert_rules = [
+        {"id": 1, "name": "Competitor Price Drop >10%", "trigger_type": "Price Change", "threshold": 10, "direction": "Decrease", "severity": "Critical", "products": [], "channels": ["Email", "Dashboard"], "active": True, "triggers": 24},
+        {"id": 2, "name": "MAP Violation Detection", "trigger_type": "MAP Violation", "map_price": 279.99, "severity": "Critical", "products": ["WHP-001"], "channels": ["Email", "Dashboard"], "active": True, "triggers": 5},
+        {"id": 3, "name": "Low Margin Alert <25%", "trigger_type": "Margin Threshold", "margin_threshold": 25, "severity": "Warning", "products": [], "channels": ["Dashboard"], "active": True, "triggers": 12},
+        {"id": 4, "name": "Stock-Out Detection", "trigger_type": "Stock Status", "severity": "Warning", "products": [], "channels": ["Dashboard"], "active": True, "triggers": 8},
+        {"id": 5, "name": "Price Volatility High", "trigger_type": "Price Change", "threshold": 20, "direction": "Either", "severity": "Info", "products": [], "channels": ["Dashboard"], "active": False, "triggers": 0},
     ]
+    data.alert_evaluator.compile(data.alert_rules)
     
     # Sample dynamic pricing rules
-    st.session_state.dynamic_pricing_rules = [
+    data.dynamic_pricing_rules = [
         {"id": 1, "product_sku": "WHP-001", "rule_type": "Match Lowest", "floor_price": 249.99, "ceiling_price": 349.99, "margin_min": 30, "active": True},
         {"id": 2, "product_sku": "SWX-200", "rule_type": "Beat by %", "beat_by": 5, "floor_price": 449.99, "ceiling_price": 599.99, "margin_min": 35, "active": True},
         {"id": 3, "product_sku": "BSM-300", "rule_type": "Fixed Margin", "target_margin": 40, "floor_price": 129.99, "ceiling_price": 199.99, "active": False},
     ]
+    data.repricer.rebuild(data.dynamic_pricing_rules)
 
-def _generate_sample_price_history():
+def _generate_sample_price_history(data):
     """Generate realistic sample price history"""
-    days = 30
-    base_date = datetime.now() - timedelta(days=days)
+    archive = data.price_archive
+    # Day-aligned, so the rollups' daily buckets at the edge of the hot window are complete
+    data.history_loaded_from = pd.Timestamp(datetime.now() - timedelta(days=HOT_HISTORY_DAYS)).floor('D').to_pydatetime()
+    if len(archive):
+        # Persisted history wins over sample data; only the hot window is loaded
+        data.price_history.extend(archive.read(start=data.history_loaded_from))
+        data.history_persisted_rows = len(data.price_history)
+        return
+    
+    # PRICEIQ_SAMPLE_* variables scale the demo data up for dashboard load tests
+    extra_products = int(os.environ.get("PRICEIQ_SAMPLE_PRODUCTS", 0))
+    if extra_products:
+        data.products.extend(
+            generate_products(extra_products, start_id=data.products.max_id + 1)
+        )
     
-    for product in st.session_state.products:
-        base_price = product['current_price']
-        
-        for day in range(days):
-            current_date = base_date + timedelta(days=day)
-            
-            # Your price (slight variations)
-            your_price = base_price + np.random.normal(0, 5)
-            
-            # Competitor prices (more variation)
-            for competitor in st.session_state.competitors[:3]:  # Top 3 competitors
-                comp_price = base_price * np.random.uniform(0.85, 1.15)
-                
-                st.session_state.price_history.append({
-                    "date": current_date,
-                    "product_id": product['id'],
-                    "product_name": product['name'],
-                    "sku": product['sku'],
-                    "source": competitor['name'],
-                    "price": round(comp_price, 2),
-                    "availability": np.random.choice([True, False], p=[0.95, 0.05]),
-                    "shipping_cost": round(np.random.uniform(0, 15), 2)
-                })
-            
-            # Add your own price
-            st.session_state.price_history.append({
-                "date": current_date,
+    target_rows = os.environ.get("PRICEIQ_SAMPLE_ROWS")
+    fill_price_history(
+        data.price_history,
+        data.products,
+        data.competitors[:3],  # Top 3 competitors
+        days=30,
+        freq=os.environ.get("PRICEIQ_SAMPLE_FREQ", "D"),
+        target_rows=int(target_rows) if target_rows else None,
+    )
+    _persist_history(data)
+
+def _product_categories(products, product_ids):
+    """product_id -> category for the given ids, looked up in the catalog"""
+    categories = {}
+    for product_id in np.unique(np.asarray(product_ids)):
+        product = products.get(int(product_id))
+        if product is not None:
+            categories[int(product_id)] = product['category']
+    return categories
+
+def _persist_history(data):
+    """Write observations added since the last call to the Parquet archive.
+    
+    Only the new rows are read from the store, and the Parquet write runs
+    outside ``data.lock``; ``persist_lock`` keeps writers in order, so rows
+    ingested while a write is running go out with the next call. Cached views
+    are keyed on the data version and need no invalidation here.
+    """
+    with data.persist_lock:
+        with data.lock:
+            persisted, size = data.history_persisted_rows, len(data.price_history)
+            if size <= persisted:
+                return
+            rows = data.price_history.rows_frame(persisted, size)
+            categories = _product_categories(data.products, rows['product_id'])
+        data.price_archive.append(rows, categories)
+        with data.lock:
+            data.history_persisted_rows = size
+
+def _store_observations(data, columns):
+    """Alert on, store and roll up a batch of observations; the caller holds ``data.lock``"""
+    # Alert rules compare against the previous observations, so they run before the batch is stored
+    alerts = data.alert_evaluator.process(columns, data.products_by_sku(), data.price_history)
+    data.alerts.extend(alerts)
+    data.notifier.submit(alerts)
+    added = data.price_history.extend(columns)
+    data.price_rollups.update(columns)
+    # Real-time rules that depend on the observed (sku, source) pairs are repriced right away;
+    # the own-store prices they set are observations too, and may trigger further rules
+    if data.repricer.mark(columns['sku'], columns['source']):
+        own_prices = _price_change_columns(data, data.repricer.reprice(data.products_by_sku(), data.price_history))
+        if own_prices is not None:
+            _store_observations(data, own_prices)
+    return added
+
+def _ingest_observations(data, columns):
+    """Add a batch of new observations (e.g. crawl output) to the shared history.
+    
+    Alerts, history, rollups, the repricer and the catalog are updated under
+    ``data.lock``, so a concurrent ingest never sees the history without its
+    alerts or repricing; the archive write happens after the lock is released.
+    """
+    if columns is None:
+        return 0
+    with data.lock:
+        added = _store_observations(data, columns)
+    _persist_history(data)
+    return added
+
+def _run_crawl(targets):
+    """Crawl targets with the saved crawl settings and store the prices found"""
+    settings = dict(st.session_state.crawl_settings)
+    if settings['use_proxies']:
+        # Proxy endpoints come from the environment; the pool size caps how many are used
+        proxies = [p for p in os.environ.get("PRICEIQ_PROXIES", "").split(",") if p]
+        settings['proxies'] = proxies[:settings['proxy_pool_size']]
+    else:
+        settings['proxies'] = []
+    data = st.session_state.shared_data
+    with data.lock:
+        data.crawl_engine.configure(settings)
+    results = data.crawl_engine.run(targets)
+    added = _ingest_observations(
+        data,
+        results_to_columns(results, settings['extract_shipping'], settings['extract_availability'])
+    )
+    if added:
+        # Fresh prices change how volatile the crawled SKUs are, and so how soon they are due again
+        skus = {t['sku'] for t in targets}
+        volatility = price_volatility(_history_window(datetime.now() - timedelta(days=7)), skus).to_dict()
+        with data.lock:
+            data.crawl_scheduler.update_volatility(volatility)
+    return results
+
+def _track_matches(matches, data=None):
+    """Add approved matches to the tracked URLs and the crawl scheduler; returns the number of new URLs"""
+    data = data or st.session_state.shared_data
+    frequency = data.crawl_settings["default_frequency"]
+    added = 0
+    with data.lock:
+        for match in matches.itertuples():
+            if match.url in data.crawl_scheduler:
+                continue
+            product = data.products.get(match.product_id)
+            if product is None:
+                continue
+            target = {
+                "url": match.url,
                 "product_id": product['id'],
                 "product_name": product['name'],
                 "sku": product['sku'],
-                "source": "Your Store",
-                "price": round(your_price, 2),
-                "availability": True,
-                "shipping_cost": 0
-            })
-
-# Initialize session state
-if 'initialized' not in st.session_state:
-    st.session_state.initialized = True
-    st.session_state.products = []
-    st.session_state.competitors = []
-    st.session_state.price_history = []
-    st.session_state.alerts = []
-    st.session_state.dynamic_pricing_rules = []
-    st.session_state.tracked_urls = []
-    
-    # Sample data for demonstration
-    _init_sample_data()
+                "source": match.source,
+                "frequency": frequency,
+                "match_id": match.id,
+            }
+            data.tracked_urls.append(target)
+            data.crawl_scheduler.add(target, frequency)
+            added += 1
+    return added
+
+def _price_change_columns(data, recommendations):
+    """Set recommended prices on the catalog; returns them as own-store observation columns (None if none changed)"""
+    changed = recommendations[recommendations['recommended_price'] != recommendations['current_price']]
+    updates = [(data.products.get_sku(sku), {'current_price': float(price)})
+               for sku, price in zip(changed['sku'], changed['recommended_price'])]
+    updates = [(product, fields) for product, fields in updates if product is not None]
+    data.products.update_many(updates)
+    updated = [product for product, _ in updates]
+    if not updated:
+        return None
+    return {
+        "date": datetime.now(),
+        "product_id": [p['id'] for p in updated],
+        "product_name": [p['name'] for p in updated],
+        "sku": [p['sku'] for p in updated],
+        "source": "Your Store",
+        "price": [p['current_price'] for p in updated],
+    }
+
+def _apply_price_changes(recommendations, data=None):
+    """Set recommended prices on the catalog and record them as own-store observations"""
+    data = data or st.session_state.shared_data
+    with data.lock:
+        columns = _price_change_columns(data, recommendations)
+        if columns is None:
+            return 0
+        _store_observations(data, columns)
+    _persist_history(data)
+    return len(columns['sku'])
+
+@st.cache_resource(show_spinner="Loading price data...")
+def _load_shared_data(data_dir):
+    """Build the process-wide dataset once; every session gets a reference to it"""
+    data = SharedData(data_dir)
+    _init_sample_data(data)
+    # Matches approved in earlier sessions are tracked again
+    _track_matches(data.match_queue.approved(), data)
+    return data
+
+@st.cache_resource(ttl=SHARED_VIEW_TTL, max_entries=SHARED_VIEW_MAX_ENTRIES, show_spinner=False)
+def _cached_history_window(_data, data_dir, version, start, end):
+    """History window shared by every session looking at the same data version"""
+    if start < pd.Timestamp(_data.history_loaded_from) and len(_data.price_archive):
+        return _data.price_archive.read(start=start, end=end)
+    
+    df = _data.price_history.to_frame()
+    mask = df['date'] >= start
+    if end is not None:
+        mask &= df['date'] <= end
+    return df[mask]
+
+@st.cache_resource(ttl=SHARED_VIEW_TTL, max_entries=SHARED_VIEW_MAX_ENTRIES, show_spinner=False)
+def _cached_competitor_stats(_data, data_dir, version, start, end):
+    """Competitor stats for a window, combined from the price rollups"""
+    return rollup_competitor_stats(_cached_rollup_window(_data, data_dir, version, start, end), _data.products)
+
+@st.cache_resource(ttl=SHARED_VIEW_TTL, max_entries=SHARED_VIEW_MAX_ENTRIES, show_spinner=False)
+def _cached_rollup_window(_data, data_dir, version, start, end):
+    """Per product/source aggregates for a window, from hourly and daily rollups (see ``_rollup_key``)"""
+    return _data.price_rollups.window(start, end)
+
+@st.cache_resource(ttl=SHARED_VIEW_TTL, max_entries=SHARED_VIEW_MAX_ENTRIES, show_spinner=False)
+def _cached_kpis(_data, data_dir, version, start, end, map_rules, _alert_rules):
+    """Dashboard KPIs for a window; ``map_rules`` keys the MAP rules, so rule edits miss the cache"""
+    return dashboard_kpis(_cached_rollup_window(_data, data_dir, version, start, end), _data.products,
+                          map_prices(_alert_rules, _data.products))
+
+def _invalidate_shared_views():
+    """Drop derived views after new price data arrives"""
+    _cached_history_window.clear()
+    _cached_competitor_stats.clear()
+    _cached_rollup_window.clear()
+    _cached_kpis.clear()
+
+def _window_key(start, end=None):
+    """Minute-aligned window bounds so reruns within a minute share cached views"""
+    data = st.session_state.shared_data
+    start = pd.Timestamp(start).floor('min')
+    end = pd.Timestamp(end).ceil('min') if end is not None else None
+    return data, str(data.data_dir), data.version, start, end
+
+def _backfill_rollups(data, start):
+    """Fold archived observations from before the rollups' coverage into them, back to ``start``'s day.
+    
+    An explicit step under ``data.lock`` before rollup views are read, so
+    cached view functions never change the shared rollups.
+    """
+    with data.lock:
+        rollups = data.price_rollups
+        if rollups.covered_from is None or start >= rollups.covered_from or not len(data.price_archive):
+            return
+        # Whole days, so the daily buckets at the new edge are complete
+        start = pd.Timestamp(start).floor('D')
+        older = data.price_archive.read(start=start, end=rollups.covered_from - pd.Timedelta(microseconds=1))
+        rollups.extend_back(older, start)
+
+def _rollup_key(start, end=None):
+    """``_window_key`` for rollup views, with the rollups backfilled to cover the window"""
+    key = _window_key(start, end)
+    _backfill_rollups(key[0], key[3])
+    return key
+
+def _history_window(start, end=None):
+    """Price history between start and end, read from disk when it predates the in-memory window"""
+    return _cached_history_window(*_window_key(start, end))
+
+def _rollup_window(start, end=None):
+    """Per product/source price aggregates for a window"""
+    return _cached_rollup_window(*_rollup_key(start, end))
+
+def _cached_figure(chart, build, *params):
+    """Figure for a dashboard chart, rebuilt only when its parameters or the shared data change"""
+    data = st.session_state.shared_data
+    return data.figure_cache.get(chart, params, data.version, build)
+
+def _add_price_traces(fig, history, products, **trace_args):
+    """One downsampled price trace per product and source"""
+    names = {p['id']: p['name'] for p in products}
+    rows = history[history['product_id'].isin(list(names))]
+    for (product_id, source), series in rows.groupby(['product_id', 'source'], observed=True, sort=False):
+        dates, prices = downsample(series['date'].to_numpy(), series['price'].to_numpy())
+        fig.add_trace(go.Scatter(x=dates, y=prices, name=f"{names[product_id][:20]} - {source}", **trace_args))
+
+def _zoom_range(key, start, end):
+    """Sub-range of [start, end] picked with a slider; charts re-query detail for it.
+    
+    Bounds are aligned to the hour so the slider keeps its position across reruns.
+    Plotly zoom stays client-side (no relayout events reach the script), and an
+    ``on_select`` box selection cannot stand in for it: the chart's widget id
+    includes the figure spec, so redrawing the selected range at full
+    resolution would drop the selection that asked for it.
+    """
+    start = pd.Timestamp(start).floor('h').to_pydatetime()
+    end = pd.Timestamp(end).ceil('h').to_pydatetime()
+    return st.slider("Zoom", min_value=start, max_value=end, value=(start, end),
+                     step=timedelta(hours=1), format="MMM D, HH:mm", key=key, label_visibility="collapsed")
+
+def _time_range_bounds(time_range, date_range=None):
+    """(start, end) datetimes for a Time Range selection"""
+    if time_range == "Custom":
+        dates = list(date_range or [])
+        start = datetime.combine(dates[0], datetime.min.time()) if dates else datetime.now() - timedelta(days=30)
+        end = datetime.combine(dates[-1], datetime.max.time()) if len(dates) > 1 else datetime.now()
+        return start, end
+    now = datetime.now()
+    return now - TIME_RANGES[time_range], now
+
+# Sessions hold their UI state plus references into the process-wide shared data
+st.session_state.shared_data = _load_shared_data(str(DATA_DIR))
+for _key in SharedData.SESSION_KEYS:
+    st.session_state[_key] = getattr(st.session_state.shared_data, _key)
+
 # Sidebar Navigation
 with st.sidebar:
     st.markdown('<p class="main-header" style="font-size: 1.5rem;">🎯 PriceIQ</p>', unsafe_allow_html=True)
@@ -184,6 +521,8 @@ with st.sidebar:
     # Initialize selected page in session state
     if 'current_page' not in st.session_state:
         st.session_state.current_page = "📊 Dashboard"
+    if 'refresh_interval' not in st.session_state:
+        st.session_state.refresh_interval = "30 seconds"
     
     nav_options = [
         ("📊", "Dashboard"),
@@ -210,7 +549,7 @@ with st.sidebar:
     st.markdown("#### Quick Stats")
     st.metric("Products Tracked", len(st.session_state.products))
     st.metric("Active Competitors", len([c for c in st.session_state.competitors if c['status'] == 'Active']))
-    st.metric("Active Alerts", len([a for a in st.session_state.alerts if (datetime.now() - a['time']).total_seconds() < 86400]))
+    st.metric("Active Alerts", st.session_state.alerts.count(start=datetime.now() - timedelta(hours=24)))
     
     st.markdown("---")
     st.markdown("#### Last Crawl")
@@ -226,113 +565,158 @@ def show_dashboard():
     with col_time1:
         time_range = st.selectbox("Time Range", ["Last 24 Hours", "Last 7 Days", "Last 30 Days", "Last 90 Days", "Custom"])
     with col_time2:
+        date_range = None
         if time_range == "Custom":
             date_range = st.date_input("Select Date Range", [datetime.now() - timedelta(days=30), datetime.now()])
     with col_time3:
-        auto_refresh = st.checkbox("Auto Refresh", value=True)
+        auto_refresh = st.checkbox("Auto Refresh", value=True,
+                                   help=f"Every {st.session_state.refresh_interval}, see Settings & Integration")
+    
+    # Each section re-runs on its own timer instead of the whole page; while the
+    # data version is unchanged the window stays put and it is served from the caches
+    run_every = REFRESH_INTERVALS[st.session_state.refresh_interval] if auto_refresh else None
     
     # Key metrics row
     st.markdown("### 📈 Key Performance Indicators")
+    st.fragment(show_dashboard_kpis, run_every=run_every)(time_range, date_range)
+    
+    st.markdown("---")
+    
+    st.fragment(show_dashboard_charts, run_every=run_every)(time_range, date_range)
+    
+    # Product performance table
+    st.markdown("### 🏆 Product Performance Overview")
+    st.fragment(show_dashboard_products, run_every=run_every)(time_range, date_range)
+    
+    # Recent activity feed
+    st.markdown("### 🔔 Recent Activity")
+    st.fragment(show_dashboard_activity, run_every=run_every)(time_range, date_range)
+
+def _dashboard_window(time_range, date_range):
+    """Cache key of the selected window.
+    
+    A timed refresh slides the window to the current minute only when the
+    shared (history, products) version changed since the last one; otherwise it
+    keeps the previous key, so the KPIs, stats and figures are not rebuilt.
+    """
+    data = st.session_state.shared_data
+    selection = (time_range, tuple(date_range or ()))
+    pinned = st.session_state.get('dashboard_window')
+    if pinned is not None and pinned[0] == selection and pinned[1][2] == data.version:
+        return pinned[1]
+    window = _rollup_key(*_time_range_bounds(time_range, date_range))
+    # The KPI deltas also read the window of the same length just before it
+    _backfill_rollups(data, window[3] - (window[4] - window[3]))
+    st.session_state.dashboard_window = (selection, window)
+    return window
+
+def show_dashboard_kpis(time_range, date_range):
+    """Dashboard header metrics"""
+    window = _dashboard_window(time_range, date_range)
+    window_start, window_end = window[3], window[4]
     col1, col2, col3, col4, col5 = st.columns(5)
     
+    # Deltas compare with the window of the same length just before the selected one
+    data, data_dir, version = window[:3]
+    rules = st.session_state.alert_rules
+    kpis = _cached_kpis(data, data_dir, version, window_start, window_end, map_rule_key(rules), rules)
+    previous = _cached_kpis(data, data_dir, version, window_start - (window_end - window_start), window_start,
+                            map_rule_key(rules), rules)
+    
     with col1:
-        avg_margin = np.mean([(p['current_price'] - p['cost']) / p['current_price'] * 100 for p in st.session_state.products])
         st.metric(
             "Avg Margin",
-            f"{avg_margin:.1f}%",
-            delta="2.3%",
+            f"{kpis['avg_margin']:.1f}%",
+            delta=f"{kpis['avg_margin'] - previous['avg_margin']:+.1f}%",
             delta_color="normal"
         )
     
     with col2:
-        competitive_index = 87.5
         st.metric(
             "Competitive Index",
-            f"{competitive_index:.1f}",
-            delta="-1.2",
-            delta_color="inverse"
+            f"{kpis['competitive_index']:.1f}",
+            delta=f"{kpis['competitive_index'] - previous['competitive_index']:+.1f}",
+            delta_color="normal",
+            help="Competitor average price as % of yours; above 100 means you are cheaper"
         )
     
     with col3:
-        price_changes = 24
         st.metric(
-            "Price Changes (24h)",
-            price_changes,
-            delta="3",
-            delta_color="off"
+            "Price Changes",
+            f"{kpis['price_changes']:,}",
+            delta=kpis['price_changes'] - previous['price_changes'],
+            delta_color="off",
+            help="Observed price changes in the selected time range"
         )
     
     with col4:
-        map_violations = 2
         st.metric(
             "MAP Violations",
-            map_violations,
-            delta="-1",
-            delta_color="normal"
+            kpis['map_violations'],
+            delta=kpis['map_violations'] - previous['map_violations'],
+            delta_color="inverse"
         )
     
     with col5:
-        winning_position = 68
         st.metric(
             "Winning Position",
-            f"{winning_position}%",
-            delta="5%",
-            delta_color="normal"
+            f"{kpis['winning_position']:.0f}%",
+            delta=f"{kpis['winning_position'] - previous['winning_position']:+.0f}%",
+            delta_color="normal",
+            help="Products where your latest price is at or below every competitor's"
         )
-    
-    st.markdown("---")
+    st.caption(f"Updated {datetime.now():%H:%M:%S}")
+
+def show_dashboard_charts(time_range, date_range):
+    """Dashboard chart rows"""
+    window_start, window_end = _dashboard_window(time_range, date_range)[3:]
     
     # Main charts row
     col_chart1, col_chart2 = st.columns(2)
     
     with col_chart1:
         st.markdown("#### 💹 Price Position vs Competitors")
-        show_price_position_chart()
+        show_price_position_chart(window_start, window_end)
     
     with col_chart2:
         st.markdown("#### 📊 Market Share by Price Point")
-        show_market_share_chart()
+        show_market_share_chart(window_start, window_end)
     
     # Second row of charts
     col_chart3, col_chart4 = st.columns(2)
     
     with col_chart3:
         st.markdown("#### 📊 Category Performance")
-        show_category_performance()
+        show_category_performance(window_start, window_end)
     
     with col_chart4:
         st.markdown("#### 🎯 Margin Distribution")
-        show_margin_distribution()
-    
-    # Product performance table
-    st.markdown("### 🏆 Product Performance Overview")
-    show_product_performance_table()
-    
-    # Recent activity feed
-    st.markdown("### 🔔 Recent Activity")
-    show_recent_activity()
+        show_margin_distribution(window_start, window_end)
+
+def show_dashboard_products(time_range, date_range):
+    """Dashboard product performance table"""
+    show_product_performance_table(_cached_competitor_stats(*_dashboard_window(time_range, date_range)))
 
-def show_price_position_chart():
+def show_dashboard_activity(time_range, date_range):
+    """Dashboard recent activity feed"""
+    show_recent_activity(*_dashboard_window(time_range, date_range)[3:])
+
+def show_price_position_chart(start, end):
     """Price position comparison chart"""
-    df = pd.DataFrame(st.session_state.price_history)
-    df = df[df['date'] >= datetime.now() - timedelta(days=7)]
-    
+    zoom_start, zoom_end = _zoom_range("price_position_zoom", start, end)
+    st.plotly_chart(_cached_figure("price_position", _price_position_figure, zoom_start, zoom_end), use_container_width=True)
+
+def _price_position_figure(start, end):
+    """Price position comparison chart figure"""
     fig = go.Figure()
     
-    for product in st.session_state.products[:3]:  # Top 3 products
-        product_data = df[df['product_id'] == product['id']]
-        
-        for source in product_data['source'].unique():
-            source_data = product_data[product_data['source'] == source]
-            
-            fig.add_trace(go.Scatter(
-                x=source_data['date'],
-                y=source_data['price'],
-                name=f"{product['name'][:20]} - {source}",
-                mode='lines+markers',
-                line=dict(width=2),
-                marker=dict(size=6)
-            ))
+    # Top 3 products, each trace downsampled to about the chart width
+    _add_price_traces(
+        fig, _history_window(start, end), st.session_state.products[:3],
+        mode='lines+markers',
+        line=dict(width=2),
+        marker=dict(size=4)
+    )
     
     fig.update_layout(
         height=400,
@@ -341,13 +725,25 @@ def show_price_position_chart():
         margin=dict(l=0, r=0, t=30, b=0)
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def show_market_share_chart():
+def show_market_share_chart(start, end):
     """Market share by price point"""
-    categories = ['$0-100', '$100-200', '$200-300', '$300-400', '$400+']
-    your_share = [15, 25, 30, 20, 10]
-    competitor_share = [20, 30, 25, 15, 10]
+    st.plotly_chart(_cached_figure("market_share", _market_share_figure, start, end), use_container_width=True)
+
+def _market_share_figure(start, end):
+    """Market share by price point figure: share of listings per price band over the window"""
+    rollup = _rollup_window(start, end)
+    categories = [label for label, _ in PRICE_BANDS]
+    lower_bounds = [bound for _, bound in PRICE_BANDS]
+    
+    def _shares(prices):
+        counts = np.bincount(np.searchsorted(lower_bounds, prices, side='right') - 1, minlength=len(PRICE_BANDS))
+        return counts / max(counts.sum(), 1) * 100
+    
+    your_share = _shares(rollup_own_prices(rollup, st.session_state.products))
+    competitors = rollup[(rollup['source'] != OWN_SOURCE).to_numpy()]
+    competitor_share = _shares((competitors['sum'] / competitors['count']).to_numpy(dtype=np.float64))
     
     fig = go.Figure(data=[
         go.Bar(name='Your Store', x=categories, y=your_share, marker_color='#667eea'),
@@ -358,27 +754,35 @@ def show_market_share_chart():
         barmode='group',
         height=400,
         margin=dict(l=0, r=0, t=10, b=0),
+        yaxis_title="Share of Listings (%)",
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def show_category_performance():
+def show_category_performance(start, end):
     """Category performance chart"""
-    categories = list(set([p['category'] for p in st.session_state.products]))
-    revenue = [random.randint(50000, 200000) for _ in categories]
+    st.plotly_chart(_cached_figure("category_performance", _category_performance_figure, start, end), use_container_width=True)
+
+def _category_performance_figure(start, end):
+    """Category performance chart figure: average price gap to competitors per category"""
+    stats = _cached_competitor_stats(*_rollup_key(start, end))
+    stats = stats[(stats['position'] != "No Data").to_numpy()]
+    categories = st.session_state.products.frame().set_index('id')['category']
+    gap = stats.groupby(stats['product_id'].map(categories), sort=True)['diff_pct'].mean()
     
     fig = go.Figure(data=[
         go.Bar(
-            x=categories,
-            y=revenue,
+            x=gap.index.tolist(),
+            y=gap.to_numpy(),
             marker=dict(
-                color=revenue,
-                colorscale='Viridis',
+                color=gap.to_numpy(),
+                colorscale='RdYlGn',
+                reversescale=True,
                 showscale=True,
-                colorbar=dict(title="Revenue")
+                colorbar=dict(title="Diff %")
             ),
-            text=[f"${r:,.0f}" for r in revenue],
+            text=[f"{d:+.1f}%" for d in gap],
             textposition='auto',
         )
     ])
@@ -386,15 +790,22 @@ def show_category_performance():
     fig.update_layout(
         height=400,
         margin=dict(l=0, r=0, t=10, b=0),
-        yaxis_title="Revenue ($)",
+        yaxis_title="Price vs Competitor Avg (%)",
         showlegend=False
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def show_margin_distribution():
+def show_margin_distribution(start, end):
     """Margin distribution chart"""
-    margins = [(p['current_price'] - p['cost']) / p['current_price'] * 100 for p in st.session_state.products]
+    st.plotly_chart(_cached_figure("margin_distribution", _margin_distribution_figure, start, end), use_container_width=True)
+
+def _margin_distribution_figure(start, end):
+    """Margin distribution chart figure, at each product's average selling price over the window"""
+    products = st.session_state.products
+    prices = rollup_own_prices(_rollup_window(start, end), products)
+    costs = products.costs
+    margins = (prices - costs) / prices * 100
     
     fig = go.Figure(data=[go.Histogram(
         x=margins,
@@ -414,55 +825,44 @@ def show_margin_distribution():
         showlegend=False
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def show_product_performance_table():
+def show_product_performance_table(stats):
     """Product performance comparison table"""
-    df = pd.DataFrame(st.session_state.price_history)
-    
-    performance_data = []
-    for product in st.session_state.products:
-        product_df = df[df['product_id'] == product['id']]
-        
-        your_price = product['current_price']
-        competitor_prices = product_df[product_df['source'] != 'Your Store']['price']
-        
-        if len(competitor_prices) > 0:
-            min_comp = competitor_prices.min()
-            avg_comp = competitor_prices.mean()
-            max_comp = competitor_prices.max()
-            
-            price_diff = ((your_price - avg_comp) / avg_comp * 100)
-            position = "🥇 Lowest" if your_price <= min_comp else ("🥈 Competitive" if your_price <= avg_comp else "🥉 Higher")
-        else:
-            min_comp = avg_comp = max_comp = 0
-            price_diff = 0
-            position = "➖ No Data"
-        
-        margin = (your_price - product['cost']) / your_price * 100
-        
-        performance_data.append({
-            "Product": product['name'],
-            "SKU": product['sku'],
-            "Your Price": f"${your_price:.2f}",
-            "Comp Min": f"${min_comp:.2f}" if min_comp > 0 else "N/A",
-            "Comp Avg": f"${avg_comp:.2f}" if avg_comp > 0 else "N/A",
-            "Comp Max": f"${max_comp:.2f}" if max_comp > 0 else "N/A",
-            "Diff %": f"{price_diff:+.1f}%",
-            "Margin %": f"{margin:.1f}%",
-            "Position": position
-        })
-    
-    performance_df = pd.DataFrame(performance_data)
-    st.dataframe(performance_df, use_container_width=True, hide_index=True)
+    position_labels = {"Lowest": "🥇 Lowest", "Competitive": "🥈 Competitive", "Higher": "🥉 Higher", "No Data": "➖ No Data"}
+    
+    performance_df = pd.DataFrame({
+        "Product": stats['name'],
+        "SKU": stats['sku'],
+        "Your Price": stats['your_price'],
+        "Comp Min": stats['comp_min'],
+        "Comp Avg": stats['comp_avg'],
+        "Comp Max": stats['comp_max'],
+        "Diff %": stats['diff_pct'],
+        "Margin %": stats['margin_pct'],
+        "Position": stats['position'].cat.rename_categories(position_labels)
+    })
+    st.dataframe(
+        performance_df,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Your Price": st.column_config.NumberColumn(format="$%.2f"),
+            "Comp Min": st.column_config.NumberColumn(format="$%.2f"),
+            "Comp Avg": st.column_config.NumberColumn(format="$%.2f"),
+            "Comp Max": st.column_config.NumberColumn(format="$%.2f"),
+            "Diff %": st.column_config.NumberColumn(format="%+.1f%%"),
+            "Margin %": st.column_config.NumberColumn(format="%.1f%%"),
+        }
+    )
 
-def show_recent_activity():
+def show_recent_activity(start, end):
     """Recent activity feed"""
-    for alert in st.session_state.alerts[:5]:
+    for alert in st.session_state.alerts.query(start=start, end=end, limit=5):
         alert_class = f"alert-{alert['type']}"
         time_ago = (datetime.now() - alert['time']).seconds // 60
         
-        icon = "🔴" if alert['type'] == "critical" else ("⚠️" if alert['type'] == "warning" else "ℹ️")
+        icon = ALERT_ICONS[alert['type']]
         
         st.markdown(f"""
         <div class="alert-card {alert_class}">
@@ -505,23 +905,20 @@ def show_active_competitor_tracking():
     # Competitor comparison table
     st.markdown("#### 📊 Price Comparison Matrix")
     
-    df = pd.DataFrame(st.session_state.price_history)
-    latest_df = df.sort_values('date').groupby(['product_id', 'source']).tail(1)
-    
-    # Create pivot table
-    pivot_data = []
-    for product in st.session_state.products:
-        product_data = latest_df[latest_df['product_id'] == product['id']]
-        row = {"Product": product['name'], "SKU": product['sku']}
-        
-        for source in product_data['source'].unique():
-            source_price = product_data[product_data['source'] == source]['price'].values[0]
-            row[source] = f"${source_price:.2f}"
-        
-        pivot_data.append(row)
-    
-    pivot_df = pd.DataFrame(pivot_data)
-    st.dataframe(pivot_df, use_container_width=True, hide_index=True)
+    # Served from the store's latest-price matrix: no sort or scan of the full history
+    catalog = st.session_state.products.frame()
+    latest_prices = st.session_state.price_history.latest_prices(catalog['id'])
+    
+    pivot_df = pd.concat([
+        pd.DataFrame({"Product": catalog['name'], "SKU": catalog['sku']}),
+        latest_prices.reset_index(drop=True)
+    ], axis=1)
+    st.dataframe(
+        pivot_df,
+        use_container_width=True,
+        hide_index=True,
+        column_config={source: st.column_config.NumberColumn(source, format="$%.2f") for source in latest_prices.columns}
+    )
     
     # Detailed tracking list
     st.markdown("#### 🔗 Tracked URLs")
@@ -530,22 +927,33 @@ def show_active_competitor_tracking():
         with st.expander(f"📦 {product['name']} ({product['sku']})"):
             for competitor in st.session_state.competitors[:3]:
                 col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+                url = f"https://{competitor['url']}/product/{product['sku'].lower()}"
+                
+                with col4:
+                    if st.button("🔄", key=f"refresh_{i}_{competitor['name']}"):
+                        with st.spinner("Crawling..."):
+                            result = _run_crawl([{
+                                "url": url,
+                                "product_id": product['id'],
+                                "product_name": product['name'],
+                                "sku": product['sku'],
+                                "source": competitor['name'],
+                            }])[0]
+                        if not result['ok']:
+                            st.error(f"Crawl failed: {result['error']}")
+                
+                latest = st.session_state.price_history.latest_observation(product['id'], competitor['name'])
                 
                 with col1:
                     st.text(f"🔗 {competitor['name']}")
-                    st.caption(f"https://{competitor['url']}/product/{product['sku'].lower()}")
+                    st.caption(url)
                 
                 with col2:
-                    last_crawl = datetime.now() - timedelta(minutes=random.randint(5, 60))
-                    st.caption(f"Last crawled: {last_crawl.strftime('%H:%M')}")
+                    last_crawl = latest[1].strftime('%Y-%m-%d %H:%M') if latest else "never"
+                    st.caption(f"Last crawled: {last_crawl}")
                 
                 with col3:
-                    price = round(product['current_price'] * random.uniform(0.9, 1.1), 2)
-                    st.metric("Price", f"${price}")
-                
-                with col4:
-                    if st.button("🔄", key=f"refresh_{i}_{competitor['name']}"):
-                        st.success("Crawling...")
+                    st.metric("Price", f"${latest[0]:.2f}" if latest else "N/A")
 
 def show_add_competitors():
     """Add new competitors interface"""
@@ -568,7 +976,24 @@ def show_add_competitors():
                 geo_location = st.selectbox("Geo Location", ["US", "UK", "EU", "Asia-Pacific"])
             
             if st.form_submit_button("🎯 Start Tracking", use_container_width=True):
-                st.success(f"✅ Now tracking {competitor_name} for {product_select}")
+                if not competitor_url or not competitor_name:
+                    st.error("Competitor URL and name are required")
+                else:
+                    product = next(p for p in st.session_state.products if p['name'] == product_select)
+                    target = {
+                        "url": competitor_url,
+                        "product_id": product['id'],
+                        "product_name": product['name'],
+                        "sku": product['sku'],
+                        "source": competitor_name,
+                        "frequency": crawl_frequency,
+                        "geo_location": geo_location,
+                    }
+                    # The scheduler's heaps are shared by every session
+                    with st.session_state.shared_data.lock:
+                        st.session_state.tracked_urls.append(target)
+                        st.session_state.crawl_scheduler.add(target, crawl_frequency)
+                    st.success(f"✅ Now tracking {competitor_name} for {product_select}")
     
     with col2:
         st.markdown("#### 🤖 Automatic Discovery")
@@ -599,29 +1024,34 @@ def show_crawl_settings():
     """Crawl configuration settings"""
     st.markdown("### 🌐 Web Crawling Configuration")
     
+    settings = st.session_state.crawl_settings
+    frequencies = ["Every 15 minutes", "Every Hour", "Every 6 Hours", "Daily", "Weekly"]
+    anti_bot_levels = ["Basic", "Standard", "Advanced", "Maximum"]
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### Crawl Infrastructure")
         
-        use_proxies = st.checkbox("Use Rotating Proxies", value=True)
+        use_proxies = st.checkbox("Use Rotating Proxies", value=settings['use_proxies'])
+        proxy_pool_size = settings['proxy_pool_size']
         if use_proxies:
-            proxy_pool_size = st.slider("Proxy Pool Size", 10, 1000, 100)
+            proxy_pool_size = st.slider("Proxy Pool Size", 10, 1000, proxy_pool_size)
             st.info(f"Using {proxy_pool_size} rotating proxy IPs")
         
         anti_bot_level = st.select_slider(
             "Anti-Bot Protection Level",
-            options=["Basic", "Standard", "Advanced", "Maximum"],
-            value="Advanced"
+            options=anti_bot_levels,
+            value=settings['anti_bot_level']
         )
         
-        headless_browser = st.checkbox("Use Headless Browser (for JS sites)", value=True)
+        headless_browser = st.checkbox("Use Headless Browser (for JS sites)", value=settings['headless_browser'])
         
         st.markdown("#### Geographic Routing")
         geo_regions = st.multiselect(
             "Crawl from Regions",
             ["North America", "Europe", "Asia", "South America", "Australia"],
-            default=["North America"]
+            default=settings['geo_regions']
         )
         
     with col2:
@@ -629,22 +1059,70 @@ def show_crawl_settings():
         
         default_frequency = st.selectbox(
             "Default Crawl Frequency",
-            ["Every 15 minutes", "Every Hour", "Every 6 Hours", "Daily", "Weekly"]
+            frequencies,
+            index=frequencies.index(settings['default_frequency'])
         )
         
-        peak_hours = st.checkbox("Increase frequency during peak hours (9AM-5PM)")
+        peak_hours = st.checkbox("Increase frequency during peak hours (9AM-5PM)", value=settings['peak_hours'])
+        
+        rate_limit = st.number_input("Requests per minute (per competitor)", 1, 60, settings['requests_per_minute'])
         
-        rate_limit = st.number_input("Requests per minute (per competitor)", 1, 60, 10)
+        concurrency = st.number_input("Max concurrent requests", 1, 1000, settings['concurrency'])
         
         st.markdown("#### Data Extraction")
         
-        extract_variants = st.checkbox("Extract Product Variants (size, color)", value=True)
-        extract_shipping = st.checkbox("Extract Shipping Costs", value=True)
-        extract_reviews = st.checkbox("Extract Review Scores", value=False)
-        extract_availability = st.checkbox("Track Stock Availability", value=True)
+        extract_variants = st.checkbox("Extract Product Variants (size, color)", value=settings['extract_variants'])
+        extract_shipping = st.checkbox("Extract Shipping Costs", value=settings['extract_shipping'])
+        extract_reviews = st.checkbox("Extract Review Scores", value=settings['extract_reviews'])
+        extract_availability = st.checkbox("Track Stock Availability", value=settings['extract_availability'])
         
     if st.button("💾 Save Crawl Settings", use_container_width=True, type="primary"):
+        settings.update({
+            "use_proxies": use_proxies,
+            "proxy_pool_size": proxy_pool_size,
+            "anti_bot_level": anti_bot_level,
+            "headless_browser": headless_browser,
+            "geo_regions": geo_regions,
+            "default_frequency": default_frequency,
+            "peak_hours": peak_hours,
+            "requests_per_minute": int(rate_limit),
+            "concurrency": int(concurrency),
+            "extract_variants": extract_variants,
+            "extract_shipping": extract_shipping,
+            "extract_reviews": extract_reviews,
+            "extract_availability": extract_availability,
+        })
+        with st.session_state.shared_data.lock:
+            st.session_state.crawl_scheduler.configure(requests_per_minute=int(rate_limit), peak_hours=peak_hours)
         st.success("✅ Crawl settings updated successfully!")
+    
+    st.markdown("#### ⏱️ Crawl Queue")
+    
+    scheduler = st.session_state.crawl_scheduler
+    with st.session_state.shared_data.lock:
+        next_due = scheduler.next_due()
+    col_q1, col_q2, col_q3 = st.columns([1, 1, 1])
+    with col_q1:
+        st.metric("Scheduled URLs", f"{len(scheduler):,}")
+    with col_q2:
+        st.metric("Next Due", datetime.fromtimestamp(next_due).strftime('%H:%M:%S') if next_due else "—")
+    with col_q3:
+        if st.button("▶️ Run Due Crawls", use_container_width=True, disabled=not len(scheduler)):
+            with st.session_state.shared_data.lock:
+                targets = scheduler.pop_due(limit=settings['concurrency'])
+            if targets:
+                with st.spinner(f"Crawling {len(targets)} URLs..."):
+                    results = _run_crawl(targets)
+                st.success(f"✅ Crawled {sum(r['ok'] for r in results)} of {len(results)} URLs")
+            else:
+                st.info("Nothing is due yet")
+
+def _attribute_checkbox(label, attribute, matching_method):
+    """Matching attribute toggle; attributes the method ignores are shown disabled and count as off"""
+    unused = attribute not in METHOD_ATTRIBUTES[MATCHING_METHODS[matching_method]]
+    used = st.checkbox(label, value=True, disabled=unused,
+                       help=f"Not used by {matching_method}" if unused else None)
+    return used and not unused
 
 def show_auto_matching():
     """AI-based product matching configuration"""
@@ -657,53 +1135,148 @@ def show_auto_matching():
     with col1:
         st.markdown("#### Matching Algorithm Configuration")
         
-        matching_method = st.radio(
-            "Primary Matching Method",
-            ["AI Similarity Scoring (Recommended)", "SKU/UPC/GTIN Matching", "Hybrid Approach"]
-        )
+        matching_method = st.radio("Primary Matching Method", list(MATCHING_METHODS))
+        method = MATCHING_METHODS[matching_method]
         
         confidence_threshold = st.slider("Minimum Match Confidence %", 50, 100, 85)
         
         st.markdown("#### Matching Attributes")
-        use_brand = st.checkbox("Brand Name", value=True)
-        use_model = st.checkbox("Model Number", value=True)
-        use_upc = st.checkbox("UPC/EAN/GTIN", value=True)
-        use_sku = st.checkbox("SKU", value=True)
-        use_attributes = st.checkbox("Product Attributes (size, color, etc.)", value=True)
-        use_image = st.checkbox("Image Similarity (slower)", value=False)
+        use_brand = _attribute_checkbox("Brand Name", "brand", matching_method)
+        use_model = _attribute_checkbox("Model Number", "model", matching_method)
+        use_upc = _attribute_checkbox("UPC/EAN/GTIN", "gtin", matching_method)
+        use_sku = _attribute_checkbox("SKU", "sku", matching_method)
+        use_attributes = _attribute_checkbox("Product Attributes (size, color, etc.)", "attributes", matching_method)
+        use_image = st.checkbox("Image Similarity (slower)", value=False, disabled=True,
+                                help="Listings are matched on identifiers and titles; images are not compared yet")
         
     with col2:
         st.markdown("#### Match Review Queue")
         
-        auto_approve_high_confidence = st.checkbox("Auto-approve matches >95% confidence", value=True)
-        
-        st.markdown("##### Pending Matches for Review")
-        
-        for i in range(3):
-            with st.expander(f"Match #{i+1} - {random.randint(75, 94)}% confidence"):
-                col_a, col_b = st.columns(2)
-                
-                with col_a:
-                    st.text("Your Product:")
-                    st.caption(st.session_state.products[i]['name'])
-                    st.caption(f"SKU: {st.session_state.products[i]['sku']}")
-                
-                with col_b:
-                    st.text("Competitor Product:")
-                    st.caption(f"{st.session_state.products[i]['name']} - Similar")
-                    st.caption(f"Competitor SKU: COMP-{i+1}-XXX")
-                
-                col_x, col_y = st.columns(2)
-                with col_x:
-                    if st.button("✅ Approve Match", key=f"approve_{i}"):
-                        st.success("Match approved!")
-                with col_y:
-                    if st.button("❌ Reject Match", key=f"reject_{i}"):
-                        st.error("Match rejected")
-    
-    if st.button("🔄 Run Auto-Matching Now", use_container_width=True, type="primary"):
-        with st.spinner("Running AI matching algorithm..."):
-            st.success("✅ Found 47 new matches. 38 auto-approved, 9 pending review.")
+        auto_approve_high_confidence = st.checkbox(f"Auto-approve matches >{AUTO_APPROVE_CONFIDENCE}% confidence", value=True)
+        
+        st.caption("Matches at or above the confidence threshold wait in the review queue below; "
+                   "approved matches are added to the tracked URLs.")
+    
+    data = st.session_state.shared_data
+    job = data.matching_job
+    if st.button("🔄 Run Auto-Matching Now", use_container_width=True, type="primary", disabled=job.running):
+        attributes = [name for name, used in (("brand", use_brand), ("model", use_model), ("gtin", use_upc),
+                                              ("sku", use_sku), ("attributes", use_attributes)) if used]
+        listings = data.competitor_listings
+        started = job.start(data.products.frame(), listings, method=method, attributes=attributes,
+                            finish=lambda matches: _queue_matches(matches, len(listings), data),
+                            threshold=confidence_threshold, auto_approve=auto_approve_high_confidence)
+        if not started:
+            st.warning("Auto-matching is already running")
+    
+    # Matching runs on a background thread; only this status polls while it does
+    st.fragment(show_matching_job, run_every=MATCHING_POLL_SECONDS if job.running else None)()
+    
+    st.markdown("##### Pending Matches for Review")
+    # Reviewing a page reruns only the queue, not the whole page
+    st.fragment(show_match_review_queue)()
+
+def _queue_matches(matches, listing_count, data):
+    """Queue a matching run's matches and track the auto-approved ones; runs on the matching thread"""
+    # Listings reviewed in earlier runs keep their decision
+    approved = data.match_queue.add(matches)
+    tracked = _track_matches(approved, data)
+    return {"matches": len(matches), "listings": listing_count, "approved": len(approved), "tracked": tracked}
+
+def show_matching_job():
+    """Progress of the background matching run, then its summary"""
+    job = st.session_state.shared_data.matching_job
+    if job.running:
+        st.session_state.matching_run_watched = job.runs
+        st.progress(job.progress, text=f"Matching competitor listings... {job.progress:.0%}")
+        return
+    if st.session_state.get("matching_run_watched") == job.runs:
+        # The run this page was polling just ended; redraw it so the queue shows the new matches
+        del st.session_state.matching_run_watched
+        st.rerun()
+    if job.error:
+        st.error(f"Auto-matching failed: {job.error}")
+    elif job.result:
+        summary = job.result
+        st.success(f"✅ Found {summary['matches']:,} matches in {summary['listings']:,} listings. "
+                   f"{summary['approved']:,} auto-approved ({summary['tracked']:,} new tracked URLs), "
+                   f"{st.session_state.shared_data.match_queue.counts()['pending']:,} pending review.")
+
+def show_match_review_queue():
+    """Pending matches, best first, approved or rejected a page at a time"""
+    data = st.session_state.shared_data
+    queue = data.match_queue
+    counts = queue.counts()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Pending", f"{counts['pending']:,}")
+    with col2:
+        st.metric("Approved", f"{counts['approved']:,}")
+    with col3:
+        st.metric("Rejected", f"{counts['rejected']:,}")
+    
+    if not counts["pending"]:
+        st.info("No matches waiting for review. Run auto-matching to find competitor listings.")
+        return
+    
+    col_size, col_page = st.columns(2)
+    with col_size:
+        page_size = st.selectbox("Matches per page", MATCH_PAGE_SIZES, index=1, key="match_page_size")
+    pages = max(1, -(-counts["pending"] // page_size))
+    if st.session_state.get("match_page", 1) > pages:
+        st.session_state.match_page = pages
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=pages, key="match_page")
+    
+    rows = queue.page(offset=(page - 1) * page_size, limit=page_size)
+    products = st.session_state.products
+    matched = [products.get(product_id) or {} for product_id in rows["product_id"]]
+    table = pd.DataFrame({
+        "Select": True,
+        "Confidence": rows["confidence"],
+        "Your Product": [product.get("name") for product in matched],
+        "SKU": [product.get("sku") for product in matched],
+        "Competitor Listing": rows["title"],
+        "Source": rows["source"],
+        "Competitor SKU": rows["listing_sku"],
+        "Method": rows["method"],
+    })
+    
+    # Checkbox edits stay in the browser until the form is submitted, so a whole page costs one rerun;
+    # the review is written from the button callback, before the queue is drawn again
+    editor_key = f"match_review_{rows['id'].iloc[0]}_{len(rows)}"
+    ids = rows["id"].tolist()
+    with st.form("match_review"):
+        st.data_editor(
+            table,
+            hide_index=True,
+            use_container_width=True,
+            disabled=[column for column in table.columns if column != "Select"],
+            column_config={
+                "Select": st.column_config.CheckboxColumn(help="Untick the matches to leave out of this action"),
+                "Confidence": st.column_config.NumberColumn(format="%.1f%%"),
+            },
+            key=editor_key,
+        )
+        col_a, col_r = st.columns(2)
+        with col_a:
+            st.form_submit_button("✅ Approve selected", use_container_width=True, type="primary",
+                                  on_click=_review_matches, args=(ids, editor_key, "approved"))
+        with col_r:
+            st.form_submit_button("❌ Reject selected", use_container_width=True,
+                                  on_click=_review_matches, args=(ids, editor_key, "rejected"))
+
+def _review_matches(ids, editor_key, status):
+    """Approve or reject the ticked rows of a review page in one batch"""
+    data = st.session_state.shared_data
+    unticked = {row for row, change in st.session_state.get(editor_key, {}).get("edited_rows", {}).items()
+                if not change.get("Select", True)}
+    reviewed = data.match_queue.review([i for row, i in enumerate(ids) if row not in unticked], status)
+    if status == "approved":
+        tracked = _track_matches(reviewed, data)
+        st.toast(f"✅ Approved {len(reviewed):,} matches, {tracked:,} new tracked URLs")
+    else:
+        st.toast(f"❌ Rejected {len(reviewed):,} matches")
 
 def show_dynamic_pricing():
     """Dynamic pricing configuration and management"""
@@ -736,13 +1309,46 @@ def show_active_pricing_rules():
     with col3:
         st.metric("Price Changes (24h)", 18)
     with col4:
-        st.metric("Avg Response Time", "12 min")
+        last_run = st.session_state.shared_data.repricer.last_run
+        if last_run:
+            st.metric("Last Real-time Reprice", f"{last_run['seconds'] * 1000:.0f} ms",
+                      f"{last_run['rules']} rules at {last_run['at']:%H:%M}", delta_color="off")
+        else:
+            st.metric("Last Real-time Reprice", "—")
+    
+    # Recommendations for every active rule in one vectorized pass
+    st.markdown("#### 💡 Recommended Prices")
+    
+    recommendations = evaluate_rules(
+        st.session_state.dynamic_pricing_rules, st.session_state.products, st.session_state.price_history
+    )
+    if recommendations.empty:
+        st.info("No active rules to evaluate")
+    else:
+        st.dataframe(
+            recommendations,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "rule_id": st.column_config.NumberColumn("Rule"),
+                "sku": "SKU",
+                "current_price": st.column_config.NumberColumn("Current", format="$%.2f"),
+                "lowest_competitor": st.column_config.NumberColumn("Lowest Competitor", format="$%.2f"),
+                "recommended_price": st.column_config.NumberColumn("Recommended", format="$%.2f"),
+                "change_pct": st.column_config.NumberColumn("Change", format="%+.1f%%"),
+                "reason": "Reason",
+            }
+        )
+        if st.button("✅ Apply Recommended Prices", type="primary"):
+            applied = _apply_price_changes(recommendations)
+            st.success(f"✅ Updated prices on {applied} products")
+    recommended_by_rule = recommendations.set_index('rule_id') if not recommendations.empty else None
     
     # Rules table
     st.markdown("#### Current Rules")
     
     for i, rule in enumerate(st.session_state.dynamic_pricing_rules):
-        product = next((p for p in st.session_state.products if p['sku'] == rule['product_sku']), None)
+        product = st.session_state.products.get_sku(rule['product_sku'])
         
         with st.expander(f"{'✅' if rule['active'] else '⏸️'} Rule #{rule['id']}: {product['name'] if product else rule['product_sku']}", expanded=False):
             col1, col2, col3 = st.columns(3)
@@ -764,12 +1370,18 @@ def show_active_pricing_rules():
                 if product:
                     current_margin = (product['current_price'] - product['cost']) / product['current_price'] * 100
                     st.text(f"Current Margin: {current_margin:.1f}%")
+                if recommended_by_rule is not None and rule['id'] in recommended_by_rule.index:
+                    recommendation = recommended_by_rule.loc[rule['id']]
+                    st.text(f"Recommended: ${recommendation['recommended_price']:.2f}")
+                    st.caption(recommendation['reason'])
             
             with col3:
                 st.markdown("**Actions**")
                 new_status = st.toggle("Active", value=rule['active'], key=f"rule_status_{i}")
                 if new_status != rule['active']:
-                    rule['active'] = new_status
+                    with st.session_state.shared_data.lock:
+                        rule['active'] = new_status
+                        st.session_state.shared_data.repricer.add_rule(rule)
                     st.success("Status updated!")
                 
                 if st.button("Edit Rule", key=f"edit_rule_{i}"):
@@ -849,6 +1461,29 @@ def show_create_pricing_rule():
             max_change_per_update = st.number_input("Max price change per update %", 1, 50, 10)
         
         if st.form_submit_button("🚀 Create Pricing Rule", use_container_width=True, type="primary"):
+            rules = st.session_state.dynamic_pricing_rules
+            rule = {
+                "id": max((r['id'] for r in rules), default=0) + 1,
+                "product_sku": product_sku.rsplit(" (", 1)[1].rstrip(")"),
+                "rule_type": STRATEGY_RULE_TYPES[strategy],
+                "floor_price": floor_price,
+                "ceiling_price": ceiling_price,
+                "margin_min": min_margin,
+                "max_change_per_update": max_change_per_update,
+                "update_frequency": update_frequency,
+                "active": True,
+            }
+            if "Beat Lowest" in strategy:
+                rule['beat_by'] = beat_percentage
+            elif "Fixed Margin" in strategy:
+                rule['target_margin'] = target_margin
+            elif "Dynamic Market" in strategy:
+                rule['market_position'] = market_position
+            if not consider_all:
+                rule['competitors'] = selected_competitors
+            with st.session_state.shared_data.lock:
+                rules.append(rule)
+                st.session_state.shared_data.repricer.add_rule(rule)
             st.success("✅ Dynamic pricing rule created successfully!")
             st.balloons()
 
@@ -1022,16 +1657,27 @@ def show_analytics_overview():
     # Detailed metrics table
     st.markdown("#### 📋 Detailed Product Metrics")
     
+    # Own-store prices for the selected dates only; older dates come from the archive
+    history = _history_window(
+        datetime.combine(start_date, datetime.min.time()),
+        datetime.combine(end_date, datetime.max.time())
+    )
+    own_prices = history[history['source'] == "Your Store"].sort_values('date', kind='stable')
+    grouped = own_prices.groupby('product_id', sort=False)['price']
+    avg_prices = grouped.mean()
+    price_changes = (grouped.diff().fillna(0) != 0).groupby(own_prices['product_id']).sum()
+    
     metrics_data = []
     for product in st.session_state.products:
+        avg_price = avg_prices.get(product['id'], product['current_price'])
         metrics_data.append({
             "Product": product['name'],
             "Revenue (30d)": f"${random.randint(20000, 100000):,}",
             "Units Sold": random.randint(100, 500),
-            "Avg Price": f"${product['current_price']:.2f}",
+            "Avg Price": f"${avg_price:.2f}",
             "Margin %": f"{((product['current_price'] - product['cost']) / product['current_price'] * 100):.1f}%",
             "Win Rate": f"{random.randint(60, 85)}%",
-            "Price Changes": random.randint(5, 25)
+            "Price Changes": int(price_changes.get(product['id'], 0))
         })
     
     st.dataframe(pd.DataFrame(metrics_data), use_container_width=True, hide_index=True)
@@ -1139,18 +1785,12 @@ def show_trend_analysis():
     # Price trends
     st.markdown("#### 💹 Price Trends by Category")
     
-    selected_category = st.selectbox("Select Category", ["All Categories", "Electronics", "Audio", "Accessories"])
+    categories = st.session_state.products.categories()
+    selected_category = st.selectbox("Select Category", ["All Categories"] + categories)
     
-    dates = pd.date_range(end=datetime.now(), periods=90, freq='D')
-    
-    fig = go.Figure()
-    
-    for product in st.session_state.products[:3]:
-        prices = [product['current_price'] + np.random.normal(0, product['current_price']*0.05) for _ in range(90)]
-        fig.add_trace(go.Scatter(x=dates, y=prices, name=product['name'], mode='lines'))
-    
-    fig.update_layout(height=400, margin=dict(l=0, r=0, t=10, b=0), hovermode='x unified')
-    st.plotly_chart(fig, use_container_width=True)
+    zoom_start, zoom_end = _zoom_range("trend_zoom", datetime.now() - timedelta(days=90), datetime.now())
+    st.plotly_chart(_cached_figure("price_trends", _price_trends_figure, selected_category, zoom_start, zoom_end),
+                    use_container_width=True)
     
     # Seasonal patterns
     st.markdown("#### 📅 Seasonal Patterns")
@@ -1173,6 +1813,15 @@ def show_trend_analysis():
         fig.update_layout(title="Price Volatility %", height=300)
         st.plotly_chart(fig, use_container_width=True)
 
+def _price_trends_figure(category, start, end):
+    """Price trends of the first products in a category, downsampled per trace"""
+    products = st.session_state.products[:3] if category == "All Categories" else st.session_state.products.in_category(category, limit=3)
+    
+    fig = go.Figure()
+    _add_price_traces(fig, _history_window(start, end), products, mode='lines')
+    fig.update_layout(height=400, margin=dict(l=0, r=0, t=10, b=0), hovermode='x unified')
+    return fig
+
 def show_export_reports():
     """Export and reporting interface"""
     st.markdown("### 📄 Export Reports")
@@ -1262,14 +1911,15 @@ def show_active_alerts():
     # Alert summary
     col1, col2, col3, col4 = st.columns(4)
     
+    alerts = st.session_state.alerts
     with col1:
-        st.metric("Critical Alerts", len([a for a in st.session_state.alerts if a['type'] == 'critical']))
+        st.metric("Critical Alerts", alerts.counts['critical'])
     with col2:
-        st.metric("Warnings", len([a for a in st.session_state.alerts if a['type'] == 'warning']))
+        st.metric("Warnings", alerts.counts['warning'])
     with col3:
-        st.metric("Info", len([a for a in st.session_state.alerts if a['type'] == 'info']))
+        st.metric("Info", alerts.counts['info'])
     with col4:
-        st.metric("Resolved Today", 12)
+        st.metric("Resolved Today", alerts.dismissed_since(datetime.combine(datetime.now().date(), datetime.min.time())))
     
     # Filter controls
     col_f1, col_f2, col_f3 = st.columns(3)
@@ -1281,39 +1931,74 @@ def show_active_alerts():
     with col_f3:
         product_filter = st.selectbox("Product", ["All Products"] + [p['name'] for p in st.session_state.products])
     
-    # Alert list
+    # Alert feed: one editable table per page, paged by (time, id) cursors over the store's indexes
     st.markdown("#### Recent Alerts")
     
-    for alert in st.session_state.alerts:
-        alert_class = f"alert-{alert['type']}"
-        icon = "🔴" if alert['type'] == "critical" else ("⚠️" if alert['type'] == "warning" else "ℹ️")
-        
-        time_diff = datetime.now() - alert['time']
-        if time_diff.days > 0:
-            time_ago = f"{time_diff.days} days ago"
-        elif time_diff.seconds // 3600 > 0:
-            time_ago = f"{time_diff.seconds // 3600} hours ago"
-        else:
-            time_ago = f"{time_diff.seconds // 60} minutes ago"
-        
-        with st.container():
-            col_alert1, col_alert2, col_alert3 = st.columns([6, 2, 2])
-            
-            with col_alert1:
-                st.markdown(f"""
-                <div class="alert-card {alert_class}">
-                    {icon} <strong>{alert['message']}</strong><br>
-                    <small>{time_ago} • Product: {alert['product']}</small>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col_alert2:
-                if st.button("View Details", key=f"view_{alert['time']}"):
-                    st.info("Alert details opened")
-            
-            with col_alert3:
-                if st.button("Dismiss", key=f"dismiss_{alert['time']}"):
-                    st.success("Alert dismissed")
+    since = ALERT_TIME_RANGES[time_filter]
+    filters = {
+        "start": datetime.now() - since if since is not None else None,
+        "alert_type": alert_filter.lower() if alert_filter != "All" else None,
+        "product": next((p['sku'] for p in st.session_state.products if p['name'] == product_filter), None),
+    }
+    page_size = st.selectbox("Alerts per page", ALERT_PAGE_SIZES, key="alert_page_size")
+    
+    # The cursor stack holds the cursor of every page up to the current one; new filters start over
+    filter_key = (alert_filter, time_filter, product_filter, page_size)
+    if st.session_state.get('alert_feed_filters') != filter_key:
+        st.session_state.alert_feed_filters = filter_key
+        st.session_state.alert_cursors = [None]
+    cursors = st.session_state.alert_cursors
+    page_alerts, next_cursor = alerts.page(cursors[-1], page_size, **filters)
+    matching = alerts.count(**filters)
+    st.caption(f"{matching:,} matching alerts • page {len(cursors)}")
+    
+    if not page_alerts:
+        st.info("No alerts match the current filters")
+    else:
+        feed = pd.DataFrame({
+            "dismiss": False,
+            "severity": [ALERT_ICONS[a['type']] for a in page_alerts],
+            "time": [a['time'] for a in page_alerts],
+            "message": [a['message'] for a in page_alerts],
+            "product": [a['product'] for a in page_alerts],
+            "source": [a.get('source', '') for a in page_alerts],
+        }, index=pd.Index([a['id'] for a in page_alerts], name="id"))
+        edited = st.data_editor(
+            feed,
+            key=f"alert_feed_{alerts.version}_{len(cursors)}",
+            use_container_width=True,
+            disabled=["severity", "time", "message", "product", "source"],
+            column_config={
+                "dismiss": st.column_config.CheckboxColumn("Dismiss", width="small"),
+                "severity": st.column_config.TextColumn("", width="small"),
+                "time": st.column_config.DatetimeColumn("Time", format="MMM D, HH:mm"),
+                "message": st.column_config.TextColumn("Alert", width="large"),
+                "product": "Product",
+                "source": "Source",
+            }
+        )
+        selected = edited.index[edited['dismiss']].tolist()
+    
+    col_p1, col_p2, col_p3, col_p4 = st.columns(4)
+    with col_p1:
+        if st.button("◀️ Newer", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col_p2:
+        if st.button("Older ▶️", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+    with col_p3:
+        if st.button("🗑️ Dismiss Selected", disabled=not page_alerts or not selected, use_container_width=True):
+            with st.session_state.shared_data.lock:
+                alerts.dismiss_many(selected)
+            st.rerun()
+    with col_p4:
+        if st.button(f"🧹 Dismiss All {matching:,} Matching", disabled=not matching, use_container_width=True):
+            with st.session_state.shared_data.lock:
+                alerts.dismiss_many([a['id'] for a in alerts.query(**filters)])
+            st.session_state.alert_cursors = [None]
+            st.rerun()
 
 def show_alert_rules():
     """Alert rules configuration"""
@@ -1327,11 +2012,7 @@ def show_alert_rules():
         with col1:
             rule_name = st.text_input("Rule Name", "Price Drop Alert")
             
-            trigger_type = st.selectbox(
-                "Trigger Type",
-                ["Price Change", "MAP Violation", "Stock Status", "Competitor Price", 
-                 "Margin Threshold", "Market Position", "Custom Condition"]
-            )
+            trigger_type = st.selectbox("Trigger Type", TRIGGER_TYPES)
             
             if trigger_type == "Price Change":
                 threshold = st.number_input("Price change threshold %", 1, 100, 10)
@@ -1358,54 +2039,79 @@ def show_alert_rules():
                 default=[st.session_state.products[0]['name']]
             )
             
+            cooldown_minutes = st.number_input("Cooldown (minutes)", 0, 1440, DEFAULT_COOLDOWN_MINUTES,
+                                               help="Repeat alerts for the same product and source are suppressed for this long")
+            
             active = st.checkbox("Activate immediately", value=True)
         
         if st.form_submit_button("✅ Create Alert Rule", use_container_width=True):
+            rules = st.session_state.alert_rules
+            skus_by_name = {p['name']: p['sku'] for p in st.session_state.products}
+            rule = {
+                "id": max((r['id'] for r in rules), default=0) + 1,
+                "name": rule_name,
+                "trigger_type": trigger_type,
+                "severity": severity,
+                "products": [skus_by_name[name] for name in products_for_rule],
+                "channels": notify_channels,
+                "cooldown_minutes": cooldown_minutes,
+                "active": active,
+                "triggers": 0,
+            }
+            if trigger_type == "Price Change":
+                rule['threshold'] = threshold
+                rule['direction'] = direction
+            elif trigger_type == "MAP Violation":
+                rule['map_price'] = map_price
+            elif trigger_type == "Margin Threshold":
+                rule['margin_threshold'] = margin_threshold
+            with st.session_state.shared_data.lock:
+                rules.append(rule)
+                st.session_state.shared_data.alert_evaluator.add_rule(rule)
             st.success("Alert rule created successfully!")
     
     # Existing rules
     st.markdown("#### Existing Alert Rules")
     
-    existing_rules = [
-        {"name": "Competitor Price Drop >10%", "type": "Critical", "active": True, "triggers": 24},
-        {"name": "MAP Violation Detection", "type": "Critical", "active": True, "triggers": 5},
-        {"name": "Low Margin Alert <25%", "type": "Warning", "active": True, "triggers": 12},
-        {"name": "Stock-Out Detection", "type": "Warning", "active": True, "triggers": 8},
-        {"name": "Price Volatility High", "type": "Info", "active": False, "triggers": 0},
-    ]
+    evaluator = st.session_state.shared_data.alert_evaluator
+    st.caption(f"{evaluator.processed:,} observations evaluated • {evaluator.suppressed:,} repeat alerts suppressed by cooldown")
     
-    for rule in existing_rules:
-        with st.expander(f"{'✅' if rule['active'] else '⏸️'} {rule['name']} - {rule['type']}"):
+    for rule in st.session_state.alert_rules:
+        with st.expander(f"{'✅' if rule['active'] else '⏸️'} {rule['name']} - {rule['severity']}"):
             col_r1, col_r2, col_r3 = st.columns(3)
             
             with col_r1:
                 st.text(f"Status: {'Active' if rule['active'] else 'Paused'}")
-                st.text(f"Triggers (7d): {rule['triggers']}")
+                st.text(f"Trigger: {rule['trigger_type']}")
+                st.text(f"Triggers: {rule['triggers']}")
             
             with col_r2:
-                if st.button("Edit", key=f"edit_{rule['name']}"):
+                if st.button("Edit", key=f"edit_alert_rule_{rule['id']}"):
                     st.info("Edit mode")
             
             with col_r3:
-                if st.button("Delete", key=f"delete_{rule['name']}"):
+                if st.button("Delete", key=f"delete_alert_rule_{rule['id']}"):
                     st.warning("Deleted")
 
 def show_alert_analytics():
     """Alert analytics"""
     st.markdown("### 📊 Alert Analytics")
     
+    # Every chart reads the store's hourly/daily rollups, never the raw alerts
+    rollups = st.session_state.alerts.rollups
+    period = st.selectbox("Period", list(ALERT_ANALYTICS_PERIODS), index=2, key="alert_analytics_period")
+    span, freq = ALERT_ANALYTICS_PERIODS[period]
+    start = datetime.now() - span
+    
     # Alert trends
-    dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
-    critical_alerts = [random.randint(0, 5) for _ in range(30)]
-    warning_alerts = [random.randint(2, 10) for _ in range(30)]
-    info_alerts = [random.randint(5, 15) for _ in range(30)]
+    volume = rollups.volume(start, freq=freq)
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=dates, y=critical_alerts, name='Critical', 
+    fig.add_trace(go.Scatter(x=volume.index, y=volume['critical'], name='Critical', 
                              stackgroup='one', fillcolor='#f44', line=dict(width=0)))
-    fig.add_trace(go.Scatter(x=dates, y=warning_alerts, name='Warning',
+    fig.add_trace(go.Scatter(x=volume.index, y=volume['warning'], name='Warning',
                              stackgroup='one', fillcolor='#fa0', line=dict(width=0)))
-    fig.add_trace(go.Scatter(x=dates, y=info_alerts, name='Info',
+    fig.add_trace(go.Scatter(x=volume.index, y=volume['info'], name='Info',
                              stackgroup='one', fillcolor='#4af', line=dict(width=0)))
     
     fig.update_layout(height=300, title="Alert Volume Over Time")
@@ -1417,65 +2123,124 @@ def show_alert_analytics():
     with col1:
         st.markdown("#### 🎯 Alerts by Type")
         
-        alert_types = ['Price Drop', 'MAP Violation', 'Stock-Out', 'High Volatility', 'Margin Low']
-        alert_counts = [45, 12, 18, 28, 15]
-        
-        fig = go.Figure(data=[go.Pie(labels=alert_types, values=alert_counts)])
-        fig.update_layout(height=300)
-        st.plotly_chart(fig, use_container_width=True)
+        by_trigger = rollups.by_trigger(start)
+        if by_trigger.empty:
+            st.info("No alerts in this period")
+        else:
+            fig = go.Figure(data=[go.Pie(labels=by_trigger.index, values=by_trigger.values)])
+            fig.update_layout(height=300)
+            st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.markdown("#### ⏱️ Response Time")
         
-        response_times = ['<5 min', '5-15 min', '15-30 min', '30-60 min', '>1 hour']
-        response_counts = [35, 42, 18, 8, 3]
-        
-        fig = go.Figure(data=[go.Bar(x=response_times, y=response_counts, marker_color='#667eea')])
-        fig.update_layout(height=300, yaxis_title="Count")
+        response = rollups.ack_histogram(start)
+        fig = go.Figure(data=[go.Bar(x=response.index, y=response.values, marker_color='#667eea')])
+        fig.update_layout(height=300, yaxis_title="Count", xaxis_title="Time to acknowledge")
         st.plotly_chart(fig, use_container_width=True)
 
 def show_notification_settings():
     """Notification settings"""
     st.markdown("### 📧 Notification Settings")
     
+    settings = st.session_state.notification_settings
+    dispatcher = st.session_state.shared_data.notifier
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### Email Notifications")
         
-        email_enabled = st.checkbox("Enable email notifications", value=True)
+        email_enabled = st.checkbox("Enable email notifications", value=settings['email_enabled'])
+        email_address = settings['email_address']
+        email_levels = settings['email_levels']
+        digest_mode = settings['digest_mode']
+        digest_time = datetime.strptime(settings['digest_time'], "%H:%M").time()
         
         if email_enabled:
-            email_address = st.text_input("Email Address", "your@email.com")
+            email_address = st.text_input("Email Address", settings['email_address'], placeholder="you@example.com")
             
             st.markdown("**Alert Levels to Email**")
-            email_critical = st.checkbox("Critical alerts", value=True, key="email_crit")
-            email_warning = st.checkbox("Warning alerts", value=True, key="email_warn")
-            email_info = st.checkbox("Info alerts", value=False, key="email_info")
+            email_critical = st.checkbox("Critical alerts", value='critical' in settings['email_levels'], key="email_crit")
+            email_warning = st.checkbox("Warning alerts", value='warning' in settings['email_levels'], key="email_warn")
+            email_info = st.checkbox("Info alerts", value='info' in settings['email_levels'], key="email_info")
+            email_levels = [level for level, on in [("critical", email_critical), ("warning", email_warning), ("info", email_info)] if on]
             
-            digest_mode = st.checkbox("Send daily digest instead of real-time", value=False)
+            digest_mode = st.checkbox("Send daily digest instead of real-time", value=settings['digest_mode'])
             
             if digest_mode:
-                digest_time = st.time_input("Digest delivery time", datetime.now().time())
+                digest_time = st.time_input("Digest delivery time", digest_time)
     
     with col2:
         st.markdown("#### Other Notification Channels")
         
-        slack_enabled = st.checkbox("Slack notifications", value=False)
+        slack_enabled = st.checkbox("Slack notifications", value=settings['slack_enabled'])
+        slack_webhook, slack_channel = settings['slack_webhook'], settings['slack_channel']
         if slack_enabled:
-            slack_webhook = st.text_input("Slack Webhook URL", type="password")
-            slack_channel = st.text_input("Channel", "#price-alerts")
+            slack_webhook = st.text_input("Slack Webhook URL", settings['slack_webhook'], type="password")
+            slack_channel = st.text_input("Channel", settings['slack_channel'])
         
-        sms_enabled = st.checkbox("SMS notifications (critical only)", value=False)
+        sms_enabled = st.checkbox("SMS notifications (critical only)", value=settings['sms_enabled'])
+        phone_number, sms_gateway_url = settings['phone_number'], settings['sms_gateway_url']
         if sms_enabled:
-            phone_number = st.text_input("Phone Number", "+1 (555) 000-0000")
+            phone_number = st.text_input("Phone Number", settings['phone_number'] or "+1 (555) 000-0000")
+            sms_gateway_url = st.text_input("SMS Gateway URL", settings['sms_gateway_url'])
         
-        webhook_enabled = st.checkbox("Custom webhook", value=False)
+        webhook_enabled = st.checkbox("Custom webhook", value=settings['webhook_enabled'])
+        webhook_url = settings['webhook_url']
         if webhook_enabled:
-            webhook_url = st.text_input("Webhook URL", "https://your-api.com/alerts")
+            webhook_url = st.text_input("Webhook URL", settings['webhook_url'] or "https://your-api.com/alerts")
     
     if st.button("💾 Save Notification Settings", use_container_width=True, type="primary"):
+        settings.update({
+            "email_enabled": email_enabled,
+            "email_address": email_address,
+            "email_levels": email_levels,
+            "digest_mode": digest_mode,
+            "digest_time": digest_time.strftime("%H:%M"),
+            "slack_enabled": slack_enabled,
+            "slack_webhook": slack_webhook,
+            "slack_channel": slack_channel,
+            "sms_enabled": sms_enabled,
+            "phone_number": phone_number,
+            "sms_gateway_url": sms_gateway_url,
+            "webhook_enabled": webhook_enabled,
+            "webhook_url": webhook_url,
+        })
+        dispatcher.configure(settings)
         st.success("✅ Notification settings saved!")
+    
+    # Delivery status from the background dispatcher
+    st.markdown("#### 📬 Delivery Status")
+    
+    st.dataframe(
+        pd.DataFrame([
+            {"channel": channel.title(), **{k: dispatcher.stats[channel][k] for k in ("messages", "alerts", "retries", "failed", "overflow")},
+             "last_error": dispatcher.last_error.get(channel, "")}
+            for channel in NOTIFICATION_CHANNELS
+        ]),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "channel": "Channel",
+            "messages": "Messages Sent",
+            "alerts": "Alerts Delivered",
+            "retries": "Retries",
+            "failed": "Failed",
+            "overflow": "Dropped (Queue Full)",
+            "last_error": "Last Error",
+        }
+    )
+    if settings['digest_mode']:
+        col_d1, col_d2 = st.columns([3, 1])
+        with col_d1:
+            st.caption(f"{dispatcher.pending_digest():,} alerts waiting for the digest due {dispatcher.next_digest():%b %d, %H:%M}")
+        with col_d2:
+            if st.button("📨 Send Digest Now", use_container_width=True):
+                if dispatcher.send_digest():
+                    st.success("✅ Digest sent")
+                else:
+                    st.info("Nothing to send")
 
 def show_settings():
     """Settings and integration interface"""
@@ -1649,13 +2414,26 @@ def show_general_settings():
         st.markdown("#### Dashboard Settings")
         
         default_time_range = st.selectbox("Default Time Range", ["Last 7 Days", "Last 30 Days", "Last 90 Days"])
-        dashboard_refresh = st.selectbox("Auto-refresh interval", ["Off", "30 seconds", "1 minute", "5 minutes"])
+        dashboard_refresh = st.selectbox("Auto-refresh interval", list(REFRESH_INTERVALS),
+                                         index=list(REFRESH_INTERVALS).index(st.session_state.refresh_interval))
     
     with col2:
         st.markdown("#### Data Retention")
         
-        price_history_retention = st.selectbox("Price History Retention", ["30 days", "90 days", "1 year", "Forever"])
-        alert_retention = st.selectbox("Alert History Retention", ["7 days", "30 days", "90 days", "1 year"])
+        retention = st.session_state.shared_data.retention
+        price_history_options = ["30 days", "90 days", "1 year", "Forever"]
+        alert_options = ["7 days", "30 days", "90 days", "1 year", "Forever"]
+        price_history_retention = st.selectbox("Price History Retention", price_history_options,
+                                               index=price_history_options.index(retention["price_history"]))
+        alert_retention = st.selectbox("Alert History Retention", alert_options,
+                                       index=alert_options.index(retention["alerts"]))
+        changed_retention = {name: value for name, value in (("price_history", price_history_retention),
+                                                             ("alerts", alert_retention))
+                             if value != retention[name]}
+        confirm_prune = False
+        if changed_retention:
+            st.warning("⚠️ Saving a new retention period permanently deletes price history and alerts older than it.")
+            confirm_prune = st.checkbox("Delete data older than the new retention periods", value=False)
         
         st.markdown("#### Privacy & Data")
         
@@ -1663,6 +2441,23 @@ def show_general_settings():
         share_analytics = st.checkbox("Share anonymized analytics with PriceIQ (helps improve service)", value=True)
     
     if st.button("💾 Save General Settings", use_container_width=True, type="primary"):
+        st.session_state.refresh_interval = dashboard_refresh
+        if changed_retention and not confirm_prune:
+            st.warning("Retention periods were not changed: tick the confirmation to delete older data.")
+        elif changed_retention:
+            with st.session_state.shared_data.lock:
+                retention.update(changed_retention)
+                period = RETENTION_PERIODS[price_history_retention]
+                if "price_history" in changed_retention and period is not None:
+                    removed = st.session_state.price_archive.prune(datetime.now() - period)
+                    if removed:
+                        _invalidate_shared_views()
+                        st.info(f"🗑️ Removed {removed} day(s) of archived price history")
+                period = RETENTION_PERIODS[alert_retention]
+                if "alerts" in changed_retention and period is not None:
+                    pruned = st.session_state.alerts.prune(datetime.now() - period)
+                    if pruned:
+                        st.info(f"🗑️ Removed {pruned:,} alerts older than {alert_retention}")
         st.success("✅ Settings saved!")
 
 def show_product_management():
@@ -1691,30 +2486,62 @@ def show_all_products():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        search_term = st.text_input("🔍 Search products", "")
+        search_term = st.text_input("🔍 Search products", "", placeholder="Name, SKU or category")
     with col2:
-        category_filter = st.selectbox("Category", ["All"] + list(set([p['category'] for p in st.session_state.products])))
+        category_filter = st.selectbox("Category", ["All"] + st.session_state.products.categories())
     with col3:
-        status_filter = st.selectbox("Status", ["All", "Active", "Inactive", "Out of Stock"])
-    
-    # Products table
-    products_data = []
-    for product in st.session_state.products:
-        margin = (product['current_price'] - product['cost']) / product['current_price'] * 100
-        
-        products_data.append({
-            "SKU": product['sku'],
-            "Name": product['name'],
-            "Category": product['category'],
-            "Price": f"${product['current_price']:.2f}",
-            "Cost": f"${product['cost']:.2f}",
-            "Margin": f"{margin:.1f}%",
-            "Tracked": "✅",
-            "Rules": random.randint(0, 3)
-        })
-    
-    df = pd.DataFrame(products_data)
-    st.dataframe(df, use_container_width=True, hide_index=True)
+        status_filter = st.selectbox("Status", ["All"] + STATUSES)
+    
+    # Matches come ranked from the search index, intersected with the category and status indexes;
+    # only the rows of the current page are read from the catalog
+    catalog = st.session_state.products
+    filters = [(field, value) for field, value in (("category", category_filter), ("status", status_filter))
+               if value != "All"]
+    search = st.session_state.shared_data.product_search
+    # A new search or filter starts again from the first page
+    if st.session_state.get("product_query") != (search_term, category_filter, status_filter):
+        st.session_state.product_query = (search_term, category_filter, status_filter)
+        st.session_state.product_page = 1
+    page = st.session_state.get("product_page", 1)
+    started = datetime.now()
+    rows, total = search.search(search_term, filters, offset=(page - 1) * PRODUCT_PAGE_SIZE, limit=PRODUCT_PAGE_SIZE)
+    pages = max(1, -(-total // PRODUCT_PAGE_SIZE))
+    if page > pages:
+        page = st.session_state.product_page = pages
+        rows, total = search.search(search_term, filters, offset=(page - 1) * PRODUCT_PAGE_SIZE, limit=PRODUCT_PAGE_SIZE)
+    elapsed = (datetime.now() - started).total_seconds() * 1000
+    
+    col_info, col_page = st.columns([3, 1])
+    with col_info:
+        st.caption(f"{total:,} products · page {page} of {pages:,} · {elapsed:.0f} ms")
+    with col_page:
+        st.number_input("Page", min_value=1, max_value=pages, key="product_page")
+    
+    frame = catalog.frame().iloc[rows]
+    margins = catalog.margins()[rows]
+    rule_counts = pd.Series([r['product_sku'] for r in st.session_state.dynamic_pricing_rules], dtype=object).value_counts()
+    
+    df = pd.DataFrame({
+        "SKU": frame['sku'],
+        "Name": frame['name'],
+        "Category": frame['category'],
+        "Status": frame['status'],
+        "Price": frame['current_price'],
+        "Cost": frame['cost'],
+        "Margin": margins,
+        "Tracked": "✅",
+        "Rules": frame['sku'].map(rule_counts).fillna(0).astype(int),
+    })
+    st.dataframe(
+        df,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Price": st.column_config.NumberColumn(format="$%.2f"),
+            "Cost": st.column_config.NumberColumn(format="$%.2f"),
+            "Margin": st.column_config.NumberColumn(format="%.1f%%"),
+        }
+    )
     
     # Bulk actions
     st.markdown("#### Quick Actions")
@@ -1765,11 +2592,36 @@ def show_add_products():
         uploaded_file = st.file_uploader("Choose CSV file", type=['csv'])
         
         if uploaded_file:
-            st.success("File uploaded! Preview:")
-            # Would show CSV preview here
+            try:
+                preview = read_preview(uploaded_file, IMPORT_PREVIEW_ROWS)
+            except (KeyError, ValueError, UnicodeDecodeError) as exc:
+                st.error(f"❌ Cannot read {uploaded_file.name}: {exc}")
+                return
+            
+            st.success(f"File uploaded ({uploaded_file.size / 1e6:,.1f} MB)! Preview of the first {len(preview)} rows:")
+            st.dataframe(preview, use_container_width=True, hide_index=True)
             
             if st.button("📥 Import Products", use_container_width=True, type="primary"):
-                st.success("✅ Imported 25 products successfully!")
+                data = st.session_state.shared_data
+                progress_bar = st.progress(0.0, text="Importing products...")
+                
+                def _report(fraction, result):
+                    progress_bar.progress(min(fraction, 1.0), text=f"Importing products... {result['rows']:,} rows read")
+                
+                try:
+                    result = import_products(uploaded_file, data.products, lock=data.lock, progress=_report)
+                except (KeyError, ValueError) as exc:
+                    st.error(f"❌ Import stopped: {exc}. Rows before the error were imported.")
+                    return
+                finally:
+                    progress_bar.empty()
+                    _invalidate_shared_views()
+                st.success(f"✅ Imported {result['inserted'] + result['updated']:,} products: "
+                           f"{result['inserted']:,} added, {result['updated']:,} updated")
+                if result['invalid']:
+                    st.warning(f"⚠️ {result['invalid']:,} rows were skipped"
+                               + (f" (first {len(result['errors']):,} listed)" if result['invalid'] > len(result['errors']) else ""))
+                    st.dataframe(pd.DataFrame(result['errors']), use_container_width=True, hide_index=True)
     
     else:  # Sync from Shopify
         st.markdown("#### 🛍️ Sync from Shopify")
@@ -1782,15 +2634,15 @@ def show_categories():
     """Categories management"""
     st.markdown("### 🏷️ Product Categories")
     
-    categories = list(set([p['category'] for p in st.session_state.products]))
+    counts = st.session_state.products.values("category")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.markdown("#### Current Categories")
         
-        for category in categories:
-            count = len([p for p in st.session_state.products if p['category'] == category])
+        for category in sorted(counts):
+            count = counts[category]
             
             col_c1, col_c2, col_c3 = st.columns([3, 1, 1])
             
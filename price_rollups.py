@@ -0,0 +1,249 @@
+"""Per-hour and per-day price aggregates per product and source"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Hourly buckets are kept this long; older window edges fall back to whole days
+HOURLY_RETENTION = timedelta(days=2)
+
+# Combined aggregates of closed (before today) buckets, reused while a window slides
+CLOSED_CACHE_ENTRIES = 8
+
+KEYS = ["product_id", "source"]
+
+AGGREGATES = ["count", "sum", "sumsq", "min", "max", "last", "last_date", "changes"]
+
+_HOUR = 3_600_000_000_000
+_DAY = _HOUR * 24
+_NO_DATE = np.iinfo(np.int64).min
+
+
+def _hourly_cutoff():
+    return pd.Timestamp(datetime.now() - HOURLY_RETENTION).floor("D")
+
+
+def _reduce_sorted(codes, columns):
+    """One bucket from rows grouped by code, in time order within each code"""
+    starts = np.flatnonzero(np.append(True, codes[1:] != codes[:-1]))
+    ends = np.append(starts[1:], len(codes)) - 1
+    return {
+        "code": codes[starts],
+        "count": np.add.reduceat(columns["count"], starts),
+        "sum": np.add.reduceat(columns["sum"], starts),
+        "sumsq": np.add.reduceat(columns["sumsq"], starts),
+        "min": np.minimum.reduceat(columns["min"], starts),
+        "max": np.maximum.reduceat(columns["max"], starts),
+        "last": columns["last"][ends],
+        "last_date": columns["last_date"][ends],
+        "changes": np.add.reduceat(columns["changes"], starts),
+    }
+
+
+def _merge(parts, size):
+    """Combine buckets over ``size`` codes into one; on equal ``last_date`` the later part wins"""
+    parts = [p for p in parts if len(p["code"])]
+    if len(parts) == 1:
+        return parts[0]
+    out = {
+        "count": np.zeros(size, dtype=np.int64),
+        "sum": np.zeros(size),
+        "sumsq": np.zeros(size),
+        "min": np.full(size, np.inf),
+        "max": np.full(size, -np.inf),
+        "last": np.full(size, np.nan),
+        "last_date": np.full(size, _NO_DATE, dtype=np.int64),
+        "changes": np.zeros(size, dtype=np.int64),
+    }
+    # Codes are unique within a bucket, so each part is one dense gather/scatter per aggregate
+    for part in parts:
+        code = part["code"]
+        for name in ("count", "sum", "sumsq", "changes"):
+            out[name][code] += part[name]
+        out["min"][code] = np.minimum(out["min"][code], part["min"])
+        out["max"][code] = np.maximum(out["max"][code], part["max"])
+        newer = part["last_date"] >= out["last_date"][code]
+        out["last"][code[newer]] = part["last"][newer]
+        out["last_date"][code[newer]] = part["last_date"][newer]
+    present = np.flatnonzero(out["count"])
+    return {"code": present, **{name: column[present] for name, column in out.items()}}
+
+
+class PriceRollups:
+    """Price aggregates (count, sum, sum of squares, min, max, last, changes) per bucket, product and source.
+
+    ``update`` folds each new batch of observations into its hourly and daily
+    buckets; a crawl usually touches only the current hour and day. A window
+    is answered by combining whole-day buckets for the full days it covers
+    with hourly buckets for the partial days at its edges, so switching
+    between 24h, 7d, 30d and 90d reads a few dozen buckets instead of the raw
+    history. Hourly buckets older than ``HOURLY_RETENTION`` are dropped, and
+    window edges that old are widened to whole days. ``changes`` counts
+    observations whose price differs from the previous observation of the
+    same product and source, including one from an earlier batch.
+
+    Every (product_id, source) pair gets an integer code and a bucket holds
+    one NumPy array per aggregate over the codes it saw. The combination of a
+    window's buckets from before today is cached, so while new observations
+    arrive a window costs one merge of that result with today's buckets.
+    """
+
+    def __init__(self):
+        self.hourly = {}    # hour -> bucket
+        self.daily = {}     # day -> bucket
+        self.covered_from = None
+        self._key_index = pd.Index([], dtype=np.int64)   # product_id << 20 | source number, by code
+        self._key_product = np.empty(0, dtype=np.int64)
+        self._key_source = np.empty(0, dtype=np.int64)
+        self._sources = {}  # source -> number
+        self._last_price = np.empty(0)
+        self._closed = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        """Number of (product_id, source) pairs seen"""
+        return len(self._key_index)
+
+    def _codes(self, product_ids, sources):
+        inverse, uniques = pd.factorize(np.asarray(sources, dtype=object))
+        numbers = np.array([self._sources.setdefault(s, len(self._sources)) for s in uniques], dtype=np.int64)
+        composite = (np.asarray(product_ids, dtype=np.int64) << 20) | numbers[inverse]
+        codes = self._key_index.get_indexer(composite)
+        missing = codes < 0
+        if missing.any():
+            new = np.unique(composite[missing])
+            codes[missing] = len(self._key_index) + np.searchsorted(new, composite[missing])
+            self._key_index = self._key_index.append(pd.Index(new))
+            self._key_product = np.append(self._key_product, new >> 20)
+            self._key_source = np.append(self._key_source, new & 0xFFFFF)
+            self._last_price = np.append(self._last_price, np.full(len(new), np.nan))
+        return codes
+
+    def update(self, columns, newer=True):
+        """Fold a batch of observations (columns or a history frame) into the buckets.
+
+        ``newer`` is False for batches older than what was already folded in,
+        so their prices are not compared with (or taken as) the latest ones.
+        """
+        frame = columns if isinstance(columns, pd.DataFrame) else pd.DataFrame(columns)
+        if not len(frame):
+            return
+        dates = pd.to_datetime(frame["date"]).to_numpy().astype("datetime64[ns]").astype(np.int64)
+        prices = frame["price"].to_numpy(dtype=np.float64)
+        with self._lock:
+            codes = self._codes(frame["product_id"].to_numpy(), frame["source"].to_numpy())
+            order = np.lexsort((dates, codes))
+            codes, dates, prices = codes[order], dates[order], prices[order]
+            first = np.append(True, codes[1:] != codes[:-1])
+            last = np.append(codes[1:] != codes[:-1], True)
+            previous = np.append(np.nan, prices[:-1])
+            previous[first] = self._last_price[codes[first]] if newer else np.nan
+            if newer:
+                self._last_price[codes[last]] = prices[last]
+            else:
+                unseen = np.isnan(self._last_price[codes[last]])
+                self._last_price[codes[last][unseen]] = prices[last][unseen]
+
+            columns = {
+                "count": np.ones(len(codes), dtype=np.int64), "sum": prices, "sumsq": prices ** 2,
+                "min": prices, "max": prices, "last": prices, "last_date": dates,
+                "changes": (~np.isnan(previous) & (prices != previous)).astype(np.int64),
+            }
+            cutoff = _hourly_cutoff().value
+            today = pd.Timestamp(datetime.now()).floor("D").value
+            for size, buckets in ((_HOUR, self.hourly), (_DAY, self.daily)):
+                bucket_ids = dates - dates % size
+                for bucket_id in np.unique(bucket_ids):
+                    if size == _HOUR and bucket_id < cutoff:
+                        continue
+                    rows = np.flatnonzero(bucket_ids == bucket_id)
+                    added = _reduce_sorted(codes[rows], {name: column[rows] for name, column in columns.items()})
+                    key = pd.Timestamp(bucket_id)
+                    parts = [buckets.get(key), added] if newer else [added, buckets.get(key)]
+                    buckets[key] = _merge([p for p in parts if p is not None], len(self._key_index))
+                    if bucket_id < today:
+                        # Late or back-filled observations change a closed bucket
+                        self._closed.clear()
+            self._prune_hourly()
+
+    def extend_back(self, frame, start):
+        """Add older observations (e.g. read from the archive) and mark them covered from ``start``.
+
+        ``start`` is kept as given: the next backfill reads up to exactly this
+        boundary, so rows between it and the start of its day are not skipped.
+        """
+        self.update(frame, newer=False)
+        with self._lock:
+            start = pd.Timestamp(start)
+            self.covered_from = start if self.covered_from is None else min(self.covered_from, start)
+
+    def _prune_hourly(self):
+        cutoff = _hourly_cutoff()
+        for hour in [h for h in self.hourly if h < cutoff]:
+            del self.hourly[hour]
+
+    def _buckets(self, start, end):
+        """(freq, bucket start) of the stored buckets covering [start, end], in time order"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        first_full_day, last_day = start.ceil("D"), end.floor("D")
+        if first_full_day <= last_day:
+            days = list(pd.date_range(first_full_day, last_day - pd.Timedelta(days=1), freq="D"))
+            head = list(pd.date_range(start.floor("h"), first_full_day - pd.Timedelta(hours=1), freq="h"))
+            tail = list(pd.date_range(last_day, end.floor("h"), freq="h"))
+        else:
+            days, head, tail = [], list(pd.date_range(start.floor("h"), end.floor("h"), freq="h")), []
+        expired = _hourly_cutoff()
+        # Edges whose hourly detail has expired are widened to the whole day
+        keys = []
+        for hours in (head, days, tail):
+            for when in hours:
+                if hours is days:
+                    keys.append(("D", when))
+                elif when < expired:
+                    keys.append(("D", when.floor("D")))
+                else:
+                    keys.append(("h", when))
+        return [key for key in dict.fromkeys(keys) if key[1] in (self.daily if key[0] == "D" else self.hourly)]
+
+    def _bucket(self, freq, key):
+        return (self.daily if freq == "D" else self.hourly)[key]
+
+    def _combined(self, start, end):
+        keys = self._buckets(start, end)
+        today = pd.Timestamp(datetime.now()).floor("D")
+        closed = tuple(key for key in keys if key[1] < today)
+        size = len(self._key_index)
+        merged = self._closed.get(closed)
+        if merged is None:
+            merged = _merge([self._bucket(*key) for key in closed], size)
+            self._closed[closed] = merged
+            while len(self._closed) > CLOSED_CACHE_ENTRIES:
+                self._closed.popitem(last=False)
+        else:
+            self._closed.move_to_end(closed)
+        return _merge([merged] + [self._bucket(*key) for key in keys if key[1] >= today], size)
+
+    def _to_frame(self, bucket):
+        code = bucket["code"]
+        return pd.DataFrame({
+            "product_id": self._key_product[code],
+            "source": pd.Categorical.from_codes(self._key_source[code], categories=list(self._sources)),
+            **{name: bucket[name] for name in AGGREGATES},
+            "last_date": bucket["last_date"].astype("datetime64[ns]"),
+        }, columns=KEYS + AGGREGATES)
+
+    def window(self, start, end=None):
+        """One aggregate row per (product_id, source) for observations in [start, end]"""
+        with self._lock:
+            return self._to_frame(self._combined(start, end if end is not None else datetime.now()))
+
+    def series(self, start, end=None, freq="D"):
+        """Per-bucket aggregates with a ``bucket`` column, for trend charts"""
+        end = pd.Timestamp(end if end is not None else datetime.now())
+        buckets = self.daily if freq == "D" else self.hourly
+        with self._lock:
+            frames = [self._to_frame(buckets[b]).assign(bucket=b)
+                      for b in pd.date_range(pd.Timestamp(start).floor(freq), end, freq=freq) if b in buckets]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["bucket"] + KEYS + AGGREGATES)
@@ -0,0 +1,175 @@
+"""Single-pass competitor price statistics shared by the dashboard and analytics pages"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from sample_data import OWN_SOURCE
+
+WINDOWS = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+
+POSITION_TIERS = ["Lowest", "Competitive", "Higher", "No Data"]
+
+
+def products_frame(products):
+    """Product catalog as a DataFrame with the columns the stats engine needs"""
+    if isinstance(products, pd.DataFrame):
+        return products
+    if hasattr(products, "frame"):
+        return products.frame()
+    return pd.DataFrame(
+        list(products),
+        columns=["id", "name", "sku", "current_price", "cost", "category"],
+    )
+
+
+def competitor_stats(history, products, window=None, now=None):
+    """Competitor min/avg/max, price diff, margin and position tier for every product.
+
+    ``history`` is a price-history DataFrame (``PriceHistoryStore.to_frame()``),
+    ``window`` is None for all history, a key of ``WINDOWS`` or a timedelta.
+    Competitor rows are aggregated with one groupby over product_id, so the
+    cost is a single pass over the history regardless of catalog size.
+    """
+    catalog = products_frame(products)
+    mask = (history["source"] != OWN_SOURCE).to_numpy()
+    if window is not None:
+        span = WINDOWS[window] if isinstance(window, str) else window
+        since = np.datetime64(pd.Timestamp((now or datetime.now()) - span), "ns")
+        mask &= history["date"].to_numpy() >= since
+    competitors = history.loc[mask, ["product_id", "price"]]
+    agg = competitors.groupby("product_id", sort=False)["price"].agg(["min", "mean", "max"])
+    return _stats_frame(catalog, agg)
+
+
+def rollup_competitor_stats(rollup, products):
+    """``competitor_stats`` from a ``PriceRollups.window`` frame instead of raw history"""
+    competitors = rollup[(rollup["source"] != OWN_SOURCE).to_numpy()]
+    grouped = competitors.groupby("product_id", sort=False)
+    agg = pd.DataFrame({
+        "min": grouped["min"].min(),
+        "mean": grouped["sum"].sum() / grouped["count"].sum(),
+        "max": grouped["max"].max(),
+    })
+    return _stats_frame(products_frame(products), agg)
+
+
+def rollup_own_prices(rollup, products):
+    """Average Your Store price per product over a rollup window, current price where unobserved"""
+    catalog = products_frame(products)
+    own = rollup[(rollup["source"] == OWN_SOURCE).to_numpy()].groupby("product_id", sort=False)[["sum", "count"]].sum()
+    own = own.reindex(catalog["id"].to_numpy())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = own["sum"].to_numpy(dtype=np.float64) / own["count"].to_numpy(dtype=np.float64)
+    return np.where(np.isnan(average), catalog["current_price"].to_numpy(dtype=np.float64), average)
+
+
+def map_rule_key(alert_rules):
+    """Hashable (SKUs, MAP) pairs of the active MAP Violation rules, for cache keys"""
+    return tuple((tuple(rule.get("products") or ()), rule["map_price"]) for rule in alert_rules
+                 if rule.get("active") and rule["trigger_type"] == "MAP Violation")
+
+
+def map_prices(alert_rules, products):
+    """Minimum advertised price per product id (a Series) from the active MAP Violation alert rules"""
+    catalog = products_frame(products)
+    by_sku = {}
+    catch_all = np.nan
+    for skus, price in map_rule_key(alert_rules):
+        # Rules without products apply to every SKU, as in the alert evaluator
+        if not skus:
+            catch_all = np.fmax(catch_all, price)
+        for sku in skus:
+            by_sku[sku] = max(by_sku.get(sku, 0.0), price)
+    prices = np.fmax(catalog["sku"].map(by_sku).to_numpy(dtype=np.float64), catch_all)
+    return pd.Series(prices, index=catalog["id"].to_numpy()).dropna()
+
+
+def dashboard_kpis(rollup, products, map_by_product=None):
+    """Dashboard header metrics for one rollup window, in a single pass over its rows.
+
+    - ``avg_margin``: mean margin at each product's average selling price
+    - ``competitive_index``: mean of competitor average / own average price x 100
+      (100 is priced at the market average, higher is cheaper)
+    - ``price_changes``: observed price changes across all sources
+    - ``map_violations``: competitor listings seen below the product's MAP
+    - ``winning_position``: % of products whose last own price is at or below
+      every competitor's last price
+    """
+    catalog = products_frame(products)
+    ids = catalog["id"].to_numpy()
+    own_price = rollup_own_prices(rollup, catalog)
+    competitors = rollup[(rollup["source"] != OWN_SOURCE).to_numpy()]
+    grouped = competitors.groupby("product_id", sort=False)
+    comp = pd.DataFrame({
+        "avg": grouped["sum"].sum() / grouped["count"].sum(),
+        "last_min": grouped["last"].min(),
+    }).reindex(ids)
+    own = rollup[(rollup["source"] == OWN_SOURCE).to_numpy()].groupby("product_id", sort=False)["last"].last()
+    own_last = own.reindex(ids).to_numpy(dtype=np.float64)
+    own_last = np.where(np.isnan(own_last), catalog["current_price"].to_numpy(dtype=np.float64), own_last)
+
+    comp_avg = comp["avg"].to_numpy(dtype=np.float64)
+    has_data = ~np.isnan(comp_avg)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margins = (own_price - catalog["cost"].to_numpy(dtype=np.float64)) / own_price * 100
+        index = comp_avg[has_data] / own_price[has_data] * 100
+    winning = own_last[has_data] <= comp["last_min"].to_numpy(dtype=np.float64)[has_data]
+
+    violations = 0
+    if map_by_product is not None and len(map_by_product):
+        floors = competitors["product_id"].map(map_by_product).to_numpy(dtype=np.float64)
+        violations = int(np.count_nonzero(competitors["min"].to_numpy(dtype=np.float64) < floors))
+
+    return {
+        "avg_margin": float(np.nanmean(margins)) if len(margins) else 0.0,
+        "competitive_index": float(index.mean()) if len(index) else 0.0,
+        "price_changes": int(rollup["changes"].sum()),
+        "map_violations": violations,
+        "winning_position": float(winning.mean() * 100) if len(winning) else 0.0,
+    }
+
+
+def _stats_frame(catalog, agg):
+    agg = agg.reindex(catalog["id"].to_numpy())
+
+    your_price = catalog["current_price"].to_numpy(dtype=np.float64)
+    comp_min = agg["min"].to_numpy(dtype=np.float64)
+    comp_avg = agg["mean"].to_numpy(dtype=np.float64)
+    comp_max = agg["max"].to_numpy(dtype=np.float64)
+    has_data = ~np.isnan(comp_avg)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        diff_pct = np.where(has_data, (your_price - comp_avg) / comp_avg * 100, 0.0)
+        margin_pct = (your_price - catalog["cost"].to_numpy(dtype=np.float64)) / your_price * 100
+    position = np.select(
+        [~has_data, your_price <= comp_min, your_price <= comp_avg],
+        ["No Data", "Lowest", "Competitive"],
+        default="Higher",
+    )
+
+    return pd.DataFrame({
+        "product_id": catalog["id"].to_numpy(),
+        "name": catalog["name"].to_numpy(),
+        "sku": catalog["sku"].to_numpy(),
+        "your_price": your_price,
+        "comp_min": comp_min,
+        "comp_avg": comp_avg,
+        "comp_max": comp_max,
+        "diff_pct": diff_pct,
+        "margin_pct": margin_pct,
+        "position": pd.Categorical(position, categories=POSITION_TIERS),
+    })
+
+
+def price_volatility(history, skus=None):
+    """Coefficient of variation (std / mean) of competitor prices per SKU"""
+    competitors = history.loc[(history["source"] != OWN_SOURCE).to_numpy(), ["sku", "price"]]
+    if skus is not None:
+        competitors = competitors[competitors["sku"].isin(list(skus))]
+    grouped = competitors.groupby("sku", observed=True, sort=False)["price"]
+    return (grouped.std() / grouped.mean()).fillna(0.0)
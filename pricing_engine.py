@@ -0,0 +1,204 @@
+"""Vectorized evaluation of dynamic pricing rules"""
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from price_stats import products_frame
+from sample_data import OWN_SOURCE
+
+RULE_TYPES = ["Match Lowest", "Beat by %", "Fixed Margin", "Market Position", "Custom Algorithm"]
+
+# Form labels on the Create Rule page -> stored rule_type
+STRATEGY_RULE_TYPES = {
+    "Match Lowest Competitor": "Match Lowest",
+    "Beat Lowest by %": "Beat by %",
+    "Fixed Margin %": "Fixed Margin",
+    "Dynamic Market Position": "Market Position",
+    "Custom Algorithm": "Custom Algorithm",
+}
+
+DEFAULT_MAX_CHANGE_PCT = 10
+
+RESULT_COLUMNS = ["rule_id", "sku", "current_price", "lowest_competitor", "recommended_price", "change_pct", "reason"]
+
+
+def _column(rules, key, default=np.nan):
+    if key not in rules:
+        return np.full(len(rules), default, dtype=np.float64)
+    return pd.to_numeric(rules[key], errors="coerce").fillna(default).to_numpy(dtype=np.float64)
+
+
+def competitor_price_matrix(history, product_ids):
+    """Latest in-stock competitor prices as (products x competitors) plus the competitor names"""
+    prices = history.latest_prices(product_ids)
+    availability = history.latest_availability(product_ids)
+    competitors = [c for c in prices.columns if c != OWN_SOURCE]
+    matrix = prices[competitors].to_numpy(dtype=np.float64)
+    matrix[~availability[competitors].to_numpy()] = np.nan
+    return matrix, competitors
+
+
+def evaluate_rules(rules, products, history):
+    """Recommended price and reason for every active rule, computed as array operations.
+
+    Pipeline per rule: competitor prices (latest, in stock, optionally limited
+    to the rule's competitors) -> strategy target -> clamp to floor/ceiling ->
+    raise to the minimum-margin price -> cap the move to the rule's max change
+    per update. ``rules`` is a list of rule dicts (or a DataFrame of them),
+    ``products`` the catalog and ``history`` the PriceHistoryStore whose
+    latest-price matrix supplies competitor prices.
+    """
+    rules = pd.DataFrame(list(rules)) if not isinstance(rules, pd.DataFrame) else rules
+    if "active" in rules:
+        rules = rules[rules["active"].fillna(False).astype(bool).to_numpy()]
+    catalog = products_frame(products)[["id", "sku", "current_price", "cost"]]
+    positions = pd.Index(catalog["sku"]).get_indexer(rules["product_sku"]) if len(rules) else np.array([], int)
+    known = positions >= 0
+    rules = rules[known].reset_index(drop=True)
+    positions = positions[known]
+    if not len(rules):
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    current = catalog["current_price"].to_numpy(dtype=np.float64)[positions]
+    cost = catalog["cost"].to_numpy(dtype=np.float64)[positions]
+    comp, competitors = competitor_price_matrix(history, catalog["id"].to_numpy()[positions])
+
+    # Rules limited to chosen competitors mask out the other columns, one pass per distinct selection
+    if "competitors" in rules:
+        limited = rules["competitors"].map(lambda c: tuple(c) if isinstance(c, (list, tuple)) else ())
+        for selection, rows in limited.groupby(limited, sort=False).indices.items():
+            if selection:
+                comp[np.ix_(rows, ~np.isin(competitors, selection))] = np.nan
+    has_comp = ~np.all(np.isnan(comp), axis=1)
+    with np.errstate(all="ignore"):
+        lowest = np.where(has_comp, np.nanmin(np.where(has_comp[:, None], comp, 0), axis=1), np.nan)
+        average = np.where(has_comp, np.nanmean(np.where(has_comp[:, None], comp, 0), axis=1), np.nan)
+        highest = np.where(has_comp, np.nanmax(np.where(has_comp[:, None], comp, 0), axis=1), np.nan)
+
+    rule_type = rules["rule_type"].to_numpy(dtype=object)
+    beat_by = _column(rules, "beat_by", 0.0)
+    target_margin = _column(rules, "target_margin")
+    position = (rules["market_position"].fillna("Competitive") if "market_position" in rules
+                else pd.Series("Competitive", index=rules.index)).to_numpy(dtype=object)
+    market = np.select([position == "Aggressive", position == "Premium"], [lowest, highest], default=average)
+
+    is_match = rule_type == "Match Lowest"
+    is_beat = rule_type == "Beat by %"
+    is_margin = rule_type == "Fixed Margin"
+    is_market = rule_type == "Market Position"
+    needs_comp = is_match | is_beat | is_market
+    with np.errstate(all="ignore"):
+        target = np.select(
+            [is_match, is_beat, is_margin, is_market],
+            [lowest, lowest * (1 - beat_by / 100), cost / (1 - target_margin / 100), market],
+            default=current,
+        )
+    held = np.isnan(target)
+    target = np.where(held, current, target)
+    reason = np.select(
+        [needs_comp & ~has_comp, held, is_match, is_beat, is_margin, is_market],
+        ["No in-stock competitor price; price held", "Rule cannot be evaluated; price held",
+         "Matched lowest competitor", "Beat lowest competitor", "Fixed margin target", "Market position target"],
+        default="Custom algorithm not supported; price held",
+    ).astype(object)
+
+    floor = _column(rules, "floor_price")
+    ceiling = _column(rules, "ceiling_price")
+    at_floor = target < floor
+    at_ceiling = target > ceiling
+    target = np.where(at_floor, floor, np.where(at_ceiling, ceiling, target))
+
+    with np.errstate(all="ignore"):
+        margin_floor = cost / (1 - _column(rules, "margin_min") / 100)
+    at_margin = target < margin_floor
+    target = np.where(at_margin, margin_floor, target)
+
+    max_change = _column(rules, "max_change_per_update", DEFAULT_MAX_CHANGE_PCT) / 100
+    low, high = current * (1 - max_change), current * (1 + max_change)
+    capped = (target < low) | (target > high)
+    target = np.clip(target, low, high)
+
+    reason = (reason
+              + np.where(at_floor, "; raised to floor", "")
+              + np.where(at_ceiling, "; lowered to ceiling", "")
+              + np.where(at_margin, "; raised to minimum margin", "")
+              + np.where(capped, "; capped by max change per update", ""))
+
+    recommended = np.round(target, 2)
+    return pd.DataFrame({
+        "rule_id": rules["id"].to_numpy() if "id" in rules else np.arange(len(rules)),
+        "sku": rules["product_sku"].to_numpy(),
+        "current_price": current,
+        "lowest_competitor": lowest,
+        "recommended_price": recommended,
+        "change_pct": (recommended - current) / current * 100,
+        "reason": reason,
+    })
+
+
+class IncrementalRepricer:
+    """Re-evaluates only the real-time rules whose competitor inputs changed.
+
+    Rules are indexed by SKU (rules that consider every competitor) and by
+    (SKU, source) for rules limited to chosen competitors. ``mark`` turns a
+    batch of new observations into a dirty set of rule ids with one lookup
+    per distinct (SKU, source) pair, and ``reprice`` evaluates just those
+    rules, so the work tracks the change rate rather than the catalog size.
+    """
+
+    def __init__(self, rules=()):
+        self.dirty = set()
+        self.last_run = None
+        self.rebuild(rules)
+
+    def rebuild(self, rules):
+        """Re-index every rule, e.g. after rules were created, toggled or deleted"""
+        self._rules = {}
+        self._by_sku = {}
+        self._by_sku_source = {}
+        for rule in rules:
+            self.add_rule(rule)
+
+    def add_rule(self, rule):
+        self.remove_rule(rule["id"])
+        if not rule.get("active") or rule.get("update_frequency", "Real-time") != "Real-time":
+            return
+        self._rules[rule["id"]] = rule
+        if rule.get("competitors"):
+            for source in rule["competitors"]:
+                self._by_sku_source.setdefault((rule["product_sku"], source), set()).add(rule["id"])
+        else:
+            self._by_sku.setdefault(rule["product_sku"], set()).add(rule["id"])
+
+    def remove_rule(self, rule_id):
+        rule = self._rules.pop(rule_id, None)
+        if rule is None:
+            return
+        self.dirty.discard(rule_id)
+        for key in [(rule["product_sku"], s) for s in rule.get("competitors") or ()]:
+            self._by_sku_source.get(key, set()).discard(rule_id)
+        self._by_sku.get(rule["product_sku"], set()).discard(rule_id)
+
+    def mark(self, skus, sources):
+        """Flag the rules that depend on any of the observed (sku, source) pairs"""
+        skus, sources = np.broadcast_arrays(np.asarray(skus, dtype=object), np.asarray(sources, dtype=object))
+        pairs = pd.DataFrame({"sku": np.atleast_1d(skus), "source": np.atleast_1d(sources)})
+        for sku, source in pairs.drop_duplicates().itertuples(index=False):
+            if source == OWN_SOURCE:
+                continue
+            self.dirty.update(self._by_sku.get(sku, ()))
+            self.dirty.update(self._by_sku_source.get((sku, source), ()))
+        return len(self.dirty)
+
+    def reprice(self, products_by_sku, history):
+        """Evaluate the dirty rules; returns their recommendations and clears the dirty set"""
+        started = time.perf_counter()
+        rules = [self._rules[i] for i in self.dirty if i in self._rules]
+        self.dirty.clear()
+        touched = {r["product_sku"]: products_by_sku[r["product_sku"]]
+                   for r in rules if r["product_sku"] in products_by_sku}
+        result = evaluate_rules(rules, touched.values(), history)
+        self.last_run = {"rules": len(rules), "seconds": time.perf_counter() - started, "at": datetime.now()}
+        return result
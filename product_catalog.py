@@ -0,0 +1,245 @@
+"""Product catalog indexed by id, SKU and category with NumPy price columns"""
+import itertools
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("id", "name", "sku", "current_price", "cost", "category", "status")
+
+STATUSES = ["Active", "Inactive", "Out of Stock"]
+
+# Fields with an inverted index: value -> positions of the products that have it
+INDEXED_FIELDS = ("category", "status")
+
+# Change log entries kept for consumers that fall behind; one further back has to rebuild
+CHANGE_LOG_LIMIT = 100_000
+
+
+class ProductCatalog:
+    """Product dicts with hash indexes by id and SKU and a category inverted index.
+
+    It behaves like the list of product dicts it replaces (iteration, ``len``,
+    indexing, slicing, ``append`` and ``extend``), so pages that only read
+    products keep working. Prices and costs are mirrored into NumPy columns in
+    catalog order for vectorized margin math. Records must be changed through
+    ``update`` (or ``update_many`` for a batch) so the indexes and columns stay
+    in step; every change bumps ``version`` and is logged so derived indexes
+    (e.g. product search) can catch up with ``changes_since``. The log is
+    trimmed up to the slowest registered consumer's cursor and never holds
+    more than ``CHANGE_LOG_LIMIT`` entries.
+    """
+
+    def __init__(self, products=()):
+        self._products = []
+        self._position = {}     # id -> position
+        self._by_sku = {}
+        self._inverted = {field: {} for field in INDEXED_FIELDS}   # field -> value -> {position: None}
+        self._sorted = {}       # (field, value) -> sorted position array, dropped when the value's products change
+        self._prices = np.empty(16)
+        self._costs = np.empty(16)
+        self._frame = None
+        self._changes = []      # positions added or updated, in order
+        self._changes_start = 0  # cursor of the first entry still in _changes
+        self._consumers = weakref.WeakKeyDictionary()  # consumer -> cursor it has caught up to
+        self.max_id = 0
+        self.version = 0
+        self._lock = threading.RLock()
+        self.extend(products)
+
+    def __len__(self):
+        return len(self._products)
+
+    def __iter__(self):
+        return iter(self._products)
+
+    def __getitem__(self, i):
+        return self._products[i]
+
+    def _reserve(self, n):
+        if n <= len(self._prices):
+            return
+        capacity = len(self._prices)
+        while capacity < n:
+            capacity *= 2
+        for name in ("_prices", "_costs"):
+            grown = np.empty(capacity)
+            grown[:len(self._products)] = getattr(self, name)[:len(self._products)]
+            setattr(self, name, grown)
+
+    def _changed(self):
+        self._frame = None
+        self.version += 1
+        if len(self._changes) > 2 * CHANGE_LOG_LIMIT:
+            self._trim()
+
+    def _trim(self):
+        end = self.change_cursor
+        keep = min(self._consumers.values(), default=self._changes_start)
+        keep = min(max(keep, end - CHANGE_LOG_LIMIT), end)
+        if keep > self._changes_start:
+            del self._changes[:keep - self._changes_start]
+            self._changes_start = keep
+
+    def append(self, product):
+        self.extend([product])
+
+    def extend(self, products):
+        """Add new products; a SKU or id already in the catalog raises ``ValueError``"""
+        products = list(products)
+        if not products:
+            return
+        with self._lock:
+            skus, ids = set(), set()
+            for product in products:
+                if (product["sku"] in self._by_sku or product["sku"] in skus
+                        or product["id"] in self._position or product["id"] in ids):
+                    raise ValueError(f"Product {product['id']} ({product['sku']}) is already in the catalog")
+                skus.add(product["sku"])
+                ids.add(product["id"])
+            start = len(self._products)
+            self._reserve(start + len(products))
+            for position, product in enumerate(products, start):
+                product.setdefault("status", STATUSES[0])
+                self._products.append(product)
+                self._position[product["id"]] = position
+                self._by_sku[product["sku"]] = product
+            for position, product in enumerate(products, start):
+                for field, index in self._inverted.items():
+                    index.setdefault(product[field], {})[position] = None
+                    self._sorted.pop((field, product[field]), None)
+            end = len(self._products)
+            self._prices[start:end] = [p["current_price"] for p in products]
+            self._costs[start:end] = [p["cost"] for p in products]
+            self.max_id = max(self.max_id, max(p["id"] for p in products))
+            self._changes.extend(range(start, end))
+            self._changed()
+
+    def update(self, product, **fields):
+        """Change fields of a catalog product (looked up by its id), keeping the indexes current"""
+        self.update_many([(product, fields)])
+
+    def update_many(self, updates):
+        """Apply ``(product, fields)`` pairs like ``update``, with a single version bump for the batch"""
+        with self._lock:
+            changed = len(self._changes)
+            try:
+                for product, fields in updates:
+                    self._update(self._position[product["id"]], fields)
+            finally:
+                # Updates applied before an error are kept, so they are still announced
+                if len(self._changes) > changed:
+                    self._changed()
+
+    def _update(self, position, fields):
+        product = self._products[position]
+        if "sku" in fields and fields["sku"] != product["sku"]:
+            if fields["sku"] in self._by_sku:
+                raise ValueError(f"SKU {fields['sku']} is already in the catalog")
+            del self._by_sku[product["sku"]]
+            self._by_sku[fields["sku"]] = product
+        for field, index in self._inverted.items():
+            if field in fields and fields[field] != product[field]:
+                old = index[product[field]]
+                del old[position]
+                if not old:
+                    del index[product[field]]
+                index.setdefault(fields[field], {})[position] = None
+                self._sorted.pop((field, product[field]), None)
+                self._sorted.pop((field, fields[field]), None)
+        product.update(fields)
+        if "current_price" in fields:
+            self._prices[position] = fields["current_price"]
+        if "cost" in fields:
+            self._costs[position] = fields["cost"]
+        self._changes.append(position)
+
+    @property
+    def change_cursor(self):
+        """Cursor after the latest change"""
+        return self._changes_start + len(self._changes)
+
+    def changes_since(self, cursor, consumer=None):
+        """Positions added or updated after ``cursor`` (repeats possible) and the new cursor.
+
+        A ``consumer`` passing itself registers ``cursor`` as read, so the log
+        before it can be dropped. The positions are None when the log no
+        longer reaches back to ``cursor``; the caller has to rebuild.
+        """
+        with self._lock:
+            if consumer is not None:
+                self._consumers[consumer] = cursor
+                self._trim()
+            if cursor < self._changes_start:
+                return None, self.change_cursor
+            return self._changes[cursor - self._changes_start:], self.change_cursor
+
+    def get(self, product_id, default=None):
+        """Product with the given id"""
+        position = self._position.get(product_id)
+        return default if position is None else self._products[position]
+
+    def get_sku(self, sku, default=None):
+        """Product with the given SKU"""
+        return self._by_sku.get(sku, default)
+
+    @property
+    def sku_index(self):
+        """SKU -> product dict (read-only; kept current by ``extend`` and the updates)"""
+        return self._by_sku
+
+    def positions(self, field, value):
+        """Sorted catalog positions of the products whose indexed ``field`` equals ``value`` (read-only)"""
+        key = (field, value)
+        with self._lock:
+            positions = self._sorted.get(key)
+            if positions is None:
+                positions = np.sort(np.fromiter(self._inverted[field].get(value, ()), dtype=np.int64))
+                positions.flags.writeable = False
+                self._sorted[key] = positions
+        return positions
+
+    def values(self, field):
+        """Distinct values of an indexed field with their product counts"""
+        return {value: len(positions) for value, positions in self._inverted[field].items()}
+
+    def categories(self):
+        """Sorted category names"""
+        return sorted(self._inverted["category"])
+
+    def in_category(self, category, limit=None):
+        """Products of one category (the first ``limit`` of them)"""
+        positions = itertools.islice(self._inverted["category"].get(category, ()), limit)
+        return [self._products[i] for i in positions]
+
+    @property
+    def prices(self):
+        return self._prices[:len(self._products)]
+
+    @property
+    def costs(self):
+        return self._costs[:len(self._products)]
+
+    def margins(self):
+        """Margin % of every product at its current price, in catalog order"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (self.prices - self.costs) / self.prices * 100
+
+    def frame(self):
+        """The catalog as a DataFrame of ``FIELDS`` (rebuilt only after a change)"""
+        frame = self._frame
+        if frame is None:
+            with self._lock:
+                products = self._products
+                frame = pd.DataFrame({
+                    "id": np.fromiter((p["id"] for p in products), dtype=np.int64, count=len(products)),
+                    "name": [p["name"] for p in products],
+                    "sku": [p["sku"] for p in products],
+                    "current_price": self.prices.copy(),
+                    "cost": self.costs.copy(),
+                    "category": [p["category"] for p in products],
+                    "status": [p["status"] for p in products],
+                })
+                self._frame = frame
+        return frame
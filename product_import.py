@@ -0,0 +1,127 @@
+"""Streaming CSV import of the product catalog with bulk validation and upsert by SKU"""
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["name", "sku", "category", "current_price", "cost"]
+
+# Prices are read as text and converted in bulk, so a bad value becomes a row error instead of a failed read
+DTYPES = {"name": "string", "sku": "string", "category": "category", "current_price": "string", "cost": "string"}
+
+CHUNK_ROWS = 100_000
+
+# Row errors kept for the report; the rest are only counted
+MAX_ERRORS = 1_000
+
+DEFAULT_CATEGORY = "Other"
+
+
+def _check_columns(columns):
+    missing = [name for name in COLUMNS if name not in columns]
+    if missing:
+        raise KeyError(f"Missing columns: {', '.join(missing)}")
+
+
+def read_preview(file, rows=20):
+    """First ``rows`` rows of a catalog CSV, without reading the rest of the file"""
+    file.seek(0)
+    preview = pd.read_csv(file, nrows=rows, dtype=str, skipinitialspace=True)
+    file.seek(0)
+    _check_columns(preview.columns)
+    return preview[COLUMNS]
+
+
+def validate_chunk(chunk, first_line):
+    """Split a chunk into valid rows (typed, cleaned) and per-row errors.
+
+    ``first_line`` is the file line number of the chunk's first row, used in
+    the error report. Every check runs on whole columns.
+    """
+    name = chunk["name"].str.strip()
+    sku = chunk["sku"].str.strip()
+    price = pd.to_numeric(chunk["current_price"], errors="coerce").astype(np.float64)
+    cost = pd.to_numeric(chunk["cost"], errors="coerce").astype(np.float64)
+    checks = [
+        (name.isna() | (name == ""), "missing name"),
+        (sku.isna() | (sku == ""), "missing SKU"),
+        (price.isna() & chunk["current_price"].notna(), "current_price is not a number"),
+        (price.isna() & chunk["current_price"].isna(), "missing current_price"),
+        (price <= 0, "current_price must be positive"),
+        (cost.isna() & chunk["cost"].notna(), "cost is not a number"),
+        (cost.isna() & chunk["cost"].isna(), "missing cost"),
+        (cost < 0, "cost must not be negative"),
+    ]
+    invalid = np.zeros(len(chunk), dtype=bool)
+    reasons = np.full(len(chunk), "", dtype=object)
+    for failed, reason in checks:
+        failed = failed.fillna(False).to_numpy(dtype=bool)
+        reasons[failed & ~invalid] = reason
+        invalid |= failed
+    lines = first_line + np.flatnonzero(invalid)
+    errors = pd.DataFrame({"line": lines, "sku": sku[invalid].to_numpy(), "error": reasons[invalid]})
+
+    category = chunk["category"].astype(object).where(chunk["category"].notna(), DEFAULT_CATEGORY)
+    valid = pd.DataFrame({
+        "name": name[~invalid].to_numpy(dtype=object),
+        "sku": sku[~invalid].to_numpy(dtype=object),
+        "category": category[~invalid].to_numpy(dtype=object),
+        "current_price": price[~invalid].to_numpy(),
+        "cost": cost[~invalid].to_numpy(),
+    })
+    # A SKU repeated within the chunk is upserted once, with its last row
+    return valid.drop_duplicates("sku", keep="last"), errors
+
+
+def upsert_products(valid, catalog):
+    """Update catalog products whose SKU exists and add the rest; returns (inserted, updated)"""
+    skus = valid["sku"].tolist()
+    by_sku = catalog.sku_index
+    exists = np.fromiter((sku in by_sku for sku in skus), dtype=bool, count=len(skus))
+    fields = ("sku", "name", "current_price", "cost", "category")
+    catalog.update_many(
+        (by_sku[sku], {"name": name, "current_price": price, "cost": cost, "category": category})
+        for sku, name, price, cost, category in zip(*(valid[field].to_numpy()[exists].tolist() for field in fields))
+    )
+    added = int(len(skus) - exists.sum())
+    next_id = catalog.max_id + 1
+    catalog.extend(
+        {"id": product_id, "name": name, "sku": sku, "current_price": price, "cost": cost, "category": category}
+        for product_id, sku, name, price, cost, category in zip(
+            range(next_id, next_id + added), *(valid[field].to_numpy()[~exists].tolist() for field in fields))
+    )
+    return added, len(skus) - added
+
+
+def import_products(file, catalog, chunk_rows=CHUNK_ROWS, lock=None, progress=None):
+    """Stream a catalog CSV into a ``ProductCatalog`` in chunks of ``chunk_rows``.
+
+    Rows are matched to existing products through the catalog's SKU index.
+    Only one chunk is held in memory at a time; ``lock`` (if given) is taken
+    per chunk so other sessions are not blocked for the whole file.
+    ``progress(fraction, result)`` is called after every chunk with the
+    share of the file read so far.
+    """
+    size = getattr(file, "size", None)
+    file.seek(0)
+    result = {"rows": 0, "inserted": 0, "updated": 0, "invalid": 0, "errors": []}
+    reader = pd.read_csv(file, chunksize=chunk_rows, dtype=DTYPES, usecols=lambda column: column in COLUMNS,
+                         skipinitialspace=True)
+    with reader:
+        for chunk in reader:
+            _check_columns(chunk.columns)
+            # Line 1 is the header
+            valid, errors = validate_chunk(chunk, first_line=result["rows"] + 2)
+            if lock is not None:
+                with lock:
+                    inserted, updated = upsert_products(valid, catalog)
+            else:
+                inserted, updated = upsert_products(valid, catalog)
+            result["rows"] += len(chunk)
+            result["inserted"] += inserted
+            result["updated"] += updated
+            result["invalid"] += len(errors)
+            room = MAX_ERRORS - len(result["errors"])
+            if room > 0:
+                result["errors"].extend(errors.head(room).to_dict("records"))
+            if progress is not None:
+                progress(file.tell() / size if size else 0.0, result)
+    return result
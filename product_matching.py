@@ -0,0 +1,334 @@
+"""Matching of competitor listings to catalog products by identifiers and title similarity"""
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from product_search import TOKEN
+
+METHODS = ("identifiers", "similarity", "hybrid")
+
+# Attributes that can take part in matching; identifiers join exactly, brand/model drive blocking
+ATTRIBUTES = ("brand", "model", "gtin", "sku", "attributes")
+
+# Attributes each method uses; the others are ignored
+METHOD_ATTRIBUTES = {
+    "identifiers": ("gtin", "sku"),
+    "similarity": ("brand", "model", "attributes"),
+    "hybrid": ATTRIBUTES,
+}
+
+AUTO_APPROVE_CONFIDENCE = 95
+
+# Listings processed per batch; product features and blocks are built once
+BATCH_ROWS = 200_000
+
+# Candidate pairs scored per sparse product
+PAIR_BATCH = 500_000
+
+# Blocking tokens shared by more products than this are too common to propose candidates
+MAX_BLOCK_PRODUCTS = 50
+
+# Character trigrams are hashed into this many feature columns
+FEATURES = 2 ** 20
+
+# Title bytes used for n-grams (longer titles are truncated)
+TITLE_BYTES = 128
+
+# Byte normalization for n-grams: ASCII letters lower-cased, other ASCII punctuation to spaces
+_BYTE_MAP = np.arange(256, dtype=np.uint8)
+_BYTE_MAP[np.frombuffer(bytes(range(65, 91)), dtype=np.uint8)] += 32
+_BYTE_MAP[[b for b in range(1, 128) if not chr(b).isalnum()]] = ord(" ")
+
+MATCH_COLUMNS = ["product_id", "listing", "source", "url", "title", "listing_sku", "price",
+                 "confidence", "method", "status"]
+
+
+def normalize_gtin(values):
+    """GTIN-8/12/13/14 and UPC codes as 14-digit strings (NaN when not a plausible code)"""
+    digits = pd.Series(values, dtype=object).astype("string").str.replace(r"\D", "", regex=True)
+    valid = digits.str.len().between(8, 14)
+    return digits.str.zfill(14).where(valid)
+
+
+def normalize_code(values):
+    """SKUs / model codes upper-cased without separators (NaN when empty)"""
+    codes = pd.Series(values, dtype=object).str.upper().str.replace(r"[\W_]", "", regex=True)
+    return codes.where(codes.str.len() > 0)
+
+
+def _identifier_codes(frame, attributes):
+    """(field, normalized code) columns of a frame for the enabled identifier attributes"""
+    codes = {}
+    if "gtin" in attributes:
+        # UPC-A is a GTIN-12, so both columns normalize into one key space
+        gtins = [normalize_gtin(frame[column]) for column in ("gtin", "upc") if column in frame]
+        if gtins:
+            combined = gtins[0]
+            for other in gtins[1:]:
+                combined = combined.fillna(other)
+            codes["gtin"] = combined
+    if "sku" in attributes and "sku" in frame:
+        codes["sku"] = normalize_code(frame["sku"])
+    return codes
+
+
+def _titles(frame, column, attributes):
+    titles = frame[column].fillna("").astype(str)
+    if "attributes" in attributes and "attributes" in frame:
+        titles = titles + " " + frame["attributes"].fillna("").astype(str)
+    return titles
+
+
+def blocking_keys(titles, brands=None, use_model=True):
+    """(row, key) pairs used to propose candidates: title words, model-like tokens with digits, brand-scoped.
+
+    Keys are only compared between products and listings, and keys shared by
+    more than ``MAX_BLOCK_PRODUCTS`` products are dropped on the product side,
+    so common words never produce candidates while model numbers and rare
+    words do.
+    """
+    tokens = titles.astype(object).str.lower().str.findall(TOKEN.pattern).explode().dropna()
+    # Tokens repeat a lot, so they are classified once per distinct token
+    codes, distinct = pd.factorize(tokens)
+    has_digit = np.array([any(c.isdigit() for c in token) for token in distinct], dtype=bool)
+    lengths = np.array([len(token) for token in distinct])
+    keep = (lengths >= 3) & ~has_digit
+    if use_model:
+        keep |= has_digit & (lengths >= 2)
+    tokens = tokens[keep[codes]]
+    if brands is not None:
+        brand = brands.astype("string").str.lower().str.strip().fillna("")
+        tokens = brand.reindex(tokens.index).to_numpy(dtype=object) + "|" + tokens
+    keys = pd.DataFrame({"row": tokens.index.to_numpy(dtype=np.int64), "key": tokens.to_numpy(dtype=object)})
+    return keys.drop_duplicates()
+
+
+class NgramVectorizer:
+    """Hashed character-trigram TF-IDF vectors of titles as L2-normalized sparse rows.
+
+    Trigrams are read from a fixed-width byte matrix of the titles,
+    normalized through a byte lookup table, so a batch is vectorized with
+    NumPy instead of a Python loop per title. IDF weights are fitted on the product side.
+    """
+
+    def __init__(self):
+        self.idf = None
+
+    def _ngrams(self, titles):
+        encoded = np.array([f" {title} ".encode("utf-8") for title in titles.tolist()], dtype=f"S{TITLE_BYTES}")
+        grid = _BYTE_MAP[encoded.view(np.uint8).reshape(len(encoded), TITLE_BYTES)].astype(np.int64)
+        lengths = (grid != 0).sum(axis=1)
+        codes = (grid[:, :-2] << 16) | (grid[:, 1:-1] << 8) | grid[:, 2:]
+        rows, starts = np.nonzero(np.arange(TITLE_BYTES - 2) < (lengths - 2)[:, None])
+        columns = (codes[rows, starts] * 2654435761) % FEATURES
+        counts = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                                   shape=(len(titles), FEATURES))
+        counts.sum_duplicates()
+        return counts
+
+    def fit_transform(self, titles):
+        counts = self._ngrams(titles)
+        document_frequency = np.bincount(counts.indices, minlength=FEATURES)
+        self.idf = (np.log((1 + len(titles)) / (1 + document_frequency)) + 1).astype(np.float32)
+        # Like a fitted vocabulary: trigrams no product has carry no weight
+        self.idf[document_frequency == 0] = 0
+        return self._weight(counts)
+
+    def transform(self, titles):
+        return self._weight(self._ngrams(titles))
+
+    def _weight(self, counts):
+        counts.data = (1 + np.log(counts.data)) * self.idf[counts.indices]
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms).dot(counts).tocsr()
+
+
+def pair_similarity(left, right, left_rows, right_rows):
+    """Cosine similarity of row pairs of two L2-normalized sparse matrices, in batches"""
+    scores = np.empty(len(left_rows), dtype=np.float32)
+    for start in range(0, len(left_rows), PAIR_BATCH):
+        stop = start + PAIR_BATCH
+        product = left[left_rows[start:stop]].multiply(right[right_rows[start:stop]])
+        scores[start:stop] = np.asarray(product.sum(axis=1)).ravel()
+    return scores
+
+
+def exact_matches(product_codes, listing_codes):
+    """Listings whose identifier equals exactly one product's, as (listing, product row, method)"""
+    found = []
+    matched = pd.Index([], dtype=np.int64)
+    for field, listing_code in listing_codes.items():
+        if field not in product_codes:
+            continue
+        products = product_codes[field].dropna()
+        # A code shared by several products cannot identify one of them
+        products = products[~products.duplicated(keep=False)]
+        lookup = pd.Series(products.index.to_numpy(), index=products.to_numpy())
+        listing_code = listing_code.dropna()
+        listing_code = listing_code[~listing_code.index.isin(matched)]
+        rows = lookup.reindex(listing_code.to_numpy()).to_numpy()
+        hit = ~pd.isna(rows)
+        found.append(pd.DataFrame({"listing": listing_code.index[hit], "product_row": rows[hit].astype(np.int64),
+                                   "method": field}))
+        matched = matched.append(listing_code.index[hit])
+    if not found:
+        return pd.DataFrame({"listing": [], "product_row": [], "method": []})
+    return pd.concat(found, ignore_index=True)
+
+
+def route(matches, threshold, auto_approve=True):
+    """Drop matches below ``threshold``; the rest are auto-approved above ``AUTO_APPROVE_CONFIDENCE`` or pending review"""
+    matches = matches[matches["confidence"] >= threshold].copy()
+    approved = auto_approve & (matches["confidence"] > AUTO_APPROVE_CONFIDENCE)
+    matches["status"] = np.where(approved, "approved", "pending")
+    return matches
+
+
+class ProductMatcher:
+    """Matches competitor listings to catalog products without comparing all pairs.
+
+    Identifier matches (GTIN/UPC, SKU) are hash joins and count as 100%
+    confident. Remaining listings get candidate products through blocking
+    keys (brand-scoped title words and model tokens, see ``blocking_keys``)
+    and each candidate pair is scored by the cosine similarity of their
+    trigram TF-IDF vectors, computed as batched sparse row products. Each
+    listing keeps its best product. Product features and blocks are built
+    once; listings stream through in batches of ``BATCH_ROWS``.
+
+    ``products`` needs ``id``, ``name`` and ``sku`` columns (e.g. the catalog
+    frame); ``listings`` needs ``title``, ``source`` and ``url``. Optional
+    ``gtin``, ``upc``, ``brand``, ``price`` and ``attributes`` columns are
+    used when present.
+    """
+
+    def __init__(self, products, method="hybrid", attributes=ATTRIBUTES):
+        if method not in METHODS:
+            raise ValueError(f"Unknown matching method: {method}")
+        self.method = method
+        self.attributes = set(attributes)
+        self.products = products.reset_index(drop=True)
+        self.use_brand = "brand" in self.attributes and "brand" in self.products
+        self._product_codes = _identifier_codes(self.products, self.attributes) if method != "similarity" else {}
+        if method != "identifiers":
+            titles = _titles(self.products, "name", self.attributes)
+            self._vectorizer = NgramVectorizer()
+            self._features = self._vectorizer.fit_transform(titles)
+            keys = blocking_keys(titles, self.products["brand"] if self.use_brand else None,
+                                 use_model="model" in self.attributes)
+            sizes = keys["key"].map(keys["key"].value_counts())
+            self._blocks = keys[sizes <= MAX_BLOCK_PRODUCTS].rename(columns={"row": "product_row"})
+
+    def _similar(self, listings, rows):
+        """Best-scoring blocked candidate product of each listing in ``rows``"""
+        batch = listings.loc[rows]
+        brands = batch["brand"] if self.use_brand and "brand" in batch else None
+        if self.use_brand and brands is None:
+            return pd.DataFrame({"listing": [], "product_row": [], "confidence": []})
+        titles = _titles(batch, "title", self.attributes)
+        keys = blocking_keys(titles, brands, use_model="model" in self.attributes)
+        pairs = keys.merge(self._blocks, on="key")[["row", "product_row"]].drop_duplicates()
+        if not len(pairs):
+            return pd.DataFrame({"listing": [], "product_row": [], "confidence": []})
+        features = self._vectorizer.transform(titles.reset_index(drop=True))
+        local = pd.Index(rows).get_indexer(pairs["row"].to_numpy())
+        scores = pair_similarity(self._features, features, pairs["product_row"].to_numpy(), local)
+        scored = pd.DataFrame({"listing": pairs["row"].to_numpy(), "product_row": pairs["product_row"].to_numpy(),
+                               "confidence": np.round(scores.astype(np.float64) * 100, 1)})
+        return scored.sort_values("confidence", ascending=False, kind="stable").drop_duplicates("listing")
+
+    def match(self, listings, threshold=85, auto_approve=True, batch_rows=BATCH_ROWS, progress=None):
+        """Routed matches (``MATCH_COLUMNS``) of ``listings`` at or above ``threshold`` %, best first.
+
+        ``progress(fraction)`` is called after every batch.
+        """
+        listings = listings.reset_index(drop=True)
+        found = []
+        for start in range(0, len(listings), batch_rows):
+            batch = listings.iloc[start:start + batch_rows]
+            exact = exact_matches(self._product_codes, _identifier_codes(batch, self.attributes))
+            exact["confidence"] = 100.0
+            found.append(exact)
+            if self.method != "identifiers":
+                rest = batch.index.difference(exact["listing"])
+                similar = self._similar(listings, rest)
+                similar["method"] = "similarity"
+                found.append(similar)
+            if progress is not None:
+                progress(min(1.0, (start + batch_rows) / len(listings)))
+        matches = pd.concat(found, ignore_index=True) if found else pd.DataFrame(
+            {"listing": [], "product_row": [], "method": [], "confidence": []})
+        matches = route(matches, threshold, auto_approve)
+        listing = listings.reindex(matches["listing"].to_numpy())
+        product_rows = matches["product_row"].to_numpy(dtype=np.int64)
+        result = pd.DataFrame({
+            "product_id": self.products["id"].to_numpy()[product_rows],
+            "listing": matches["listing"].to_numpy(dtype=np.int64),
+            "source": listing["source"].to_numpy(),
+            "url": listing["url"].to_numpy(),
+            "title": listing["title"].to_numpy(),
+            "listing_sku": listing["sku"].to_numpy() if "sku" in listing else None,
+            "price": listing["price"].to_numpy() if "price" in listing else np.nan,
+            "confidence": matches["confidence"].to_numpy(),
+            "method": matches["method"].to_numpy(),
+            "status": matches["status"].to_numpy(),
+        }, columns=MATCH_COLUMNS)
+        return result.sort_values("confidence", ascending=False, kind="stable", ignore_index=True)
+
+
+class MatchingJob:
+    """One auto-matching run at a time on a background thread.
+
+    ``start`` builds the ``ProductMatcher`` and matches the listings off the
+    caller's thread; ``progress``, ``result`` and ``error`` can be polled
+    while it runs and stay readable after it ends. ``finish(matches)`` runs on
+    the job thread (e.g. to queue the matches) and its return value becomes
+    ``result``.
+    """
+
+    def __init__(self):
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.runs = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, products, listings, method="hybrid", attributes=ATTRIBUTES, finish=None, **options):
+        """Start matching unless a run is in progress; returns whether it started.
+
+        ``options`` are passed on to ``ProductMatcher.match``.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.progress, self.result, self.error = 0.0, None, None
+            self.runs += 1
+            self._thread = threading.Thread(target=self._run, args=(products, listings, method, attributes, finish,
+                                                                    options), name="product-matching", daemon=True)
+            self._thread.start()
+        return True
+
+    def join(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self, products, listings, method, attributes, finish, options):
+        try:
+            matcher = ProductMatcher(products, method=method, attributes=attributes)
+            matches = matcher.match(listings, progress=self._progress, **options)
+            self.result = finish(matches) if finish is not None else matches
+        except Exception as exc:
+            self.error = str(exc) or type(exc).__name__
+        finally:
+            self.progress = 1.0
+
+    def _progress(self, fraction):
+        self.progress = fraction
@@ -0,0 +1,264 @@
+"""Full-text and fuzzy product search over name, SKU and category"""
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+TOKEN = re.compile(r"[^\W_]+")
+
+# Query terms expand to at most this many vocabulary tokens by prefix (e.g. "cam" -> "camera", "camcorder")
+PREFIX_EXPANSIONS = 100
+
+# Typo candidates: tokens sharing this share of trigrams (Dice) with the term, the best FUZZY_EXPANSIONS of them
+FUZZY_MIN_SIMILARITY = 0.5
+FUZZY_EXPANSIONS = 10
+
+# Term match weights; a product's score is the sum over the query terms
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.75
+FUZZY_WEIGHT = 0.6
+
+# Changed products kept in the small delta index before the base index is rebuilt
+REBUILD_CHANGES = 50_000
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def tokenize(text):
+    """Lower-case word and number tokens of ``text``"""
+    return TOKEN.findall(str(text).lower())
+
+
+def _tokens(name, sku, category):
+    sku_parts = tokenize(sku)
+    tokens = set(tokenize(f"{name} {category}"))
+    tokens.update(sku_parts)
+    if sku_parts:
+        tokens.add("".join(sku_parts))
+    return tokens
+
+
+def product_tokens(product):
+    """Search tokens of a product: name, SKU and category words plus the SKU without separators"""
+    return _tokens(product["name"], product["sku"], product["category"])
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _fuzzy_candidate(token):
+    # Codes and numbers are matched by prefix only
+    return len(token) >= 3 and token.isalpha()
+
+
+def _in_sorted(values, sorted_array):
+    """Mask of the ``values`` found in ``sorted_array``; binary search costs less than a merge when one side is small"""
+    found = np.searchsorted(sorted_array, values)
+    found[found == len(sorted_array)] = 0
+    return sorted_array[found] == values if len(sorted_array) else np.zeros(len(values), dtype=bool)
+
+
+def _best_per_position(positions, weights):
+    """Unique sorted positions with the highest weight each got"""
+    if not len(positions):
+        return _EMPTY, np.empty(0)
+    order = np.lexsort((-weights, positions))
+    positions, weights = positions[order], weights[order]
+    first = np.append(True, positions[1:] != positions[:-1])
+    return positions[first], weights[first]
+
+
+class ProductSearchIndex:
+    """Inverted token index over a ``ProductCatalog`` with prefix and trigram fuzzy matching.
+
+    The base index is built in bulk from the catalog frame: a sorted
+    vocabulary with one sorted NumPy posting array of catalog positions per
+    token, plus a trigram index over the word tokens for typo matching.
+    Products added or edited later are tokenized into a small delta index and
+    their stale base postings are masked, so an edit costs one product's
+    tokens; the base is rebuilt once ``REBUILD_CHANGES`` products have
+    changed. The index catches up with the catalog's change log on each search,
+    and rebuilds when the log was trimmed past its cursor.
+
+    Every query term must match (exactly, by prefix, or fuzzily when it has
+    no exact match); results are ranked by the summed term weights and then
+    by catalog order. Category and status filters are intersected with the
+    matches through the catalog's inverted indexes.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._cursor = 0
+        self._built = False
+        self._vocabulary = np.empty(0, dtype=object)    # sorted tokens
+        self._offsets = np.zeros(1, dtype=np.int64)     # token id -> slice of _postings
+        self._postings = _EMPTY
+        self._trigram_index = {}                        # trigram -> token ids
+        self._trigram_counts = np.empty(0, dtype=np.int64)
+        self._base_size = 0
+        self._delta = {}        # token -> {position: None}
+        self._delta_tokens = {}  # position -> its tokens in the delta
+        self._stale = _EMPTY    # sorted base positions superseded by the delta
+        self._lock = threading.RLock()
+
+    def _build(self):
+        cursor = self.catalog.change_cursor
+        frame = self.catalog.frame()
+        tokens, counts = [], []
+        for name, sku, category in zip(frame["name"].tolist(), frame["sku"].tolist(), frame["category"].tolist()):
+            product = _tokens(name, sku, category)
+            tokens.extend(product)
+            counts.append(len(product))
+        positions = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+        # Hashing first and sorting only the distinct tokens is much cheaper than a sorted factorize
+        token_ids, vocabulary = pd.factorize(np.array(tokens, dtype=object))
+        vocabulary = np.asarray(vocabulary, dtype=object)
+        by_token = vocabulary.argsort(kind="stable")
+        rank = np.empty(len(vocabulary), dtype=np.int64)
+        rank[by_token] = np.arange(len(vocabulary))
+        token_ids = rank[token_ids]
+        order = np.lexsort((positions, token_ids))
+        self._postings = positions[order]
+        self._offsets = np.searchsorted(token_ids[order], np.arange(len(vocabulary) + 1))
+        self._vocabulary = vocabulary[by_token]
+
+        grams = {}
+        counts = np.zeros(len(vocabulary), dtype=np.int64)
+        for token_id, token in enumerate(self._vocabulary):
+            if _fuzzy_candidate(token):
+                trigrams = _trigrams(token)
+                counts[token_id] = len(trigrams)
+                for gram in trigrams:
+                    grams.setdefault(gram, []).append(token_id)
+        self._trigram_index = {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+        self._trigram_counts = counts
+
+        self._base_size = len(frame)
+        self._delta, self._delta_tokens, self._stale = {}, {}, _EMPTY
+        self._cursor = cursor
+        self._built = True
+
+    def _sync(self):
+        """Apply the catalog changes made since the last search"""
+        changed, cursor = self.catalog.changes_since(self._cursor, self)
+        if changed is None or not self._built or len(self._delta_tokens) + len(changed) > REBUILD_CHANGES:
+            self._build()
+            changed, cursor = self.catalog.changes_since(self._cursor, self)
+        if not changed:
+            return
+        stale = []
+        for position in dict.fromkeys(changed):
+            tokens = product_tokens(self.catalog[position])
+            for token in self._delta_tokens.get(position, ()):
+                if token not in tokens:
+                    postings = self._delta[token]
+                    del postings[position]
+                    if not postings:
+                        del self._delta[token]
+            for token in tokens:
+                self._delta.setdefault(token, {})[position] = None
+            self._delta_tokens[position] = tokens
+            if position < self._base_size:
+                stale.append(position)
+        if stale:
+            self._stale = np.union1d(self._stale, np.array(stale, dtype=np.int64))
+        self._cursor = cursor
+
+    def _base_postings(self, token_id):
+        postings = self._postings[self._offsets[token_id]:self._offsets[token_id + 1]]
+        if len(self._stale):
+            postings = postings[~_in_sorted(postings, self._stale)]
+        return postings
+
+    def _matching_tokens(self, term):
+        """(base token ids, delta tokens, weight) groups a query term matches"""
+        groups = []
+        exact = np.searchsorted(self._vocabulary, term)
+        has_exact = exact < len(self._vocabulary) and self._vocabulary[exact] == term
+        if has_exact or term in self._delta:
+            groups.append(([exact] if has_exact else [], [term] if term in self._delta else [], EXACT_WEIGHT))
+
+        # Tokens starting with the term form one range of the sorted vocabulary
+        end = np.searchsorted(self._vocabulary, term + "\uffff")
+        first = exact + 1 if has_exact else exact
+        prefixed = range(first, min(end, first + PREFIX_EXPANSIONS))
+        delta_prefixed = [t for t in self._delta if t != term and t.startswith(term)][:PREFIX_EXPANSIONS]
+        if len(prefixed) or delta_prefixed:
+            groups.append((list(prefixed), delta_prefixed, PREFIX_WEIGHT))
+
+        if not groups and _fuzzy_candidate(term):
+            trigrams = _trigrams(term)
+            hits = [self._trigram_index[g] for g in trigrams if g in self._trigram_index]
+            if hits:
+                shared = np.bincount(np.concatenate(hits), minlength=len(self._vocabulary))
+                similarity = 2 * shared / (len(trigrams) + np.maximum(self._trigram_counts, 1))
+                candidates = np.flatnonzero(similarity >= FUZZY_MIN_SIMILARITY)
+                best = candidates[np.argsort(-similarity[candidates], kind="stable")][:FUZZY_EXPANSIONS]
+                for token_id in best:
+                    groups.append(([token_id], [], FUZZY_WEIGHT * similarity[token_id]))
+            for token in self._delta:
+                if _fuzzy_candidate(token):
+                    other = _trigrams(token)
+                    similarity = 2 * len(trigrams & other) / (len(trigrams) + len(other))
+                    if similarity >= FUZZY_MIN_SIMILARITY:
+                        groups.append(([], [token], FUZZY_WEIGHT * similarity))
+        return groups
+
+    def _term_matches(self, term):
+        """Sorted positions matching one query term and their weights"""
+        positions, weights = [], []
+        for token_ids, delta_tokens, weight in self._matching_tokens(term):
+            for token_id in token_ids:
+                postings = self._base_postings(token_id)
+                positions.append(postings)
+                weights.append(np.full(len(postings), weight))
+            for token in delta_tokens:
+                postings = np.fromiter(self._delta[token], dtype=np.int64)
+                positions.append(postings)
+                weights.append(np.full(len(postings), weight))
+        if not positions:
+            return _EMPTY, np.empty(0)
+        return _best_per_position(np.concatenate(positions), np.concatenate(weights))
+
+    def _filtered(self, filters):
+        """Sorted positions passing every (field, value) filter of the catalog's inverted indexes"""
+        matches = None
+        for field, value in filters:
+            positions = self.catalog.positions(field, value)
+            if matches is not None:
+                smaller, larger = sorted((matches, positions), key=len)
+                positions = smaller[_in_sorted(smaller, larger)]
+            matches = positions
+        return matches
+
+    def search(self, query="", filters=(), offset=0, limit=50):
+        """(positions of one page of ranked matches, total number of matches).
+
+        ``filters`` are (indexed field, value) pairs such as
+        ``("category", "Electronics")``. An empty query lists the filtered
+        products in catalog order.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not terms:
+                positions = self._filtered(filters)
+                if positions is None:
+                    total = len(self.catalog)
+                    return np.arange(offset, min(offset + limit, total), dtype=np.int64), total
+                return positions[offset:offset + limit], len(positions)
+
+            self._sync()
+            matches = sorted((self._term_matches(term) for term in terms), key=lambda match: len(match[0]))
+            positions, scores = matches[0]
+            for other, weights in matches[1:]:
+                positions, here, there = np.intersect1d(positions, other, assume_unique=True, return_indices=True)
+                scores = scores[here] + weights[there]
+            allowed = self._filtered(filters)
+            if allowed is not None:
+                keep = _in_sorted(positions, allowed)
+                positions, scores = positions[keep], scores[keep]
+            order = np.lexsort((positions, -scores))
+            return positions[order[offset:offset + limit]], len(positions)
@@ -0,0 +1,199 @@
+"""Vectorized synthetic catalog and price-history generation for demos and load tests"""
+import argparse
+import math
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+OWN_SOURCE = "Your Store"
+
+FREQUENCIES = {
+    "D": timedelta(days=1),
+    "H": timedelta(hours=1),
+    "15min": timedelta(minutes=15),
+}
+
+_CATEGORIES = ["Electronics", "Audio", "Accessories", "Computing", "Gaming", "Smart Home"]
+_ADJECTIVES = ["Wireless", "Smart", "Portable", "Compact", "Premium", "Ultra", "Pro", "Mini"]
+_NOUNS = ["Headphones", "Speaker", "Watch", "Hub", "Stand", "Charger", "Keyboard", "Mouse", "Camera", "Router"]
+_COLORS = ["Black", "White", "Silver", "Blue"]
+
+
+def generate_products(n, seed=None, start_id=1):
+    """Generate ``n`` synthetic products in the same shape as the sample catalog"""
+    rng = np.random.default_rng(seed)
+    adjectives = rng.integers(0, len(_ADJECTIVES), n)
+    nouns = rng.integers(0, len(_NOUNS), n)
+    categories = rng.integers(0, len(_CATEGORIES), n)
+    prices = np.round(rng.lognormal(np.log(120), 0.8, n), 2) + 0.99
+    costs = np.round(prices * rng.uniform(0.35, 0.7, n), 2)
+    return [
+        {
+            "id": start_id + i,
+            "name": f"{_ADJECTIVES[adjectives[i]]} {_NOUNS[nouns[i]]} {start_id + i}",
+            "sku": f"SYN-{start_id + i:07d}",
+            "current_price": float(prices[i]),
+            "cost": float(costs[i]),
+            "category": _CATEGORIES[categories[i]],
+        }
+        for i in range(n)
+    ]
+
+
+def generate_competitors(m):
+    """Generate ``m`` synthetic competitor entries"""
+    return [{"name": f"Competitor {i + 1}", "url": f"competitor{i + 1}.example.com", "status": "Active"} for i in range(m)]
+
+
+def _reword(words, style, rng):
+    """A competitor's version of a product title"""
+    if style == 1:
+        return " ".join(words).lower() + " - " + _COLORS[rng.integers(0, len(_COLORS))]
+    if style == 2:
+        return " ".join(words[1:] + words[:1])
+    if style == 3:
+        # One transposed letter pair in the longest word
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        word = words[longest]
+        if len(word) > 3:
+            i = int(rng.integers(1, len(word) - 2))
+            words = words[:longest] + [word[:i] + word[i + 1] + word[i] + word[i + 2:]] + words[longest + 1:]
+        return " ".join(words) + " (New)"
+    return " ".join(words)
+
+
+def generate_listings(products, competitors, listed=0.8, sku_share=0.1, unrelated=0.1, seed=None):
+    """Synthetic competitor listings for matching demos and load tests.
+
+    Each competitor lists about ``listed`` of the products under a reworded
+    title (case, word order, a typo, a colour suffix); ``sku_share`` of the
+    listings carry the product's SKU. ``unrelated`` adds listings of products
+    that are not in the catalog.
+    """
+    rng = np.random.default_rng(seed)
+    names = [p["name"] for p in products]
+    skus = np.array([p["sku"] for p in products], dtype=object)
+    prices = np.array([p["current_price"] for p in products], dtype=np.float64)
+    frames = []
+    for number, competitor in enumerate(competitors, 1):
+        rows = np.flatnonzero(rng.random(len(products)) < listed)
+        styles = rng.integers(0, 4, len(rows))
+        titles = [_reword(names[row].split(), style, rng) for row, style in zip(rows, styles)]
+        n_unrelated = int(len(rows) * unrelated)
+        adjectives = rng.integers(0, len(_ADJECTIVES), n_unrelated)
+        nouns = rng.integers(0, len(_NOUNS), n_unrelated)
+        titles += [f"{_ADJECTIVES[a]} {_NOUNS[b]} {9_000_000 + i}" for i, (a, b) in enumerate(zip(adjectives, nouns))]
+        count = len(titles)
+        own_sku = rng.random(len(rows)) < sku_share
+        listing_skus = np.array([f"C{number}-{i:08d}" for i in range(count)], dtype=object)
+        listing_skus[:len(rows)][own_sku] = skus[rows][own_sku]
+        listing_prices = np.append(prices[rows] * rng.uniform(0.85, 1.15, len(rows)),
+                                   np.round(rng.lognormal(np.log(120), 0.8, n_unrelated), 2))
+        frames.append(pd.DataFrame({
+            "title": titles,
+            "source": competitor["name"],
+            "url": [f"https://{competitor['url']}/p/{i}" for i in range(count)],
+            "sku": listing_skus,
+            "price": np.round(listing_prices, 2),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["title", "source", "url", "sku", "price"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_price_history(products, competitors, days=30, freq="D", seed=None, target_rows=None,
+                       end=None, batch_rows=2_000_000):
+    """Yield price-history column batches for products x sources x periods.
+
+    Every period has one row per competitor plus one "Your Store" row for each
+    product. ``target_rows`` overrides ``days`` and picks the number of periods
+    needed to reach (at least) that many rows. Batches hold whole periods and
+    are sized to roughly ``batch_rows`` rows so memory stays bounded.
+    """
+    step = FREQUENCIES[freq]
+    n_products = len(products)
+    sources = [c["name"] for c in competitors] + [OWN_SOURCE]
+    n_sources = len(sources)
+    rows_per_period = n_products * n_sources
+    if rows_per_period == 0:
+        return
+    if target_rows is not None:
+        periods = math.ceil(target_rows / rows_per_period)
+    else:
+        periods = int(timedelta(days=days) / step)
+    end = end or datetime.now()
+    start = np.datetime64(pd.Timestamp(end - periods * step), "ns")
+    step_ns = np.timedelta64(int(step.total_seconds() * 1e9), "ns")
+
+    rng = np.random.default_rng(seed)
+    base = np.array([p["current_price"] for p in products], dtype=np.float64)
+    product_ids = np.array([p["id"] for p in products], dtype=np.int32)
+    name_codes, name_categories = pd.factorize(pd.Index([p["name"] for p in products]))
+    sku_codes, sku_categories = pd.factorize(pd.Index([p["sku"] for p in products]))
+    source_categories = pd.Index(sources)
+
+    # Layout within a period is product-major, own store last: (product, source)
+    product_idx = np.repeat(np.arange(n_products, dtype=np.int32), n_sources)
+    source_idx = np.tile(np.arange(n_sources, dtype=np.int32), n_products)
+    is_own = source_idx == n_sources - 1
+
+    periods_per_batch = max(1, batch_rows // rows_per_period)
+    for first in range(0, periods, periods_per_batch):
+        count = min(periods_per_batch, periods - first)
+        n = count * rows_per_period
+        p_idx = np.tile(product_idx, count)
+        own = np.tile(is_own, count)
+        base_rows = base[p_idx]
+
+        price = base_rows * rng.uniform(0.85, 1.15, n)
+        price[own] = base_rows[own] + rng.normal(0, 5, int(own.sum()))
+        availability = rng.random(n) >= 0.05
+        availability[own] = True
+        shipping = rng.uniform(0, 15, n)
+        shipping[own] = 0
+
+        offsets = np.repeat(np.arange(first, first + count, dtype=np.int64), rows_per_period)
+        yield {
+            "date": start + offsets * step_ns,
+            "product_id": product_ids[p_idx],
+            "product_name": pd.Categorical.from_codes(name_codes[p_idx], categories=name_categories),
+            "sku": pd.Categorical.from_codes(sku_codes[p_idx], categories=sku_categories),
+            "source": pd.Categorical.from_codes(np.tile(source_idx, count), categories=source_categories),
+            "price": np.round(price, 2).astype(np.float32),
+            "availability": availability,
+            "shipping_cost": np.round(shipping, 2).astype(np.float32),
+        }
+
+
+def fill_price_history(store, products, competitors, **kwargs):
+    """Generate price history straight into ``store``; returns the number of rows added"""
+    return sum(store.extend(batch) for batch in iter_price_history(products, competitors, **kwargs))
+
+
+def main():
+    from price_history import PriceHistoryStore
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic price history and report its size")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--competitors", type=int, default=10)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--freq", choices=sorted(FREQUENCIES), default="D")
+    parser.add_argument("--rows", type=int, default=None, help="target row count (overrides --days)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    products = generate_products(args.products, seed=args.seed)
+    competitors = generate_competitors(args.competitors)
+    store = PriceHistoryStore()
+    started = time.perf_counter()
+    rows = fill_price_history(store, products, competitors, days=args.days, freq=args.freq,
+                              seed=args.seed, target_rows=args.rows)
+    elapsed = time.perf_counter() - started
+    print(f"{rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s), "
+          f"{store.nbytes / 2**20:,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Process-wide data shared by every Streamlit session"""
+import threading
+from pathlib import Path
+
+from alert_engine import AlertEvaluator
+from alert_store import AlertStore
+from crawl_scheduler import CrawlScheduler
+from crawler import DEFAULT_SETTINGS as DEFAULT_CRAWL_SETTINGS, CrawlEngine
+from figure_cache import FigureCache
+from match_queue import MatchReviewQueue
+from notifications import DEFAULT_SETTINGS as DEFAULT_NOTIFICATION_SETTINGS, NotificationDispatcher
+from price_archive import ParquetPriceArchive
+from price_history import PriceHistoryStore
+from price_rollups import PriceRollups
+from pricing_engine import IncrementalRepricer
+from product_catalog import ProductCatalog
+from product_matching import MatchingJob
+from product_search import ProductSearchIndex
+
+
+class SharedData:
+    """Read-mostly catalog, price history and rules for one data directory.
+
+    A single instance is cached per process (see ``_load_shared_data`` in the
+    app), and sessions only keep references to these attributes next to their
+    own UI state. Writers take ``lock`` around multi-step updates.
+    """
+
+    # Attributes mirrored into st.session_state under the same names
+    SESSION_KEYS = ("products", "competitors", "price_history", "price_archive",
+                    "alerts", "alert_rules", "dynamic_pricing_rules", "tracked_urls", "crawl_settings",
+                    "crawl_scheduler", "notification_settings")
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self.lock = threading.RLock()
+        # Serializes archive writes, which run outside ``lock``
+        self.persist_lock = threading.Lock()
+        self.products = ProductCatalog()
+        self.product_search = ProductSearchIndex(self.products)
+        self.competitors = []
+        self.price_history = PriceHistoryStore()
+        self.price_archive = ParquetPriceArchive(self.data_dir / "price_history")
+        self.price_rollups = PriceRollups()
+        self.alerts = AlertStore()
+        self.alert_rules = []
+        self.alert_evaluator = AlertEvaluator()
+        self.notification_settings = dict(DEFAULT_NOTIFICATION_SETTINGS)
+        self.notifier = NotificationDispatcher(self.notification_settings)
+        self.dynamic_pricing_rules = []
+        self.repricer = IncrementalRepricer()
+        self.tracked_urls = []
+        self.crawl_settings = {
+            **DEFAULT_CRAWL_SETTINGS,
+            "use_proxies": True,
+            "proxy_pool_size": 100,
+            "anti_bot_level": "Advanced",
+            "headless_browser": True,
+            "geo_regions": ["North America"],
+            "default_frequency": "Every 15 minutes",
+            "peak_hours": False,
+            "extract_variants": True,
+            "extract_reviews": False,
+        }
+        self.crawl_scheduler = CrawlScheduler(
+            requests_per_minute=self.crawl_settings["requests_per_minute"],
+            peak_hours=self.crawl_settings["peak_hours"],
+        )
+        # One engine for every crawl, so per-domain rate limits hold across runs and sessions
+        self.crawl_engine = CrawlEngine(self.crawl_settings)
+        self.figure_cache = FigureCache()
+        # Names from the app's RETENTION_PERIODS; nothing is pruned until a shorter period is saved
+        self.retention = {"price_history": "Forever", "alerts": "Forever"}
+        self.history_loaded_from = None
+        self.history_persisted_rows = 0
+        self.competitor_listings = None     # DataFrame of listings found on competitor sites
+        self.match_queue = MatchReviewQueue(self.data_dir / "match_queue.sqlite3")
+        self.matching_job = MatchingJob()
+
+    def products_by_sku(self):
+        """SKU -> product dict, maintained by the catalog"""
+        return self.products.sku_index
+
+    @property
+    def version(self):
+        """Changes whenever new price observations are added or the catalog changes"""
+        return self.price_history.version, self.products.version
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from crawler import CrawlEngine, CrawlError, TokenBucket, parse_price_page, results_to_columns
+
+
+def _target(url, sku="SKU-1"):
+    return {"url": url, "product_id": 1, "product_name": "Widget", "sku": sku, "source": "Shop"}
+
+
+def _app():
+    hits = {"flaky": 0}
+
+    async def ok(request):
+        return web.json_response({"price": 19.99, "availability": True, "shipping_cost": 4.5})
+
+    async def html(request):
+        return web.Response(text='<meta itemprop="price" content="1,299.00"> out of stock', content_type="text/html")
+
+    async def bad_price(request):
+        return web.json_response({"price": "abc"})
+
+    async def null_price(request):
+        return web.json_response({"price": None})
+
+    async def undecodable(request):
+        return web.Response(body=b'{"price": 1\xff\xfe}', content_type="application/json", charset="utf-8")
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    async def flaky(request):
+        hits["flaky"] += 1
+        if hits["flaky"] == 1:
+            return web.Response(status=503)
+        return web.json_response({"price": 5})
+
+    app = web.Application()
+    app.router.add_get("/ok", ok)
+    app.router.add_get("/html", html)
+    app.router.add_get("/bad-price", bad_price)
+    app.router.add_get("/null-price", null_price)
+    app.router.add_get("/undecodable", undecodable)
+    app.router.add_get("/missing", missing)
+    app.router.add_get("/flaky", flaky)
+    return app, hits
+
+
+def _crawl(engine, paths):
+    async def run():
+        app, hits = _app()
+        async with TestServer(app) as server:
+            results = await engine.crawl([_target(str(server.make_url(path))) for path in paths])
+        return results, hits
+    return asyncio.run(run())
+
+
+def _engine(**overrides):
+    return CrawlEngine(requests_per_minute=60_000, burst=100, backoff_base=0.01, max_retries=2, **overrides)
+
+
+def test_parse_json_and_html_pages():
+    assert parse_price_page('{"price": "12.50", "shipping_cost": null}') == {
+        "price": 12.5, "availability": True, "shipping_cost": 0.0}
+    parsed = parse_price_page('<span itemprop="price" content="1,299.00"></span> SoldOut', "text/html")
+    assert parsed == {"price": 1299.0, "availability": False, "shipping_cost": 0.0}
+
+
+@pytest.mark.parametrize("body", ['{"price": "abc"}', '{"price": null}', '{"price": [1]}', "<p>no price</p>",
+                                  '<meta itemprop="price" content="1.2.3">'])
+def test_unusable_prices_raise_crawl_error(body):
+    with pytest.raises(CrawlError):
+        parse_price_page(body)
+
+
+def test_bad_pages_fail_alone_without_aborting_the_crawl():
+    paths = ["/ok", "/bad-price", "/html", "/null-price", "/undecodable", "/missing"]
+    results, _ = _crawl(_engine(), paths)
+
+    assert [r["url"].rsplit("/", 1)[1] for r in results] == [p[1:] for p in paths]
+    assert [r["ok"] for r in results] == [True, False, True, False, False, False]
+    assert results[0]["price"] == 19.99 and results[0]["shipping_cost"] == 4.5
+    assert results[2]["price"] == 1299.0 and results[2]["availability"] is False
+    assert "unreadable price" in results[1]["error"]
+    assert "undecodable page" in results[4]["error"]
+    assert results[5]["error"] == "HTTP 404"
+    # Pages that cannot parse are not retried
+    assert all(r["attempts"] == 1 for r in results[1:])
+
+
+def test_transient_status_is_retried():
+    results, hits = _crawl(_engine(), ["/flaky"])
+    assert results[0]["ok"] and results[0]["price"] == 5.0
+    assert results[0]["attempts"] == 2 and hits["flaky"] == 2
+
+
+def test_results_to_columns_keeps_only_successes():
+    results, _ = _crawl(_engine(), ["/ok", "/missing"])
+    columns = results_to_columns(results, extract_shipping=False)
+    assert list(columns["price"]) == pytest.approx([19.99])
+    assert list(columns["shipping_cost"]) == [0.0]
+    assert results_to_columns([r for r in results if not r["ok"]]) is None
+
+
+def test_rate_limit_holds_across_crawls_of_one_engine():
+    engine = CrawlEngine(requests_per_minute=120, burst=1)
+    _crawl(engine, ["/ok"])
+    started = time.monotonic()
+    _crawl(engine, ["/ok"])
+    # The domain's single token was spent by the first crawl; the next one refills at 2/s
+    assert time.monotonic() - started >= 0.3
+
+
+def test_configure_updates_existing_buckets():
+    engine = CrawlEngine(requests_per_minute=10)
+    bucket = engine._bucket("http://shop.example/p/1")
+    engine.configure(requests_per_minute=600, burst=5)
+    assert engine._bucket("http://shop.example/p/2") is bucket
+    assert bucket.rate == 10 and bucket.capacity == 5
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    started = time.monotonic()
+    asyncio.run(take(3))
+    assert time.monotonic() - started >= 0.15
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from downsample import downsample, lttb_indices, minmax_indices
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(3)
+    x = np.arange("2024-01-01T00", "2024-03-01T00", np.timedelta64(5, "m"), dtype="datetime64[ns]")
+    y = 100 + np.cumsum(rng.normal(0, 0.5, len(x)))
+    # One short spike that a plain stride would skip
+    y[5001] = 500.0
+    return x, y
+
+
+def test_short_series_are_returned_whole(series):
+    x, y = series
+    assert np.array_equal(minmax_indices(y[:100], 800), np.arange(100))
+    assert np.array_equal(lttb_indices(x[:100], y[:100], 800), np.arange(100))
+    dates, prices = downsample(x[:10], y[:10])
+    assert np.array_equal(dates, x[:10]) and np.array_equal(prices, y[:10])
+
+
+def test_minmax_keeps_every_bucket_extreme(series):
+    x, y = series
+    kept = minmax_indices(y, 800)
+    assert len(kept) <= 802 and np.all(np.diff(kept) > 0)
+    assert kept[0] == 0 and kept[-1] == len(y) - 1
+    assert 5001 in kept and y[kept].max() == y.max() and y[kept].min() == y.min()
+
+
+def test_lttb_keeps_the_spike_and_the_ends(series):
+    x, y = series
+    kept = lttb_indices(x, y, 500)
+    assert len(kept) == 500 and np.all(np.diff(kept) > 0)
+    assert kept[0] == 0 and kept[-1] == len(y) - 1 and 5001 in kept
+
+
+def test_downsample_returns_matching_points(series):
+    x, y = series
+    for method in ("minmax", "lttb"):
+        dates, prices = downsample(x, y, n_out=300, method=method)
+        assert len(dates) == len(prices) <= 302 and dates.dtype == x.dtype
+        positions = np.searchsorted(x, dates)
+        assert np.array_equal(y[positions], prices)
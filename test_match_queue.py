@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+import match_queue
+from match_queue import COLUMNS, MatchReviewQueue
+from product_matching import MATCH_COLUMNS
+
+
+def _matches(rows):
+    """Routed matches of (url, product_id, confidence, status)"""
+    return pd.DataFrame([
+        {"product_id": product_id, "listing": i, "source": "Amazon", "url": url, "title": f"Listing {url}",
+         "listing_sku": None, "price": 10.0 + i, "confidence": confidence, "method": "similarity", "status": status}
+        for i, (url, product_id, confidence, status) in enumerate(rows)
+    ], columns=MATCH_COLUMNS)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = MatchReviewQueue(tmp_path / "matches.sqlite3")
+    yield queue
+    queue.close()
+
+
+def test_add_stores_a_run_and_returns_its_approved_rows(queue):
+    approved = queue.add(_matches([("u1", 1, 99.0, "approved"), ("u2", 2, 90.0, "pending"),
+                                   ("u3", 3, 88.0, "pending")]))
+    assert list(approved.columns) == COLUMNS
+    assert list(approved["url"]) == ["u1"] and approved["listing_sku"].isna().all()
+    assert queue.counts() == {"pending": 2, "approved": 1, "rejected": 0} and len(queue) == 3
+    assert queue.add(_matches([])).empty
+
+
+def test_pages_are_best_confidence_first(queue):
+    queue.add(_matches([(f"u{i}", i, float(50 + i), "pending") for i in range(10)]))
+    first = queue.page(limit=4)
+    assert list(first["url"]) == ["u9", "u8", "u7", "u6"]
+    assert list(queue.page(offset=8, limit=4)["url"]) == ["u1", "u0"]
+    assert queue.page(status="approved").empty
+
+
+def test_review_changes_only_pending_rows_in_one_batch(queue):
+    queue.add(_matches([("u1", 1, 90.0, "pending"), ("u2", 2, 85.0, "pending"), ("u3", 3, 99.0, "approved")]))
+    pending = queue.page()
+    ids = dict(zip(pending["url"], pending["id"]))
+    ids["u3"] = int(queue.approved()["id"].iloc[0])
+
+    reviewed = queue.review([ids["u1"], ids["u3"]], "rejected")
+    # The already approved match keeps its decision
+    assert list(reviewed["url"]) == ["u1"] and set(reviewed["status"]) == {"rejected"}
+    assert reviewed["reviewed"].notna().all()
+    assert queue.counts() == {"pending": 1, "approved": 1, "rejected": 1}
+    assert queue.review([ids["u1"]], "approved").empty
+
+    with pytest.raises(ValueError):
+        queue.review([ids["u2"]], "pending")
+
+
+def test_large_reviews_are_chunked(queue, monkeypatch):
+    monkeypatch.setattr(match_queue, "_IDS_PER_STATEMENT", 3)
+    queue.add(_matches([(f"u{i}", i, 80.0, "pending") for i in range(10)]))
+    reviewed = queue.review(queue.page(limit=100)["id"], "approved")
+    assert len(reviewed) == 10 and queue.counts()["approved"] == 10
+
+
+def test_later_runs_keep_decisions_and_refresh_pending_rows(queue):
+    queue.add(_matches([("u1", 1, 90.0, "pending"), ("u2", 2, 85.0, "pending")]))
+    pending = queue.page()
+    queue.review(pending.loc[pending["url"] == "u1", "id"], "rejected")
+
+    approved = queue.add(_matches([("u1", 5, 99.0, "approved"), ("u2", 6, 97.0, "approved"),
+                                   ("u4", 4, 70.0, "pending")]))
+    # u1 stays rejected; u2 was pending and takes the new product and status
+    assert list(approved["url"]) == ["u2"] and list(approved["product_id"]) == [6]
+    assert queue.counts() == {"pending": 1, "approved": 1, "rejected": 1}
+
+
+def test_queue_persists_across_restarts(tmp_path):
+    path = tmp_path / "matches.sqlite3"
+    queue = MatchReviewQueue(path)
+    queue.add(_matches([("u1", 1, 99.0, "approved"), ("u2", 2, 90.0, "pending")]))
+    queue.close()
+
+    reopened = MatchReviewQueue(path)
+    try:
+        assert reopened.counts() == {"pending": 1, "approved": 1, "rejected": 0}
+        assert list(reopened.approved()["url"]) == ["u1"]
+    finally:
+        reopened.close()
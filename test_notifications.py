@@ -0,0 +1,192 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+from aiohttp import web
+
+from notifications import NotificationDispatcher, summarize
+
+
+def _alerts(n, severity="critical"):
+    return [{"id": i, "time": datetime(2024, 1, 1, 12, 0), "type": severity, "trigger": "Price Change",
+             "message": f"Amazon dropped price by 12% on P{i}", "product": f"P{i}", "dismissed_at": None}
+            for i in range(n)]
+
+
+class _SMTP(asyncio.Protocol):
+    """Just enough SMTP to accept messages"""
+
+    def __init__(self, received):
+        self.received = received
+        self.buffer = b""
+        self.message = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(b"220 ready\r\n")
+
+    def data_received(self, data):
+        self.buffer += data
+        while b"\r\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\r\n", 1)
+            if self.message is not None:
+                if line == b".":
+                    self.received.append(b"\n".join(self.message).decode())
+                    self.message = None
+                    self.transport.write(b"250 queued\r\n")
+                else:
+                    self.message.append(line)
+            elif line[:4].upper() == b"DATA":
+                self.message = []
+                self.transport.write(b"354 go ahead\r\n")
+            elif line[:4].upper() == b"QUIT":
+                self.transport.write(b"221 bye\r\n")
+                self.transport.close()
+            else:
+                self.transport.write(b"250 ok\r\n")
+
+
+@pytest.fixture
+def servers():
+    """Stand-in HTTP and SMTP servers on a loop thread of their own"""
+    received = {"slack": [], "webhook": [], "sms": [], "smtp": []}
+    failures = {"webhook": 2}
+
+    async def slack(request):
+        received["slack"].append(await request.json())
+        return web.Response(text="ok")
+
+    async def webhook(request):
+        if failures["webhook"]:
+            failures["webhook"] -= 1
+            return web.Response(status=503)
+        received["webhook"].append(await request.json())
+        return web.Response(text="ok")
+
+    async def sms(request):
+        received["sms"].append(await request.json())
+        return web.Response(status=400)
+
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    ports = {}
+
+    async def start():
+        app = web.Application()
+        app.router.add_post("/slack", slack)
+        app.router.add_post("/webhook", webhook)
+        app.router.add_post("/sms", sms)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        ports["http"] = runner.addresses[0][1]
+        smtp = await loop.create_server(lambda: _SMTP(received["smtp"]), "127.0.0.1", 0)
+        ports["smtp"] = smtp.sockets[0].getsockname()[1]
+        return runner
+
+    def run():
+        asyncio.set_event_loop(loop)
+        ports["runner"] = loop.run_until_complete(start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(10)
+    base = f"http://127.0.0.1:{ports['http']}"
+    yield received, {"slack": f"{base}/slack", "webhook": f"{base}/webhook", "sms": f"{base}/sms",
+                     "smtp": ports["smtp"]}
+    asyncio.run_coroutine_threadsafe(ports["runner"].cleanup(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+
+
+def _dispatcher(urls, **overrides):
+    settings = dict(
+        email_enabled=True, email_address="ops@example.com", smtp_host="127.0.0.1", smtp_port=urls["smtp"],
+        slack_enabled=True, slack_webhook=urls["slack"],
+        webhook_enabled=True, webhook_url=urls["webhook"],
+        sms_enabled=True, sms_gateway_url=urls["sms"], phone_number="+15550000000",
+        batch_window=0.2, backoff_base=0.01, timeout=5,
+    )
+    settings.update(overrides)
+    return NotificationDispatcher(**settings)
+
+
+def test_email_is_off_by_default():
+    dispatcher = NotificationDispatcher()
+    assert dispatcher.routes(_alerts(1)[0]) == []
+    assert dispatcher.routes({**_alerts(1)[0], "channels": ["Email", "Dashboard"]}) == []
+
+
+def test_routes_follow_rule_channels_and_severity():
+    dispatcher = NotificationDispatcher(email_enabled=True, sms_enabled=True, email_levels=["critical"])
+    assert dispatcher.routes(_alerts(1)[0]) == ["email", "sms"]
+    assert dispatcher.routes(_alerts(1, "warning")[0]) == []
+    assert dispatcher.routes({**_alerts(1)[0], "channels": ["SMS"]}) == ["sms"]
+
+
+def test_summarize_collapses_a_burst():
+    subject, text = summarize(_alerts(30), overflow=5)
+    assert subject == "[PriceIQ CRITICAL] 35 alerts: 30 Price Change"
+    assert "... and 10 more" in text and "5 more alerts were not queued" in text
+
+
+def test_burst_is_delivered_per_channel_with_retries(servers):
+    received, urls = servers
+    dispatcher = _dispatcher(urls)
+    try:
+        dispatcher.submit(_alerts(50))
+        dispatcher.flush(30)
+    finally:
+        dispatcher.stop()
+
+    # One coalesced message per channel rather than 50
+    assert len(received["slack"]) == 1 and "50 alerts" in received["slack"][0]["text"]
+    assert len(received["webhook"]) == 1 and len(received["webhook"][0]["alerts"]) == 50
+    assert len(received["smtp"]) == 1 and "ops@example.com" in received["smtp"][0]
+    assert dispatcher.stats["webhook"]["retries"] == 2 and dispatcher.stats["webhook"]["messages"] == 1
+    # A client error is not retried
+    assert len(received["sms"]) == 1
+    assert dispatcher.stats["sms"]["failed"] == 1 and dispatcher.last_error["sms"] == "HTTP 400"
+
+
+def test_digest_holds_email_until_sent(servers):
+    received, urls = servers
+    dispatcher = _dispatcher(urls, digest_mode=True, slack_enabled=False, webhook_enabled=False, sms_enabled=False)
+    try:
+        dispatcher.submit(_alerts(3))
+        dispatcher.flush(30)
+        assert dispatcher.pending_digest() == 3 and received["smtp"] == []
+        assert dispatcher.send_digest() is True
+    finally:
+        dispatcher.stop()
+    assert len(received["smtp"]) == 1 and "Daily digest, 3 alerts" in received["smtp"][0]
+
+
+def test_worker_survives_an_unexpected_error(servers):
+    received, urls = servers
+    dispatcher = _dispatcher(urls, email_enabled=False, webhook_enabled=False, sms_enabled=False,
+                             workers={"email": 1, "slack": 1, "sms": 1, "webhook": 1})
+    send = dispatcher._send
+    calls = []
+
+    async def broken_once(channel, alerts, subject, text):
+        calls.append(channel)
+        if len(calls) == 1:
+            raise RuntimeError("formatter bug")
+        await send(channel, alerts, subject, text)
+
+    dispatcher._send = broken_once
+    try:
+        dispatcher.submit(_alerts(1))
+        dispatcher.flush(30)
+        dispatcher.submit(_alerts(1))
+        dispatcher.flush(30)
+    finally:
+        dispatcher.stop()
+
+    assert dispatcher.stats["slack"]["failed"] == 1 and dispatcher.last_error["slack"] == "formatter bug"
+    # The channel's only worker is still running and delivers the next batch
+    assert len(received["slack"]) == 1 and dispatcher.stats["slack"]["messages"] == 1
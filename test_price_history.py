@@ -0,0 +1,129 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_history import COLUMNS, LatestPriceMatrix, PriceHistoryStore
+
+
+def _columns(n, start="2024-01-01", source="Amazon", price=10.0):
+    return {
+        "date": pd.date_range(start, periods=n, freq="h"),
+        "product_id": np.arange(n) % 3 + 1,
+        "product_name": [f"Product {i % 3 + 1}" for i in range(n)],
+        "sku": [f"SKU-{i % 3 + 1}" for i in range(n)],
+        "source": source,
+        "price": np.full(n, price) + np.arange(n),
+    }
+
+
+def test_append_and_extend_grow_the_columns():
+    store = PriceHistoryStore(capacity=2)
+    store.append(datetime(2024, 1, 1), 1, "Product 1", "SKU-1", "Amazon", 9.5, availability=False)
+    assert store.extend(_columns(5)) == 5
+    assert len(store) == 6 and store._capacity == 8
+
+    frame = store.to_frame()
+    assert list(frame.columns) == list(COLUMNS)
+    assert frame["price"].tolist() == pytest.approx([9.5, 10, 11, 12, 13, 14])
+    assert frame["availability"].tolist() == [False] + [True] * 5
+    assert frame["shipping_cost"].eq(0).all()
+    assert frame["date"].dtype == "datetime64[ns]" and frame["product_id"].dtype == np.int32
+
+
+def test_strings_are_stored_as_codes():
+    store = PriceHistoryStore()
+    store.extend(_columns(6))
+    store.extend(_columns(3, source=pd.Categorical(["Walmart", "Amazon", "Walmart"])))
+    assert store.categories("source") == ["Amazon", "Walmart"]
+    assert store.categories("sku") == ["SKU-1", "SKU-2", "SKU-3"]
+    frame = store.to_frame()
+    assert isinstance(frame["source"].dtype, pd.CategoricalDtype)
+    assert frame["source"].tolist()[-3:] == ["Walmart", "Amazon", "Walmart"]
+    assert store.nbytes == len(store) * sum(col.itemsize for col in store._columns.values())
+
+
+def test_frame_is_cached_until_the_next_write():
+    store = PriceHistoryStore()
+    store.extend(_columns(3))
+    frame = store.to_frame()
+    assert store.to_frame() is frame
+    version = store.version
+    store.extend(_columns(1))
+    assert store.version == version + 1 and len(store.to_frame()) == 4
+
+
+def test_bad_batches_are_rejected():
+    store = PriceHistoryStore()
+    columns = _columns(2)
+    del columns["sku"]
+    with pytest.raises(KeyError):
+        store.extend(columns)
+    with pytest.raises(ValueError):
+        store.extend({**_columns(2), "source": ["Amazon", None]})
+    assert store.extend(_columns(0)) == 0 and len(store) == 0
+
+
+def test_latest_observation_per_product_and_source():
+    store = PriceHistoryStore()
+    store.extend(_columns(6))
+    store.append(datetime(2023, 12, 31), 1, "Product 1", "SKU-1", "Amazon", 1.0)
+    price, date, available = store.latest_observation(1, "Amazon")
+    # The late-arriving older row does not replace the newest observation
+    assert (price, date, available) == (13.0, pd.Timestamp("2024-01-01 03:00"), True)
+    assert store.latest_observation(1, "Walmart") is None
+    assert store.latest_observation(99, "Amazon") is None
+
+
+def _dates(*hours):
+    return np.array([np.datetime64("2024-01-01T00", "ns") + np.timedelta64(h, "h") for h in hours])
+
+
+def test_latest_matrix_keeps_the_newest_observation_per_cell():
+    matrix = LatestPriceMatrix()
+    # Out of order within the batch: product 7 / source 0 is last seen at hour 5
+    matrix.update([7, 7, 7, 3], [0, 0, 1, 0], _dates(5, 2, 1, 4), [50.0, 20.0, 11.0, 30.0],
+                  [True, False, True, False])
+    assert matrix.product_ids == [3, 7]
+    np.testing.assert_array_equal(matrix.prices([7, 3, 99]), [[50, 11], [30, np.nan], [np.nan, np.nan]])
+    np.testing.assert_array_equal(matrix.availabilities([7, 3]), [[True, True], [False, False]])
+
+    # An older observation arriving later is ignored; a newer one and a new source are folded in
+    matrix.update([7, 7, 3], [0, 0, 2], _dates(3, 6, 1), [1.0, 60.0, 33.0], [True, True, True])
+    np.testing.assert_array_equal(matrix.prices([7, 3]), [[60, 11, np.nan], [30, np.nan, 33]])
+    assert list(matrix.rows([3, 7, 8, 10_000])) == [0, 1, -1, -1]
+
+
+def test_latest_matrix_grows_for_large_ids_and_many_products():
+    matrix = LatestPriceMatrix()
+    ids = np.arange(1, 101) * 1000
+    matrix.update(ids, np.zeros(100, dtype=np.int64), _dates(*range(100)), np.arange(100.0), np.ones(100, bool))
+    assert len(matrix.product_ids) == 100 and matrix.price.shape[0] >= 100
+    np.testing.assert_array_equal(matrix.prices(ids[::-1])[:, 0], np.arange(100.0)[::-1])
+
+
+def test_store_exposes_latest_prices_by_source():
+    store = PriceHistoryStore()
+    store.extend(_columns(6))
+    store.extend(_columns(3, start="2024-02-01", source="Walmart", price=20.0))
+    prices = store.latest_prices([2, 1, 5])
+    assert list(prices.columns) == ["Amazon", "Walmart"] and list(prices.index) == [2, 1, 5]
+    assert prices.loc[1].tolist() == [13.0, 20.0]
+    assert prices.loc[5].isna().all()
+    assert store.latest_availability([1]).loc[1].tolist() == [True, True]
+
+
+def test_rows_frame_reads_only_the_requested_rows():
+    store = PriceHistoryStore()
+    store.extend(_columns(6))
+    store.extend(_columns(3, start="2024-01-02", source="Walmart"))
+    rows = store.rows_frame(5)
+    expected = store.to_frame().iloc[5:].reset_index(drop=True)
+    assert list(rows.columns) == list(COLUMNS) and len(rows) == 4
+    for name in COLUMNS:
+        assert rows[name].tolist() == expected[name].tolist()
+    # Categories are limited to the values in those rows
+    assert list(rows["source"].cat.categories) == ["Amazon", "Walmart"]
+    assert list(store.rows_frame(6, 8)["source"].cat.categories) == ["Walmart"]
+    assert store.rows_frame(9).empty
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from price_rollups import PriceRollups
+
+
+def _hourly(start, end, product_id=1, source="Amazon"):
+    dates = pd.date_range(start, end, freq="h", inclusive="left")
+    return pd.DataFrame({"date": dates, "product_id": product_id, "source": source,
+                         "price": 100.0 + np.arange(len(dates)) % 2})
+
+
+def test_window_counts_and_changes():
+    rollups = PriceRollups()
+    day = pd.Timestamp(datetime.now() - timedelta(days=5)).floor("D")
+    rollups.update(_hourly(day, day + pd.Timedelta(days=2)))
+    window = rollups.window(day, day + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1))
+    assert window["count"].tolist() == [24] and window["changes"].tolist() == [23]
+    assert window[["min", "max"]].values.tolist() == [[100.0, 101.0]]
+
+
+def test_backfill_up_to_a_mid_day_boundary_keeps_the_whole_day():
+    # Hot history reloaded from 10:00 ten days ago; the archive holds everything before it
+    boundary = pd.Timestamp(datetime.now() - timedelta(days=10)).floor("D") + pd.Timedelta(hours=10)
+    day = boundary.floor("D")
+    history = _hourly(day - pd.Timedelta(days=1), day + pd.Timedelta(days=2))
+    hot, archived = history[history["date"] >= boundary], history[history["date"] < boundary]
+
+    rollups = PriceRollups()
+    rollups.extend_back(hot, boundary)
+    assert rollups.covered_from == boundary
+
+    start = day - pd.Timedelta(days=1)
+    rollups.extend_back(archived[(archived["date"] >= start) & (archived["date"] < rollups.covered_from)], start)
+    assert rollups.covered_from == start
+    assert rollups.daily[day]["count"].sum() == 24
+    assert rollups.window(start, day + pd.Timedelta(days=2))["count"].sum() == len(history)
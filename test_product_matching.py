@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+
+from product_matching import MATCH_COLUMNS, MatchingJob, ProductMatcher, normalize_code, normalize_gtin, route
+
+
+@pytest.fixture
+def products():
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "name": ["Wireless Headphones Pro", "Smart Watch X200", "Laptop Stand Aluminum", "Bluetooth Speaker Mini"],
+        "sku": ["WHP-001", "SWX-200", "LSA-003", "BSM-004"],
+        "gtin": ["0012345678905", None, None, None],
+    })
+
+
+@pytest.fixture
+def listings():
+    return pd.DataFrame({
+        "title": ["Headphones", "smart watch x200 black", "Aluminum Laptop Stand", "Garden Hose 50ft", "Speaker"],
+        "source": ["Amazon", "Amazon", "Best Buy", "Best Buy", "Walmart"],
+        "url": [f"https://shop.example/p/{i}" for i in range(5)],
+        "sku": [None, None, None, None, "bsm004"],
+        "upc": ["012345678905", None, None, None, None],
+        "price": [199.0, 249.0, 39.0, 25.0, 59.0],
+    })
+
+
+def _by_url(matches):
+    return matches.set_index("url")
+
+
+def test_codes_normalize():
+    assert list(normalize_gtin(["012345678905", "0012345678905", "12-34", None])[:2]) == ["00012345678905"] * 2
+    assert normalize_gtin(["12-34"]).isna().all()
+    codes = normalize_code(["swx-200", " "])
+    assert codes[0] == "SWX200" and pd.isna(codes[1])
+
+
+def test_hybrid_joins_identifiers_and_scores_titles(products, listings):
+    matches = ProductMatcher(products, method="hybrid").match(listings, threshold=60)
+    assert list(matches.columns) == MATCH_COLUMNS
+    found = _by_url(matches)
+
+    # The UPC and the SKU without separators identify products exactly
+    assert found.loc["https://shop.example/p/0", ["product_id", "method", "confidence"]].tolist() == [1, "gtin", 100.0]
+    assert found.loc["https://shop.example/p/4", ["product_id", "method"]].tolist() == [4, "sku"]
+    # Reworded titles are matched by similarity
+    assert found.loc["https://shop.example/p/1", ["product_id", "method"]].tolist() == [2, "similarity"]
+    assert found.loc["https://shop.example/p/2", "product_id"] == 3
+    # An unrelated listing has no candidate product
+    assert "https://shop.example/p/3" not in found.index
+    assert matches["confidence"].is_monotonic_decreasing
+
+
+def test_methods_use_their_own_signals(products, listings):
+    identifiers = ProductMatcher(products, method="identifiers").match(listings, threshold=0)
+    assert sorted(identifiers["product_id"]) == [1, 4] and set(identifiers["method"]) == {"gtin", "sku"}
+
+    similarity = ProductMatcher(products, method="similarity").match(listings, threshold=60)
+    assert set(similarity["method"]) == {"similarity"}
+    assert _by_url(similarity).loc["https://shop.example/p/1", "product_id"] == 2
+
+    no_sku = ProductMatcher(products, method="identifiers", attributes=("gtin",)).match(listings, threshold=0)
+    assert list(no_sku["product_id"]) == [1]
+
+
+def test_batches_give_the_same_matches(products, listings):
+    matcher = ProductMatcher(products)
+    progress = []
+    batched = matcher.match(listings, threshold=60, batch_rows=2, progress=progress.append)
+    pd.testing.assert_frame_equal(batched.sort_values("url", ignore_index=True),
+                                  matcher.match(listings, threshold=60).sort_values("url", ignore_index=True))
+    assert progress == pytest.approx([0.4, 0.8, 1.0])
+
+
+def test_route_by_threshold_and_auto_approval():
+    matches = pd.DataFrame({"confidence": [100.0, 90.0, 70.0]})
+    assert list(route(matches, 80)["status"]) == ["approved", "pending"]
+    assert list(route(matches, 80, auto_approve=False)["status"]) == ["pending", "pending"]
+
+
+def test_unknown_method_is_rejected(products):
+    with pytest.raises(ValueError):
+        ProductMatcher(products, method="images")
+
+
+def test_matching_job_runs_in_the_background(products, listings):
+    job = MatchingJob()
+    finished = []
+    assert job.start(products, listings, method="identifiers", threshold=0,
+                     finish=lambda matches: finished.append(len(matches)) or "queued")
+    job.join(10)
+    assert not job.running and job.progress == 1.0
+    assert job.result == "queued" and finished == [2] and job.error is None and job.runs == 1
+
+
+def test_matching_job_reports_errors(products):
+    job = MatchingJob()
+    job.start(products, pd.DataFrame({"source": ["Amazon"]}), method="similarity")
+    job.join(10)
+    assert job.result is None and job.error and job.progress == 1.0
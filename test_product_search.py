@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+import product_catalog
+import product_search
+from product_catalog import ProductCatalog
+from product_search import ProductSearchIndex, product_tokens
+
+
+def _product(i, name, sku, category="Electronics", **fields):
+    return {"id": i, "name": name, "sku": sku, "current_price": 100.0, "cost": 60.0, "category": category, **fields}
+
+
+@pytest.fixture
+def catalog():
+    return ProductCatalog([
+        _product(1, "Wireless Headphones Pro", "WHP-001"),
+        _product(2, "Smart Watch X200", "SWX-200"),
+        _product(3, "Laptop Stand Aluminum", "LSA-003", "Accessories"),
+        _product(4, "Wireless Charger", "WCH-004", "Accessories"),
+        _product(5, "Camera Lens 50mm", "CAM-050"),
+    ])
+
+
+def _ids(catalog, result):
+    positions, total = result
+    assert total >= len(positions)
+    return [catalog[int(p)]["id"] for p in positions]
+
+
+def test_product_tokens_include_joined_sku():
+    assert product_tokens(_product(1, "Smart Watch", "SWX-200", "Wearables")) == {
+        "smart", "watch", "wearables", "swx", "200", "swx200"}
+
+
+def test_exact_prefix_and_fuzzy_terms(catalog):
+    index = ProductSearchIndex(catalog)
+    assert _ids(catalog, index.search("wireless")) == [1, 4]
+    assert _ids(catalog, index.search("wire charg")) == [4]
+    assert _ids(catalog, index.search("swx200")) == [2]
+    # A typo falls back to trigram matches when nothing matches exactly or by prefix
+    assert _ids(catalog, index.search("hedphones")) == [1]
+    assert _ids(catalog, index.search("nothing like it")) == []
+
+
+def test_exact_matches_rank_before_prefix_matches():
+    catalog = ProductCatalog([_product(1, "Smart Watchface", "SWF-001"), _product(2, "Watch Strap", "WST-002")])
+    assert _ids(catalog, ProductSearchIndex(catalog).search("watch")) == [2, 1]
+
+
+def test_filters_and_paging(catalog):
+    index = ProductSearchIndex(catalog)
+    assert _ids(catalog, index.search("wireless", filters=[("category", "Accessories")])) == [4]
+    positions, total = index.search("", filters=[("category", "Accessories")], offset=1, limit=1)
+    assert total == 2 and _ids(catalog, (positions, total)) == [4]
+    positions, total = index.search("", offset=3, limit=10)
+    assert total == 5 and list(positions) == [3, 4]
+
+
+def test_edits_go_to_the_delta_and_mask_stale_postings(catalog):
+    index = ProductSearchIndex(catalog)
+    assert _ids(catalog, index.search("charger")) == [4]
+
+    catalog.update(catalog.get(4), name="Magnetic Power Bank")
+    catalog.append(_product(6, "Wireless Earbuds", "WEB-006", status="Inactive"))
+
+    # The edited product no longer matches its old name from the base index
+    assert _ids(catalog, index.search("charger")) == []
+    assert _ids(catalog, index.search("magnetic")) == [4]
+    assert _ids(catalog, index.search("wireless")) == [1, 6]
+    assert _ids(catalog, index.search("wireless", filters=[("status", "Inactive")])) == [6]
+    assert list(index._stale) == [3] and index._base_size == 5
+    # Editing a delta product again replaces its delta tokens
+    catalog.update(catalog.get(6), name="Wired Earbuds")
+    assert _ids(catalog, index.search("wireless")) == [1]
+    assert _ids(catalog, index.search("earbuds")) == [6]
+
+
+def test_many_changes_rebuild_the_base(catalog, monkeypatch):
+    monkeypatch.setattr(product_search, "REBUILD_CHANGES", 2)
+    index = ProductSearchIndex(catalog)
+    index.search("watch")
+    for i in range(6, 10):
+        catalog.append(_product(i, f"Watch Band {i}", f"WB-{i}"))
+    assert _ids(catalog, index.search("watch")) == [2, 6, 7, 8, 9]
+    assert index._base_size == 9 and not index._delta and not len(index._stale)
+
+
+def test_trimmed_change_log_forces_a_rebuild(catalog, monkeypatch):
+    monkeypatch.setattr(product_catalog, "CHANGE_LOG_LIMIT", 2)
+    index = ProductSearchIndex(catalog)
+    index.search("watch")
+    for i in range(6, 12):
+        catalog.append(_product(i, f"Watch Band {i}", f"WB-{i}"))
+    assert catalog.changes_since(index._cursor)[0] is None
+    assert _ids(catalog, index.search("band")) == list(range(6, 12))
+    assert index._base_size == 11
+
+
+def test_change_log_is_trimmed_to_the_slowest_consumer(catalog):
+    first, second = object.__new__(ProductSearchIndex), object.__new__(ProductSearchIndex)
+    changed, cursor = catalog.changes_since(0, first)
+    assert changed == [0, 1, 2, 3, 4] and cursor == 5
+    catalog.changes_since(0, second)
+    catalog.update(catalog.get(1), current_price=90.0)
+
+    assert catalog.changes_since(cursor, first) == ([0], 6)
+    # The second consumer still needs everything from 0
+    assert len(catalog._changes) == 6
+    assert catalog.changes_since(6, second) == ([], 6)
+    # The first consumer has not read the update yet
+    assert catalog._changes == [0]
+    catalog.changes_since(6, first)
+    assert catalog._changes == [] and catalog.change_cursor == 6
+    assert catalog.changes_since(0)[0] is None
+
+
+def test_positions_follow_updates(catalog):
+    accessories = catalog.positions("category", "Accessories")
+    assert list(accessories) == [2, 3] and not accessories.flags.writeable
+    catalog.update(catalog.get(5), category="Accessories")
+    assert np.array_equal(catalog.positions("category", "Accessories"), [2, 3, 4])
+    assert list(catalog.positions("category", "Electronics")) == [0, 1]
+
+
+def test_batched_updates_bump_the_version_once(catalog):
+    version, cursor = catalog.version, catalog.change_cursor
+    catalog.update_many([(catalog.get(1), {"current_price": 80.0}), (catalog.get(5), {"category": "Accessories"})])
+    assert catalog.version == version + 1
+    assert catalog.changes_since(cursor) == ([0, 4], cursor + 2)
+    assert list(catalog.prices[[0, 4]]) == [80.0, 100.0]
+    assert list(catalog.positions("category", "Accessories")) == [2, 3, 4]
+    catalog.update_many([])
+    assert catalog.version == version + 1